@@ -0,0 +1,258 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import traceback
+
+import pyarrow.parquet as pq
+
+import extract_system_stats
+import systems_db
+from filter_candidate_systems import query_candidates
+from find_nearby_occupied import find_nearby_with_sources
+from metrics import peak_rss_bytes
+from stats_io import read_stats
+from synthetic_galaxy import GalaxySpec, write_galaxy
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+WORK_DIR = "bench_data"
+
+
+def _stats_path(work_dir, dump_path):
+    name = os.path.splitext(os.path.basename(dump_path))[0]
+    return os.path.join(work_dir, f"{name}.stats.parquet")
+
+
+def bench_extract(work_dir, dump_path):
+    stats_path = _stats_path(work_dir, dump_path)
+    extract_system_stats.main(dump_path, stats_path)
+    return len(read_stats(stats_path, columns=["body_count"])), os.path.getsize(
+        dump_path
+    )
+
+
+def bench_filter(work_dir, dump_path):
+    # The DuckDB query the filter stage runs, reading the stats table itself.
+    stats_path = _stats_path(work_dir, dump_path)
+    query_candidates(stats_path)
+    records = pq.ParquetFile(stats_path).metadata.num_rows
+    return records, os.path.getsize(stats_path)
+
+
+def bench_find_nearby(work_dir, dump_path):
+    stats_path = _stats_path(work_dir, dump_path)
+    df = read_stats(stats_path)
+    occupied_df = df[df["occupation_status"] == "occupied"]
+    # Use every uncolonised system in the bubble rather than the strict filter,
+    # so the neighbour search has a realistic amount of work.
+    candidates_df = df[
+        (df["occupation_status"] == "uncolonised") & (df["distance_from_sol"] <= 500)
+    ]
+    find_nearby_with_sources(candidates_df, occupied_df)
+    return len(candidates_df), os.path.getsize(stats_path)
+
+
+def _bench_database(work_dir, dump_path, load):
+    systems_db.DB_PATH = os.path.join(work_dir, f"bench-{os.getpid()}.db")
+    try:
+        systems_db.initialize_database()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            load(dump_path)
+        conn = systems_db.get_connection()
+        records = conn.execute("SELECT count(*) FROM systems").fetchone()[0]
+        conn.close()
+    finally:
+        for suffix in ("", ".wal"):
+            if os.path.exists(systems_db.DB_PATH + suffix):
+                os.remove(systems_db.DB_PATH + suffix)
+    return records, os.path.getsize(dump_path)
+
+
+def bench_update_from_json(work_dir, dump_path):
+    return _bench_database(work_dir, dump_path, systems_db.update_from_json)
+
+
+def bench_bulk_update_from_json(work_dir, dump_path):
+    return _bench_database(work_dir, dump_path, systems_db.bulk_update_from_json)
+
+
+def bench_native_update_from_json(work_dir, dump_path):
+    return _bench_database(work_dir, dump_path, systems_db.native_update_from_json)
+
+
+STAGES = {
+    "extract_system_stats": bench_extract,
+    "filter_candidates": bench_filter,
+    "find_nearby_with_sources": bench_find_nearby,
+    "update_from_json": bench_update_from_json,
+    "bulk_update_from_json": bench_bulk_update_from_json,
+    "native_update_from_json": bench_native_update_from_json,
+}
+
+# The per-row loader takes hours at a million systems, so it only runs when
+# asked for with --stages.
+DEFAULT_STAGES = [name for name in STAGES if name != "update_from_json"]
+
+
+def _run_stage(stage, work_dir, dump_path, results):
+    start = time.perf_counter()
+    try:
+        records, nbytes = STAGES[stage](work_dir, dump_path)
+    except Exception:
+        results.put({"error": traceback.format_exc()})
+        return
+    seconds = time.perf_counter() - start
+    results.put(
+        {
+            "seconds": seconds,
+            "records": records,
+            "records_per_s": records / seconds if seconds else None,
+            "mb_per_s": nbytes / seconds / 1e6 if seconds else None,
+            "peak_rss_mb": peak_rss_bytes() / 1e6,
+        }
+    )
+
+
+def run_stage(stage, work_dir, dump_path):
+    """
+    Run one stage in a fresh interpreter so that its peak RSS is its own.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(
+        target=_run_stage, args=(stage, work_dir, dump_path, results)
+    )
+    process.start()
+    try:
+        while True:
+            alive = process.is_alive()
+            try:
+                result = results.get(timeout=1)
+                break
+            except queue.Empty:
+                # A child killed outright (out of memory, say) never reports.
+                if not alive:
+                    raise RuntimeError(
+                        f"Stage {stage} exited with status {process.exitcode}"
+                    )
+    finally:
+        process.join()
+    if "error" in result:
+        raise RuntimeError(f"Stage {stage} failed:\n{result['error']}")
+    return result
+
+
+def ensure_dump(work_dir, systems, seed=0):
+    dump_path = os.path.join(work_dir, f"galaxy-{systems}-{seed}.json")
+    if not os.path.exists(dump_path):
+        tmp_path = dump_path + ".tmp"
+        write_galaxy(tmp_path, GalaxySpec(systems=systems, seed=seed))
+        os.replace(tmp_path, dump_path)
+    return dump_path
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stages=DEFAULT_STAGES, work_dir=WORK_DIR):
+    """
+    Benchmark each stage against a synthetic dump of each size.
+
+    Returns a list of result dicts with the stage name, size, wall time,
+    throughput and peak RSS. Generated dumps are kept in work_dir for reuse.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+    for systems in sizes:
+        dump_path = ensure_dump(work_dir, systems)
+        needs_stats = any(
+            s in stages for s in ("filter_candidates", "find_nearby_with_sources")
+        )
+        if needs_stats and "extract_system_stats" not in stages:
+            if not os.path.exists(_stats_path(work_dir, dump_path)):
+                bench_extract(work_dir, dump_path)
+        # Run the extract stage first; the later stages read its output.
+        for stage in sorted(stages, key=list(STAGES).index):
+            result = {"stage": stage, "systems": systems}
+            result.update(run_stage(stage, work_dir, dump_path))
+            print(_format_result(result), flush=True)
+            results.append(result)
+    return results
+
+
+def _format_result(result):
+    return (
+        f"{result['stage']:<26} {result['systems']:>11,} systems "
+        f"{result['seconds']:>9.2f} s {result['records_per_s']:>12,.0f} rec/s "
+        f"{result['mb_per_s']:>8.1f} MB/s {result['peak_rss_mb']:>9.1f} MB peak"
+    )
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compare results with a baseline run and describe every stage that got
+    slower or used more memory by more than tolerance (a fraction).
+    """
+    previous = {(r["stage"], r["systems"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result["stage"], result["systems"]))
+        if old is None:
+            continue
+        if result["records_per_s"] < old["records_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{result['stage']} @ {result['systems']:,}: throughput "
+                f"{old['records_per_s']:,.0f} -> {result['records_per_s']:,.0f} rec/s"
+            )
+        if result["peak_rss_mb"] > old["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{result['stage']} @ {result['systems']:,}: peak RSS "
+                f"{old['peak_rss_mb']:.1f} -> {result['peak_rss_mb']:.1f} MB"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark pipeline stages on synthetic galaxy dumps"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Numbers of systems to benchmark",
+    )
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=list(STAGES),
+        default=DEFAULT_STAGES,
+        help="Stages to run (update_from_json is opt-in, it is very slow)",
+    )
+    parser.add_argument(
+        "--work-dir", default=WORK_DIR, help="Directory for generated dumps"
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument(
+        "--baseline", help="JSON results of an earlier run to check for regressions"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed relative slowdown or memory growth against --baseline",
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.stages, args.work_dir)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
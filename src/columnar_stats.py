@@ -0,0 +1,171 @@
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from geometry import distances
+
+# The parts of a Spansh system that extract_system_stats looks at, plus the
+# id64 that keys the coordinate store. Other keys are dropped when systems are
+# converted to Arrow.
+SYSTEMS_SCHEMA = pa.schema(
+    [
+        ("id64", pa.uint64()),
+        ("name", pa.string()),
+        (
+            "coords",
+            pa.struct([("x", pa.float64()), ("y", pa.float64()), ("z", pa.float64())]),
+        ),
+        (
+            "bodies",
+            pa.list_(
+                pa.struct(
+                    [
+                        ("isLandable", pa.bool_()),
+                        ("rings", pa.list_(pa.struct([("name", pa.string())]))),
+                    ]
+                )
+            ),
+        ),
+        (
+            "stations",
+            pa.list_(pa.struct([("market_id", pa.int64()), ("type", pa.string())])),
+        ),
+    ]
+)
+
+
+def systems_to_arrow(systems):
+    """
+    Convert a batch of system dicts into a table with SYSTEMS_SCHEMA.
+    """
+    return pa.Table.from_pylist(systems, schema=SYSTEMS_SCHEMA)
+
+
+# SYSTEMS_SCHEMA as DuckDB read_json column types.
+READ_JSON_COLUMNS = """{
+    'id64': 'UBIGINT',
+    'name': 'VARCHAR',
+    'coords': 'STRUCT(x DOUBLE, y DOUBLE, z DOUBLE)',
+    'bodies': 'STRUCT("isLandable" BOOLEAN, rings STRUCT(name VARCHAR)[])[]',
+    'stations': 'STRUCT(market_id BIGINT, type VARCHAR)[]'
+}"""
+
+
+def iter_arrow_batches(input_path, batch_size):
+    """
+    Read a galaxy dump straight into Arrow record batches with SYSTEMS_SCHEMA.
+
+    DuckDB's JSON reader parses the file on all cores and only the fields in
+    SYSTEMS_SCHEMA are materialised, so no Python object is built per system.
+    Batches come out in file order.
+    """
+    conn = duckdb.connect()
+    relation = conn.sql(f"""
+        SELECT id64, name, coords, bodies, stations
+        FROM read_json(
+            '{input_path.replace("'", "''")}',
+            format = 'auto',
+            columns = {READ_JSON_COLUMNS},
+            maximum_object_size = 268435456
+        )
+        """)
+    try:
+        yield from relation.to_arrow_reader(batch_size)
+    finally:
+        conn.close()
+
+
+def _per_system_count(list_column, mask, system_count):
+    """
+    Count the child elements of list_column for which mask is true, per parent row.
+    """
+    parents = pc.list_parent_indices(list_column).to_numpy()
+    weights = np.asarray(mask, dtype=np.float64)
+    counts = np.bincount(parents, weights=weights, minlength=system_count)
+    return counts.astype(np.int64)
+
+
+def occupation_status(stations, system_count):
+    """
+    Vectorised detect_occupation_status over a list<struct<market_id, type>> column.
+    """
+    flat = pc.list_flatten(stations)
+    market_id = pc.fill_null(
+        pc.cast(pc.struct_field(flat, "market_id"), pa.string()), ""
+    )
+    station_type = pc.utf8_lower(pc.fill_null(pc.struct_field(flat, "type"), ""))
+
+    colonised = pc.or_(
+        pc.starts_with(market_id, "42"),
+        pc.match_substring(station_type, "construction type"),
+    )
+    construction_prefix = pc.or_(
+        pc.starts_with(market_id, "395"), pc.starts_with(market_id, "396")
+    )
+    not_colonised = pc.invert(colonised)
+    colonising = pc.and_(
+        pc.and_(not_colonised, construction_prefix),
+        pc.match_substring(station_type, "construction"),
+    )
+    regular = pc.and_(not_colonised, pc.invert(construction_prefix))
+
+    has_regular = _per_system_count(stations, regular, system_count) > 0
+    has_colonised = _per_system_count(stations, colonised, system_count) > 0
+    has_colonising = _per_system_count(stations, colonising, system_count) > 0
+
+    status = np.full(system_count, "uncolonised", dtype=object)
+    status[has_colonising] = "colonising"
+    status[has_colonised] = "colonised"
+    status[has_regular] = "occupied"
+    return status
+
+
+def compute_stats(systems):
+    """
+    Compute the extract_system_stats columns for a table or record batch with
+    SYSTEMS_SCHEMA.
+
+    Counts come from list aggregates and the occupation status from string
+    kernels over the flattened stations, so nothing runs per system in Python.
+    The result matches extract_system_stats row for row; the scalar functions
+    remain the reference implementation.
+    """
+    if isinstance(systems, pa.RecordBatch):
+        systems = pa.Table.from_batches([systems])
+    system_count = systems.num_rows
+    coords = systems.column("coords").combine_chunks()
+    bodies = systems.column("bodies").combine_chunks()
+    stations = systems.column("stations").combine_chunks()
+
+    x, y, z = (
+        pc.fill_null(pc.struct_field(coords, axis), 0.0).to_numpy(zero_copy_only=False)
+        for axis in "xyz"
+    )
+
+    flat_bodies = pc.list_flatten(bodies)
+    landable = pc.fill_null(pc.struct_field(flat_bodies, "isLandable"), False)
+    ringed = pc.greater(
+        pc.fill_null(pc.list_value_length(pc.struct_field(flat_bodies, "rings")), 0), 0
+    )
+
+    station_count = pc.fill_null(pc.list_value_length(stations), 0).to_numpy()
+
+    return pa.table(
+        {
+            "system_name": systems.column("name"),
+            "x": x,
+            "y": y,
+            "z": z,
+            "distance_from_sol": distances(np.column_stack([x, y, z])),
+            "body_count": pc.fill_null(pc.list_value_length(bodies), 0).cast(
+                pa.int64()
+            ),
+            "landable_count": _per_system_count(bodies, landable, system_count),
+            "ring_count": _per_system_count(bodies, ringed, system_count),
+            "has_station": station_count > 0,
+            "occupation_status": pa.array(
+                occupation_status(stations, system_count), type=pa.string()
+            ),
+        }
+    )
@@ -0,0 +1,255 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+CHUNK_SIZE = 65_536
+
+# Occupation statuses are stored as one-byte codes into this tuple.
+STATUS_CODES = ("uncolonised", "colonising", "colonised", "occupied")
+STATUS_INDEX = {status: code for code, status in enumerate(STATUS_CODES)}
+
+# Raw little-endian arrays in a coordinate store directory, row-aligned with
+# the stats table it was written next to.
+XYZ_FILE = "xyz.f32"
+ID64_FILE = "id64.u64"
+STATUS_FILE = "status.u8"
+NAME_OFFSETS_FILE = "name_offsets.u64"
+NAMES_FILE = "names.utf8"
+# id64 values in ascending order, and the row each one belongs to.
+INDEX_ID64_FILE = "index_id64.u64"
+INDEX_ROWS_FILE = "index_rows.u64"
+META_FILE = "meta.json"
+STORE_FILES = (
+    XYZ_FILE,
+    ID64_FILE,
+    STATUS_FILE,
+    NAME_OFFSETS_FILE,
+    NAMES_FILE,
+    INDEX_ID64_FILE,
+    INDEX_ROWS_FILE,
+    META_FILE,
+)
+
+
+def encode_statuses(statuses):
+    """
+    Return the STATUS_CODES codes of a sequence of status strings as uint8.
+    """
+    return np.fromiter((STATUS_INDEX[status] for status in statuses), dtype=np.uint8)
+
+
+def make_output_dir(path, names):
+    """
+    Create the directory a store or index is written to. An existing one is
+    only replaced when it holds nothing but files from `names`, as an earlier
+    (or interrupted) write does; anything else raises FileExistsError rather
+    than be deleted.
+    """
+    if os.path.exists(path):
+        if not os.path.isdir(path) or not set(os.listdir(path)) <= set(names):
+            raise FileExistsError(
+                f"{path} exists and is not an earlier output; remove it or "
+                "choose another path"
+            )
+        shutil.rmtree(path)
+    os.makedirs(path)
+
+
+def is_coord_store(path):
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+class CoordStoreWriter:
+    """
+    Write a coordinate store one system at a time.
+
+    Rows are buffered in chunks and appended to the raw files, so memory does
+    not grow with the dump. The sorted id64 index is built on close. Leaving a
+    `with` block on an exception only closes the files, so the unfinished
+    store has no meta.json and is never opened as complete.
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        make_output_dir(path, STORE_FILES)
+        self.path = path
+        self.chunk_size = chunk_size
+        self.count = 0
+        self._name_bytes = 0
+        self._files = {
+            name: open(os.path.join(path, name), "wb")
+            for name in (
+                XYZ_FILE,
+                ID64_FILE,
+                STATUS_FILE,
+                NAME_OFFSETS_FILE,
+                NAMES_FILE,
+            )
+        }
+        np.zeros(1, dtype="<u8").tofile(self._files[NAME_OFFSETS_FILE])
+        self._reset()
+
+    def _reset(self):
+        self._id64, self._xyz, self._status, self._names = [], [], [], []
+
+    def add(self, id64, row):
+        """
+        Add one system from its id64 and its extract_system_stats row.
+        """
+        self._id64.append(id64 or 0)
+        self._xyz.append((row["x"], row["y"], row["z"]))
+        self._status.append(row["occupation_status"])
+        self._names.append(row["system_name"])
+        if len(self._id64) >= self.chunk_size:
+            self.flush()
+
+    def add_arrays(self, id64, x, y, z, statuses, names):
+        """
+        Add a batch of systems given as aligned columns.
+        """
+        self.flush()
+        self._write(
+            np.asarray(id64, dtype="<u8"),
+            np.column_stack([x, y, z]),
+            encode_statuses(statuses),
+            names,
+        )
+
+    def flush(self):
+        if not self._id64:
+            return
+        self._write(
+            np.asarray(self._id64, dtype="<u8"),
+            np.asarray(self._xyz, dtype=np.float64),
+            encode_statuses(self._status),
+            self._names,
+        )
+        self._reset()
+
+    def _write(self, id64, xyz, status, names):
+        encoded = [name.encode("utf-8") for name in names]
+        lengths = np.fromiter(map(len, encoded), dtype="<u8", count=len(encoded))
+        offsets = self._name_bytes + np.cumsum(lengths, dtype="<u8")
+
+        id64.tofile(self._files[ID64_FILE])
+        xyz.astype("<f4").tofile(self._files[XYZ_FILE])
+        status.astype(np.uint8).tofile(self._files[STATUS_FILE])
+        offsets.tofile(self._files[NAME_OFFSETS_FILE])
+        self._files[NAMES_FILE].write(b"".join(encoded))
+
+        self.count += len(id64)
+        if len(offsets):
+            self._name_bytes = int(offsets[-1])
+
+    def append_part(self, part_path):
+        """
+        Append the rows of a store written by another CoordStoreWriter.
+        """
+        self.flush()
+        part = CoordStore(part_path)
+        for name in (XYZ_FILE, ID64_FILE, STATUS_FILE, NAMES_FILE):
+            with open(os.path.join(part_path, name), "rb") as f:
+                shutil.copyfileobj(f, self._files[name])
+        (part.name_offsets[1:] + np.uint64(self._name_bytes)).astype("<u8").tofile(
+            self._files[NAME_OFFSETS_FILE]
+        )
+        self.count += len(part)
+        self._name_bytes += int(part.name_offsets[-1])
+
+    def _close_files(self):
+        for f in self._files.values():
+            f.close()
+
+    def close(self):
+        self.flush()
+        self._close_files()
+
+        id64 = map_array(self.path, ID64_FILE, "<u8", (self.count,))
+        rows = np.argsort(id64, kind="stable").astype("<u8")
+        id64[rows].tofile(os.path.join(self.path, INDEX_ID64_FILE))
+        rows.tofile(os.path.join(self.path, INDEX_ROWS_FILE))
+        del id64
+
+        # meta.json goes last: a store without it is incomplete.
+        with open(os.path.join(self.path, META_FILE), "w") as f:
+            json.dump({"count": self.count, "statuses": list(STATUS_CODES)}, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._close_files()
+
+
+def map_array(path, name, dtype, shape):
+    if not shape[0]:
+        # mmap cannot map an empty file.
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(os.path.join(path, name), dtype=dtype, mode="r", shape=shape)
+
+
+class CoordStore:
+    """
+    Read-only view of a coordinate store.
+
+    Every array is memory-mapped, so opening a store costs a few system calls
+    whatever its size, and processes that open the same store share its pages
+    through the page cache instead of each holding a copy.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        count = meta["count"]
+        self.path = path
+        self.xyz = map_array(path, XYZ_FILE, "<f4", (count, 3))
+        self.id64 = map_array(path, ID64_FILE, "<u8", (count,))
+        self.status = map_array(path, STATUS_FILE, np.uint8, (count,))
+        self.name_offsets = map_array(path, NAME_OFFSETS_FILE, "<u8", (count + 1,))
+        self.index_id64 = map_array(path, INDEX_ID64_FILE, "<u8", (count,))
+        self.index_rows = map_array(path, INDEX_ROWS_FILE, "<u8", (count,))
+        size = int(self.name_offsets[-1])
+        self._names = map_array(path, NAMES_FILE, np.uint8, (size,))
+
+    def __len__(self):
+        return len(self.id64)
+
+    def rows(self, id64):
+        """
+        Return the row of each id64, or -1 where it is not in the store.
+        """
+        id64 = np.atleast_1d(np.asarray(id64, dtype="<u8"))
+        if not len(self):
+            return np.full(len(id64), -1, dtype=np.int64)
+        positions = np.searchsorted(self.index_id64, id64)
+        positions = np.minimum(positions, len(self) - 1)
+        found = self.index_id64[positions] == id64
+        return np.where(found, self.index_rows[positions].astype(np.int64), -1)
+
+    def row(self, id64):
+        row = int(self.rows(id64)[0])
+        if row < 0:
+            raise KeyError(id64)
+        return row
+
+    def coords(self, id64):
+        return tuple(float(v) for v in self.xyz[self.row(id64)])
+
+    def name(self, row):
+        start, end = self.name_offsets[row], self.name_offsets[row + 1]
+        return bytes(self._names[start:end]).decode("utf-8")
+
+    def names(self, rows=None):
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        starts = self.name_offsets[rows].tolist()
+        ends = self.name_offsets[rows + 1].tolist()
+        blob = memoryview(self._names)
+        return [str(blob[start:end], "utf-8") for start, end in zip(starts, ends)]
+
+    def status_mask(self, statuses):
+        codes = encode_statuses(statuses)
+        return np.isin(self.status, codes)
@@ -0,0 +1,320 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from coord_store import make_output_dir, map_array
+from dump_io import dump_compression
+from metrics import NULL_METRICS, add_metrics_arguments, metrics_from_args
+from pushdown import decode_header, system_line
+from stage_cache import source_fingerprint
+
+CHUNK_SIZE = 65_536
+
+# Raw little-endian arrays in a dump index directory, one row per system in
+# dump order: where its JSON object starts in the dump and how long it is.
+OFFSETS_FILE = "offsets.u64"
+LENGTHS_FILE = "lengths.u32"
+ID64_FILE = "id64.u64"
+NAME_OFFSETS_FILE = "name_offsets.u64"
+NAMES_FILE = "names.utf8"
+NAME_HASH_FILE = "name_hash.u64"
+# id64 values and name hashes in ascending order, with the row of each.
+INDEX_ID64_FILE = "index_id64.u64"
+INDEX_ID64_ROWS_FILE = "index_id64_rows.u64"
+INDEX_NAME_HASH_FILE = "index_name_hash.u64"
+INDEX_NAME_ROWS_FILE = "index_name_rows.u64"
+META_FILE = "meta.json"
+INDEX_FILES = (
+    OFFSETS_FILE,
+    LENGTHS_FILE,
+    ID64_FILE,
+    NAME_OFFSETS_FILE,
+    NAMES_FILE,
+    NAME_HASH_FILE,
+    INDEX_ID64_FILE,
+    INDEX_ID64_ROWS_FILE,
+    INDEX_NAME_HASH_FILE,
+    INDEX_NAME_ROWS_FILE,
+    META_FILE,
+)
+
+
+def name_hash(name):
+    """
+    64-bit hash of a system name, the key of the name index.
+    """
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _sorted_index(path, keys, keys_file, rows_file):
+    # Stable, so the rows of a repeated key stay in dump order.
+    rows = np.argsort(keys, kind="stable").astype("<u8")
+    keys[rows].astype("<u8").tofile(os.path.join(path, keys_file))
+    rows.tofile(os.path.join(path, rows_file))
+
+
+def build_dump_index(dump_path, index_path, metrics=NULL_METRICS):
+    """
+    Index a Spansh dump (one system per line) in one pass: the byte offset,
+    length, id64 and name of every system, with sorted id64 and name-hash
+    indexes for lookups. Returns the number of systems indexed.
+
+    Only the fields before each system's bodies and stations are decoded.
+    """
+    if dump_compression(dump_path):
+        raise ValueError(
+            "Index an uncompressed dump: offsets into a compressed stream "
+            "cannot be seeked to"
+        )
+    make_output_dir(index_path, INDEX_FILES)
+
+    files = {
+        name: open(os.path.join(index_path, name), "wb")
+        for name in (
+            OFFSETS_FILE,
+            LENGTHS_FILE,
+            ID64_FILE,
+            NAME_OFFSETS_FILE,
+            NAME_HASH_FILE,
+        )
+    }
+    names_file = open(os.path.join(index_path, NAMES_FILE), "wb")
+    np.zeros(1, dtype="<u8").tofile(files[NAME_OFFSETS_FILE])
+    count = name_bytes = 0
+
+    def flush(offsets, lengths, id64s, names):
+        nonlocal name_bytes
+        encoded = [name.encode("utf-8") for name in names]
+        name_ends = name_bytes + np.cumsum(
+            np.fromiter(map(len, encoded), dtype="<u8", count=len(encoded)),
+            dtype="<u8",
+        )
+        np.asarray(offsets, dtype="<u8").tofile(files[OFFSETS_FILE])
+        np.asarray(lengths, dtype="<u4").tofile(files[LENGTHS_FILE])
+        np.asarray(id64s, dtype="<u8").tofile(files[ID64_FILE])
+        name_ends.tofile(files[NAME_OFFSETS_FILE])
+        np.fromiter(map(name_hash, names), dtype="<u8", count=len(names)).tofile(
+            files[NAME_HASH_FILE]
+        )
+        names_file.write(b"".join(encoded))
+        if len(name_ends):
+            name_bytes = int(name_ends[-1])
+
+    try:
+        with open(dump_path, "rb") as f, metrics.phase("index") as stats:
+            offsets, lengths, id64s, names = [], [], [], []
+            position = 0
+            for line in f:
+                header = decode_header(line)
+                if header is not None:
+                    start = line.find(b"{")
+                    offsets.append(position + start)
+                    lengths.append(len(system_line(line[start:])))
+                    id64s.append(header.get("id64") or 0)
+                    names.append(header.get("name") or "")
+                    if len(offsets) >= CHUNK_SIZE:
+                        flush(offsets, lengths, id64s, names)
+                        count += len(offsets)
+                        offsets, lengths, id64s, names = [], [], [], []
+                position += len(line)
+            flush(offsets, lengths, id64s, names)
+            count += len(offsets)
+            stats.records += count
+            stats.bytes += position
+    finally:
+        for file in files.values():
+            file.close()
+        names_file.close()
+
+    # The keys are sorted straight from the files just written, so only the
+    # sorted copy and the row order of one key are in memory at a time.
+    with metrics.phase("sort"):
+        for keys_file, index_file, rows_file in (
+            (ID64_FILE, INDEX_ID64_FILE, INDEX_ID64_ROWS_FILE),
+            (NAME_HASH_FILE, INDEX_NAME_HASH_FILE, INDEX_NAME_ROWS_FILE),
+        ):
+            keys = map_array(index_path, keys_file, "<u8", (count,))
+            _sorted_index(index_path, keys, index_file, rows_file)
+            del keys
+
+    # meta.json goes last: an index without it is incomplete.
+    with open(os.path.join(index_path, META_FILE), "w") as f:
+        json.dump(
+            {
+                "count": count,
+                "dump": os.path.abspath(dump_path),
+                "fingerprint": source_fingerprint(dump_path),
+            },
+            f,
+        )
+    return count
+
+
+def _lookup(keys, rows, wanted):
+    """
+    Return the row of each wanted key in a sorted key array, or -1, taking the
+    first row of a repeated key.
+    """
+    wanted = np.atleast_1d(np.asarray(wanted, dtype="<u8"))
+    if not len(keys):
+        return np.full(len(wanted), -1, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+    found = keys[positions] == wanted
+    return np.where(found, rows[positions].astype(np.int64), -1)
+
+
+class DumpIndex:
+    """
+    Random access to the systems of a dump through its index.
+
+    The index arrays are memory-mapped, and reads for a batch of rows are
+    issued in file order, so looking up a subset seeks straight to each
+    system instead of rescanning the dump.
+    """
+
+    def __init__(self, index_path, dump_path=None, check=True):
+        with open(os.path.join(index_path, META_FILE)) as f:
+            meta = json.load(f)
+        self.dump_path = dump_path or meta["dump"]
+        if check and source_fingerprint(self.dump_path) != meta["fingerprint"]:
+            raise ValueError(
+                f"{index_path} does not match {self.dump_path}; rebuild the index"
+            )
+        count = meta["count"]
+        self.offsets = map_array(index_path, OFFSETS_FILE, "<u8", (count,))
+        self.lengths = map_array(index_path, LENGTHS_FILE, "<u4", (count,))
+        self.id64 = map_array(index_path, ID64_FILE, "<u8", (count,))
+        self.name_offsets = map_array(
+            index_path, NAME_OFFSETS_FILE, "<u8", (count + 1,)
+        )
+        self._names = map_array(
+            index_path, NAMES_FILE, np.uint8, (int(self.name_offsets[-1]),)
+        )
+        self._index_id64 = map_array(index_path, INDEX_ID64_FILE, "<u8", (count,))
+        self._index_id64_rows = map_array(
+            index_path, INDEX_ID64_ROWS_FILE, "<u8", (count,)
+        )
+        self._index_name_hash = map_array(
+            index_path, INDEX_NAME_HASH_FILE, "<u8", (count,)
+        )
+        self._index_name_rows = map_array(
+            index_path, INDEX_NAME_ROWS_FILE, "<u8", (count,)
+        )
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def name(self, row):
+        start, end = self.name_offsets[row], self.name_offsets[row + 1]
+        return bytes(self._names[start:end]).decode("utf-8")
+
+    def rows_by_id64(self, id64s):
+        """
+        Return the row of each id64, or -1 where it is not in the dump.
+        """
+        return _lookup(self._index_id64, self._index_id64_rows, id64s)
+
+    def name_rows(self, name):
+        """
+        Return the rows of every system called name, in dump order. Names are
+        not unique: a few systems share theirs with another.
+        """
+        key = np.uint64(name_hash(name))
+        start = np.searchsorted(self._index_name_hash, key, side="left")
+        end = np.searchsorted(self._index_name_hash, key, side="right")
+        rows = self._index_name_rows[start:end].astype(np.int64)
+        # Skip the names that merely collide on the hash.
+        return rows[[self.name(row) == name for row in rows.tolist()]]
+
+    def rows_by_name(self, names):
+        """
+        Return the row of each system name, or -1 where it is not in the dump.
+        Where several systems share a name, this is the first in dump order;
+        name_rows returns them all.
+        """
+        rows = [self.name_rows(name) for name in names]
+        return np.array([found[0] if len(found) else -1 for found in rows], np.int64)
+
+    def sample(self, n, seed=None):
+        """
+        Return n distinct rows drawn at random, in dump order.
+        """
+        rng = np.random.default_rng(seed)
+        return np.sort(rng.choice(len(self), size=min(n, len(self)), replace=False))
+
+    def iter_raw(self, rows):
+        """
+        Yield (row, raw JSON bytes) for each row, in dump order.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if np.any(rows < 0):
+            raise KeyError("Row -1: system not in the index")
+        order = rows[np.argsort(self.offsets[rows], kind="stable")]
+        with open(self.dump_path, "rb") as f:
+            for row in order.tolist():
+                f.seek(int(self.offsets[row]))
+                yield row, f.read(int(self.lengths[row]))
+
+    def raw(self, rows):
+        """
+        Return the raw JSON bytes of each row, in the order given.
+        """
+        found = dict(self.iter_raw(rows))
+        return [found[row] for row in np.asarray(rows).tolist()]
+
+    def systems(self, rows):
+        """
+        Return the decoded system of each row, in the order given.
+        """
+        return [json.loads(raw) for raw in self.raw(rows)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Index a Spansh galaxy dump by id64 and name, and read single "
+        "systems from it without streaming the whole file"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Index a dump in one pass")
+    build.add_argument("dump", help="Uncompressed galaxy JSON dump")
+    build.add_argument("index", help="Directory to write the index to")
+    add_metrics_arguments(build)
+
+    get = commands.add_parser("get", help="Print the raw JSON of systems, one per line")
+    get.add_argument("index", help="Index directory written by build")
+    get.add_argument("--dump", help="Dump path, if it moved since indexing")
+    get.add_argument("--id64", type=int, nargs="+", default=[], help="System id64s")
+    get.add_argument("--name", nargs="+", default=[], help="System names")
+    get.add_argument("--sample", type=int, help="Also print N random systems")
+    get.add_argument("--seed", type=int, help="Seed for --sample")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        metrics = metrics_from_args(args)
+        count = build_dump_index(args.dump, args.index, metrics)
+        print(f"Indexed {count} systems.")
+        if args.metrics:
+            metrics.write(args.metrics)
+    else:
+        index = DumpIndex(args.index, args.dump)
+        found = [index.rows_by_id64(args.id64)]
+        for id64, row in zip(args.id64, found[0].tolist()):
+            if row < 0:
+                print(f"Not found: {id64}", file=sys.stderr)
+        # Every system of a shared name is printed.
+        for name in args.name:
+            found.append(index.name_rows(name))
+            if not len(found[-1]):
+                print(f"Not found: {name}", file=sys.stderr)
+        rows = np.concatenate(found).astype(np.int64)
+        rows = rows[rows >= 0]
+        if args.sample:
+            rows = np.concatenate([rows, index.sample(args.sample, args.seed)])
+        for raw in index.raw(rows):
+            sys.stdout.buffer.write(raw + b"\n")
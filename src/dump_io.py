@@ -0,0 +1,172 @@
+import gzip
+import queue
+import threading
+
+import zstandard
+
+# Decompressed bytes handed from the inflate thread to the parser per chunk,
+# and the number of chunks it may run ahead of the parser.
+CHUNK_SIZE = 4 << 20
+READ_AHEAD_CHUNKS = 8
+
+# Compressed bytes read per call when inflating a .zst dump; zstd dumps
+# inflate about sixfold, so this yields about one CHUNK_SIZE of output.
+ZSTD_READ_SIZE = 512 << 10
+
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+
+def dump_compression(path):
+    """
+    Return "gzip" or "zstd" for a compressed dump, by its suffix, else None.
+    """
+    for suffix, compression in COMPRESSIONS.items():
+        if str(path).endswith(suffix):
+            return compression
+    return None
+
+
+class _ZstdFrames:
+    """
+    Decompress a .zst file frame after frame, as `zstd -d` does. Unlike
+    zstandard's stream_reader, a file that ends inside a frame raises
+    EOFError, as a truncated gzip file does.
+    """
+
+    def __init__(self, path, read_size=ZSTD_READ_SIZE):
+        self._file = open(path, "rb")
+        self._read_size = read_size
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._frame = None
+
+    def read(self, size=-1):
+        """
+        Return the output of the next read of compressed input, whatever its
+        size, or b"" at the end.
+        """
+        while data := self._file.read(self._read_size):
+            output = []
+            while data:
+                if self._frame is None or self._frame.eof:
+                    self._frame = self._decompressor.decompressobj()
+                output.append(self._frame.decompress(data))
+                data = self._frame.unused_data if self._frame.eof else b""
+            if output := b"".join(output):
+                return output
+        if self._frame is not None and not self._frame.eof:
+            raise EOFError("Compressed file ended inside a zstd frame")
+        return b""
+
+    def close(self):
+        self._file.close()
+
+
+class ReadAheadReader:
+    """
+    Binary file object over a stream that a background thread reads ahead.
+
+    The thread pulls chunk_size blocks from `source` into a bounded queue, so
+    decompression, which releases the GIL, overlaps with the parser on
+    another core instead of stalling it on every read. With no spare core
+    nothing overlaps, and the decompression time is added to the parse.
+    """
+
+    def __init__(self, source, chunk_size=CHUNK_SIZE, read_ahead=READ_AHEAD_CHUNKS):
+        self._source = source
+        self._chunk_size = chunk_size
+        self._queue = queue.Queue(maxsize=read_ahead)
+        self._stop = threading.Event()
+        self._buffer = b""
+        self._offset = 0
+        self._eof = False
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _fill(self):
+        try:
+            while not self._stop.is_set():
+                chunk = self._source.read(self._chunk_size)
+                self._put(chunk)
+                if not chunk:
+                    return
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _next_chunk(self):
+        item = self._queue.get()
+        if isinstance(item, Exception):
+            raise item
+        if not item:
+            self._eof = True
+        self._buffer, self._offset = item, 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            parts = [self._buffer[self._offset :]]
+            self._buffer, self._offset = b"", 0
+            while not self._eof:
+                self._next_chunk()
+                parts.append(self._buffer)
+            self._buffer = b""
+            return b"".join(parts)
+
+        while self._offset >= len(self._buffer) and not self._eof:
+            self._next_chunk()
+        data = self._buffer[self._offset : self._offset + size]
+        self._offset += len(data)
+        return data
+
+    def readline(self):
+        parts = []
+        while True:
+            end = self._buffer.find(b"\n", self._offset)
+            if end >= 0:
+                parts.append(self._buffer[self._offset : end + 1])
+                self._offset = end + 1
+                return b"".join(parts)
+            parts.append(self._buffer[self._offset :])
+            self._offset = len(self._buffer)
+            if self._eof:
+                return b"".join(parts)
+            self._next_chunk()
+
+    def __iter__(self):
+        while line := self.readline():
+            yield line
+
+    def readable(self):
+        return True
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self._source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_dump(path, chunk_size=CHUNK_SIZE, read_ahead=READ_AHEAD_CHUNKS):
+    """
+    Open a galaxy dump for binary reading: .gz and .zst are decompressed in a
+    background thread, and anything else is read as is.
+    """
+    compression = dump_compression(path)
+    if compression is None:
+        return open(path, "rb")
+    if compression == "gzip":
+        source = gzip.open(path, "rb")
+    else:
+        source = _ZstdFrames(path)
+    return ReadAheadReader(source, chunk_size, read_ahead)
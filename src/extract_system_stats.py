@@ -1,11 +1,42 @@
+import contextlib
 import json
-import csv
+import os
 import argparse
-from math import sqrt
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import ijson
+
+from columnar_stats import compute_stats, iter_arrow_batches, systems_to_arrow
+from coord_store import CoordStoreWriter
+from dump_io import dump_compression, open_dump
+from geometry import point_distance
+from metrics import NULL_METRICS, add_metrics_arguments, metrics_from_args
+from pushdown import (
+    add_pushdown_arguments,
+    iter_filtered_systems,
+    iter_pushdown_systems,
+    predicate_from_args,
+    system_line,
+)
+from shards import iter_shard_lines, shard_ranges
+from stage_cache import add_cache_arguments, cache_from_args
+from stats_io import open_stats_writer, stats_format
+
+BATCH_SIZE = 10_000
+
+# Systems per Arrow batch for the columnar engine. Whole systems, bodies
+# included, are held in memory per batch, so this is smaller than BATCH_SIZE.
+COLUMNAR_BATCH_SIZE = 2_000
+
+# Shards handed out per worker; more shards than workers keeps every core busy
+# when some parts of the dump are denser than others.
+SHARDS_PER_WORKER = 4
 
 
 def distance_from_sol(x, y, z):
-    return sqrt(x**2 + y**2 + z**2)
+    return point_distance((x, y, z))
 
 
 def detect_occupation_status(stations):
@@ -62,37 +93,317 @@ def extract_system_stats(system):
     }
 
 
-def main(input_path, output_path):
-    with open(input_path, "r", encoding="utf-8") as f:
-        systems = json.load(f)
+def iter_systems(input_path):
+    """
+    Yield systems one at a time from a Spansh galaxy JSON array, which may be
+    gzip or zstd compressed.
+
+    Only the system currently being parsed is held in memory, so the size of
+    the dump does not affect peak memory.
+    """
+    with open_dump(input_path) as f:
+        yield from ijson.items(f, "item", use_float=True)
+
+
+def iter_batches(rows, batch_size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_shard_systems(input_path, start, end, predicate=None):
+    """
+    Yield the systems whose line starts within [start, end) of a Spansh dump.
+
+    Spansh dumps put one system per line inside the top-level array, so each
+    line can be decoded on its own once the array brackets and the trailing
+    comma are stripped. With a predicate, only systems whose header passes
+    it are decoded (see pushdown.iter_pushdown_systems).
+    """
+    lines = iter_shard_lines(input_path, start, end)
+    if predicate is not None:
+        yield from iter_pushdown_systems(lines, predicate)
+        return
+    for line in lines:
+        line = system_line(line)
+        if line:
+            yield json.loads(line)
+
+
+def _write_stats(
+    writer, systems, engine, batch_size, coords=None, metrics=NULL_METRICS
+):
+    """
+    Extract stats from a stream of systems and write them in batches.
+
+    The "scalar" engine runs extract_system_stats on each system. The
+    "columnar" engine takes Arrow batches of systems instead and uses
+    columnar_stats.compute_stats. When coords is a CoordStoreWriter, every
+    row is also added to it. Returns the number of rows written.
+    """
+    row_count = 0
+    if engine == "columnar":
+        for batch in systems:
+            with metrics.phase("extract") as stats:
+                table = compute_stats(batch)
+                stats.records += table.num_rows
+            with metrics.phase("write") as stats:
+                writer.write_table(table)
+                if coords is not None:
+                    _add_coords(coords, batch, table)
+                stats.records += table.num_rows
+                stats.batches += 1
+            row_count += table.num_rows
+        return row_count
+
+    extract = extract_system_stats
+    if coords is not None:
+
+        def extract(system):
+            row = extract_system_stats(system)
+            coords.add(system.get("id64"), row)
+            return row
+
+    rows = metrics.timed_map("extract", extract, systems)
+    for batch in iter_batches(rows, batch_size):
+        with metrics.phase("write") as stats:
+            writer.write_rows(batch)
+            stats.records += len(batch)
+            stats.batches += 1
+        row_count += len(batch)
+    return row_count
+
+
+def _add_coords(coords, systems, table):
+    coords.add_arrays(
+        systems.column("id64").fill_null(0).to_numpy(),
+        table.column("x").to_numpy(),
+        table.column("y").to_numpy(),
+        table.column("z").to_numpy(),
+        table.column("occupation_status").to_pylist(),
+        table.column("system_name").to_pylist(),
+    )
+
+
+def _extract_shard(shard):
+    input_path, start, end, part_path, coords_path, engine, batch_size, predicate = (
+        shard
+    )
+    systems = iter_shard_systems(input_path, start, end, predicate)
+    if engine == "columnar":
+        systems = map(systems_to_arrow, iter_batches(systems, batch_size))
+    with contextlib.ExitStack() as stack:
+        writer = stack.enter_context(open_stats_writer(part_path, header=False))
+        coords = None
+        if coords_path is not None:
+            coords = stack.enter_context(CoordStoreWriter(coords_path))
+        row_count = _write_stats(writer, systems, engine, batch_size, coords)
+    return part_path, coords_path, row_count
+
+
+def _main_sharded(
+    input_path,
+    output_path,
+    coords_path,
+    workers,
+    engine,
+    batch_size,
+    predicate=None,
+    metrics=NULL_METRICS,
+):
+    ranges = shard_ranges(input_path, workers * SHARDS_PER_WORKER)
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    suffix = ".parquet" if stats_format(output_path) == "parquet" else ".csv"
+
+    with tempfile.TemporaryDirectory(dir=output_dir) as tmp_dir:
+        shards = [
+            (
+                input_path,
+                start,
+                end,
+                os.path.join(tmp_dir, f"part-{i:05d}{suffix}"),
+                os.path.join(tmp_dir, f"part-{i:05d}.coords") if coords_path else None,
+                engine,
+                batch_size,
+                predicate,
+            )
+            for i, (start, end) in enumerate(ranges)
+        ]
+        with contextlib.ExitStack() as stack:
+            writer = stack.enter_context(open_stats_writer(output_path))
+            coords = None
+            if coords_path is not None:
+                coords = stack.enter_context(CoordStoreWriter(coords_path))
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            # map yields in submission order, so parts are appended in file
+            # order regardless of which worker finishes first.
+            results = metrics.timed(
+                "shards", pool.map(_extract_shard, shards), count_records=False
+            )
+            for part_path, part_coords_path, row_count in results:
+                metrics.add("shards", records=row_count, batches=1)
+                with metrics.phase("merge") as stats:
+                    writer.append_part(part_path)
+                    os.remove(part_path)
+                    if coords is not None:
+                        coords.append_part(part_coords_path)
+                        shutil.rmtree(part_coords_path)
+                    stats.records += row_count
+    metrics.add("shards", bytes=os.path.getsize(input_path))
+
+
+def main(
+    input_path,
+    output_path,
+    batch_size=None,
+    workers=1,
+    engine="scalar",
+    coords_path=None,
+    cache=None,
+    predicate=None,
+    metrics=NULL_METRICS,
+):
+    """
+    Write the stats table for a galaxy dump to output_path. With coords_path,
+    also write a CoordStore of the same rows there.
+
+    With a predicate (such as pushdown.Sphere), only systems whose top-level
+    fields pass it are extracted, and the rest are skipped undecoded.
+
+    With a StageCache, an unchanged dump gets its earlier stats table back
+    without being parsed. Runs that write a coordinate store are not cached.
+    """
+    if batch_size is None:
+        batch_size = COLUMNAR_BATCH_SIZE if engine == "columnar" else BATCH_SIZE
 
-    output_rows = [extract_system_stats(system) for system in systems]
+    def produce():
+        _extract(
+            input_path,
+            output_path,
+            batch_size,
+            workers,
+            engine,
+            coords_path,
+            predicate,
+            metrics,
+        )
 
-    fieldnames = [
-        "system_name",
-        "x",
-        "y",
-        "z",
-        "distance_from_sol",
-        "body_count",
-        "landable_count",
-        "ring_count",
-        "has_station",
-        "occupation_status",
-    ]
+    if cache is None or coords_path is not None:
+        produce()
+        return
+    params = {
+        "engine": engine,
+        "format": stats_format(output_path),
+        "predicate": repr(predicate),
+    }
+    cache.run("extract_system_stats", [input_path], params, output_path, produce)
+
+
+def _extract(
+    input_path,
+    output_path,
+    batch_size,
+    workers,
+    engine,
+    coords_path,
+    predicate,
+    metrics,
+):
+    if workers > 1:
+        if dump_compression(input_path):
+            raise ValueError(
+                "--workers needs an uncompressed dump: shards are byte ranges "
+                "of the file"
+            )
+        _main_sharded(
+            input_path,
+            output_path,
+            coords_path,
+            workers,
+            engine,
+            batch_size,
+            predicate,
+            metrics,
+        )
+        return
 
-    with open(output_path, "w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(output_rows)
+    counts = {}
+    if predicate is not None:
+        systems = iter_filtered_systems(input_path, predicate, counts)
+        if engine == "columnar":
+            systems = map(systems_to_arrow, iter_batches(systems, batch_size))
+    elif engine == "columnar":
+        systems = iter_arrow_batches(input_path, batch_size)
+    else:
+        systems = iter_systems(input_path)
+    systems = metrics.timed("parse", systems, count_records=engine != "columnar")
+    with contextlib.ExitStack() as stack:
+        writer = stack.enter_context(open_stats_writer(output_path))
+        coords = None
+        if coords_path is not None:
+            coords = stack.enter_context(CoordStoreWriter(coords_path))
+        _write_stats(writer, systems, engine, batch_size, coords, metrics)
+    metrics.add("parse", bytes=os.path.getsize(input_path))
+    if counts:
+        metrics.add("pushdown", records=counts["skipped"])
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Extract system stats from Spansh galaxy JSON"
     )
-    parser.add_argument("input", help="Path to input galaxy JSON file")
-    parser.add_argument("output", help="Path to output CSV file")
+    parser.add_argument(
+        "input", help="Path to input galaxy JSON file (may be .gz or .zst)"
+    )
+    parser.add_argument(
+        "output", help="Path to output file (.csv, or .parquet for columnar output)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help=f"Number of rows buffered between writes (default {BATCH_SIZE}, "
+        f"or {COLUMNAR_BATCH_SIZE} with --engine columnar)",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["scalar", "columnar"],
+        default="scalar",
+        help="scalar: extract_system_stats per system; columnar: Arrow batches "
+        "with vectorised kernels",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parse the dump in parallel with this many processes "
+        "(requires one system per line, as in Spansh dumps)",
+    )
+    parser.add_argument(
+        "--coords",
+        metavar="DIR",
+        help="Also write a memory-mapped coordinate store of the rows to DIR",
+    )
+    add_pushdown_arguments(parser)
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
     args = parser.parse_args()
 
-    main(args.input, args.output)
+    metrics = metrics_from_args(args)
+    main(
+        args.input,
+        args.output,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        engine=args.engine,
+        coords_path=args.coords,
+        cache=cache_from_args(args),
+        predicate=predicate_from_args(args),
+        metrics=metrics,
+    )
+    if args.metrics:
+        metrics.write(args.metrics)
@@ -1,32 +1,264 @@
-import pandas as pd
 import argparse
+import json
+import os
+from dataclasses import asdict, dataclass
 
+import duckdb
 
-def filter_candidates(df):
+from geometry import distances
+from metrics import NULL_METRICS, add_metrics_arguments, metrics_from_args
+from ranking import (
+    add_ranking_arguments,
+    rank_frame,
+    score_from_args,
+    settings_from_dict,
+)
+from stage_cache import add_cache_arguments, cache_from_args
+from stats_io import stats_format, write_stats
+
+# DuckDB types for the stats CSV, so the query never has to sniff them.
+CSV_COLUMN_TYPES = {
+    "system_name": "VARCHAR",
+    "x": "DOUBLE",
+    "y": "DOUBLE",
+    "z": "DOUBLE",
+    "distance_from_sol": "DOUBLE",
+    "body_count": "INTEGER",
+    "landable_count": "INTEGER",
+    "ring_count": "INTEGER",
+    "has_station": "BOOLEAN",
+    "occupation_status": "VARCHAR",
+}
+
+# The columns the filter tests, plus the name identifying each candidate. Only
+# these are read from the stats table and written to the candidates file.
+FILTER_COLUMNS = [
+    "system_name",
+    "x",
+    "y",
+    "z",
+    "distance_from_sol",
+    "body_count",
+    "landable_count",
+    "ring_count",
+    "occupation_status",
+]
+
+
+@dataclass
+class FilterConfig:
+    """
+    Thresholds for colonisation candidates. Counts must be strictly above their
+    threshold; distance is measured from `reference`, or from Sol when None.
+    """
+
+    occupation_status: str = "uncolonised"
+    max_distance: float = 500
+    reference: tuple = None
+    min_bodies: int = 30
+    min_landables: int = 20
+    min_rings: int = 3
+
+    @classmethod
+    def from_dict(cls, values):
+        return settings_from_dict(cls, values, "filter")
+
+
+def filter_candidates(df, config=None):
+    config = config or FilterConfig()
+    if config.reference is None:
+        distance = df["distance_from_sol"]
+    else:
+        distance = distances(df[["x", "y", "z"]].to_numpy(), config.reference)
     return df[
-        (df["occupation_status"] == "uncolonised")
-        & (df["distance_from_sol"] <= 500)
-        & (df["body_count"] > 30)
-        & (df["landable_count"] > 20)
-        & (df["ring_count"] > 3)
+        (df["occupation_status"] == config.occupation_status)
+        & (distance <= config.max_distance)
+        & (df["body_count"] > config.min_bodies)
+        & (df["landable_count"] > config.min_landables)
+        & (df["ring_count"] > config.min_rings)
     ].copy()
 
 
-def main(input_csv, output_csv):
-    df = pd.read_csv(input_csv)
-    candidates = filter_candidates(df)
-    candidates.sort_values(
-        by=["body_count", "landable_count", "ring_count"], ascending=False, inplace=True
+def build_filter_query(input_path, config=None):
+    """
+    Compile a FilterConfig into a DuckDB query over a stats CSV/Parquet file.
+
+    Returns the SQL text and its parameters. The bounding box around the
+    reference point lets DuckDB skip Parquet row groups by their min/max
+    statistics before the exact distance test runs.
+    """
+    if stats_format(input_path) == "parquet":
+        source = "read_parquet(?)"
+    else:
+        types = ", ".join(f"'{k}': '{v}'" for k, v in CSV_COLUMN_TYPES.items())
+        source = f"read_csv(?, header = true, types = {{{types}}})"
+    where, params = build_filter_conditions(config)
+    columns = ", ".join(FILTER_COLUMNS)
+    return f"SELECT {columns} FROM {source} WHERE {where}", [input_path] + params
+
+
+def build_filter_conditions(config=None):
+    """
+    Compile a FilterConfig into a SQL WHERE clause over the stats columns.
+    Returns the clause and its parameters.
+    """
+    config = config or FilterConfig()
+    conditions = [
+        "occupation_status = ?",
+        "body_count > ?",
+        "landable_count > ?",
+        "ring_count > ?",
+    ]
+    params = [
+        config.occupation_status,
+        config.min_bodies,
+        config.min_landables,
+        config.min_rings,
+    ]
+
+    reference = config.reference or (0, 0, 0)
+    for axis, centre in zip("xyz", reference):
+        conditions.append(f"{axis} BETWEEN ? AND ?")
+        params += [centre - config.max_distance, centre + config.max_distance]
+    if config.reference is None:
+        conditions.append("distance_from_sol <= ?")
+        params.append(config.max_distance)
+    else:
+        # Products, not ** 2, to match geometry.distances to the bit.
+        conditions.append(
+            "sqrt((x - ?) * (x - ?) + (y - ?) * (y - ?) + (z - ?) * (z - ?)) <= ?"
+        )
+        params += [c for c in config.reference for _ in range(2)]
+        params.append(config.max_distance)
+
+    return " AND ".join(conditions), params
+
+
+def query_candidates(input_path, config=None):
+    """
+    Run the compiled filter over input_path, materialising only matching rows.
+    """
+    sql, params = build_filter_query(input_path, config)
+    return duckdb.execute(sql, params).df()
+
+
+def main(
+    input_csv,
+    output_csv,
+    config=None,
+    top=None,
+    score=None,
+    cache=None,
+    metrics=NULL_METRICS,
+):
+    """
+    Write the ranked candidates of input_csv to output_csv. With a StageCache,
+    an unchanged input and configuration gets its earlier output back.
+    """
+    if cache is None:
+        _filter(input_csv, output_csv, config, top, score, metrics)
+        return
+    params = {
+        "config": asdict(config or FilterConfig()),
+        "top": top,
+        # Score functions are named; WeightedScore settings show in its repr.
+        "score": getattr(score, "__name__", score),
+        "format": stats_format(output_csv),
+    }
+    cache.run(
+        "filter_candidate_systems",
+        [input_csv],
+        params,
+        output_csv,
+        lambda: _filter(input_csv, output_csv, config, top, score, metrics),
+    )
+
+
+def _filter(input_csv, output_csv, config, top, score, metrics):
+    with metrics.phase("query") as stats:
+        candidates = query_candidates(input_csv, config)
+        stats.records += len(candidates)
+        stats.bytes += os.path.getsize(input_csv)
+    with metrics.phase("rank"):
+        candidates = rank_frame(candidates, top, score)
+    with metrics.phase("write") as stats:
+        write_stats(candidates, output_csv)
+        stats.records += len(candidates)
+
+
+def add_filter_arguments(parser):
+    """
+    Add the FilterConfig options to an argparse parser.
+    """
+    parser.add_argument(
+        "--config", help="JSON file with FilterConfig settings (flags override it)"
+    )
+    parser.add_argument("--occupation-status", dest="occupation_status")
+    parser.add_argument(
+        "--max-distance",
+        type=float,
+        help="Maximum distance in ly from the reference point (default 500)",
+    )
+    parser.add_argument(
+        "--reference",
+        type=float,
+        nargs=3,
+        metavar=("X", "Y", "Z"),
+        help="Reference point for --max-distance (default Sol)",
     )
-    candidates.to_csv(output_csv, index=False)
+    parser.add_argument(
+        "--min-bodies", type=int, help="Keep systems with more bodies (default 30)"
+    )
+    parser.add_argument(
+        "--min-landables",
+        type=int,
+        help="Keep systems with more landable bodies (default 20)",
+    )
+    parser.add_argument(
+        "--min-rings", type=int, help="Keep systems with more ringed bodies (default 3)"
+    )
+
+
+def config_from_args(args):
+    """
+    Build a FilterConfig from --config and the flags added by add_filter_arguments.
+    """
+    settings = {}
+    if args.config:
+        with open(args.config) as f:
+            settings = json.load(f)
+    for name in asdict(FilterConfig()):
+        value = getattr(args, name)
+        if value is not None:
+            settings[name] = value
+    return FilterConfig.from_dict(settings)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Filter systems suitable for colonisation"
     )
-    parser.add_argument("input", help="Path to input CSV from extract_system_stats.py")
-    parser.add_argument("output", help="Path to output CSV for candidate systems")
+    parser.add_argument(
+        "input", help="Path to input CSV/Parquet from extract_system_stats.py"
+    )
+    parser.add_argument(
+        "output", help="Path to output CSV/Parquet for candidate systems"
+    )
+    add_filter_arguments(parser)
+    add_ranking_arguments(parser)
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
     args = parser.parse_args()
 
-    main(args.input, args.output)
+    metrics = metrics_from_args(args)
+    main(
+        args.input,
+        args.output,
+        config_from_args(args),
+        top=args.top,
+        score=score_from_args(args),
+        cache=cache_from_args(args),
+        metrics=metrics,
+    )
+    if args.metrics:
+        metrics.write(args.metrics)
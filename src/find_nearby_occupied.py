@@ -1,64 +1,125 @@
-import pandas as pd
 import argparse
-from scipy.spatial import KDTree
+import numpy as np
 
+from metrics import NULL_METRICS, add_metrics_arguments, metrics_from_args
+from occupied_index import CACHE_DIR, OccupiedIndex, load_occupied_index
+from ranking import add_ranking_arguments, rank_frame, score_from_args
+from stats_io import read_stats, write_stats
 
-def build_kdtree(df):
-    coords = df[["x", "y", "z"]].values
-    return KDTree(coords), coords
+OUTPUT_COLUMNS = [
+    "system_name",
+    "x",
+    "y",
+    "z",
+    "distance_from_sol",
+    "body_count",
+    "landable_count",
+    "ring_count",
+    "source_systems_within_15ly",
+    "source_count",
+    "nearest_source_ly",
+]
 
 
-def find_nearby_with_sources(candidates_df, occupied_df, radius_ly=15):
-    tree, occupied_coords = build_kdtree(occupied_df)
+def find_nearby_with_sources(candidates_df, occupied_df, radius_ly=15, workers=-1):
+    """
+    Keep the candidates that have at least one occupied system within radius_ly.
+    """
+    index = OccupiedIndex.from_frame(occupied_df)
+    return find_nearby_in_index(candidates_df, index, radius_ly, workers)
+
+
+def find_nearby_in_index(candidates_df, index, radius_ly=15, workers=-1):
+    """
+    Same as find_nearby_with_sources, against a prebuilt OccupiedIndex.
+
+    All candidates are queried against the tree in one batched call (spread
+    over `workers` threads, -1 for all cores). Besides the comma-separated
+    source names, the result carries the number of sources in range and the
+    distance to the nearest one.
+    """
     candidate_coords = candidates_df[["x", "y", "z"]].values
 
-    nearby_sources = []
-    for i, point in enumerate(candidate_coords):
-        indices = tree.query_ball_point(point, radius_ly)
-        if indices:
-            sources = occupied_df.iloc[indices]["system_name"].tolist()
-            nearby_sources.append(", ".join(sources))
-        else:
-            nearby_sources.append("")
+    neighbours = index.tree.query_ball_point(
+        candidate_coords, radius_ly, workers=workers, return_sorted=True
+    )
+    nearest_ly, _ = index.tree.query(
+        candidate_coords, k=1, distance_upper_bound=radius_ly, workers=workers
+    )
+
+    source_counts = np.fromiter(
+        (len(indices) for indices in neighbours), dtype=np.int64, count=len(neighbours)
+    )
+    nearby_sources = [", ".join(index.names[indices]) for indices in neighbours]
 
     candidates_df = candidates_df.copy()
     candidates_df["source_systems_within_15ly"] = nearby_sources
-    return candidates_df[candidates_df["source_systems_within_15ly"] != ""]
-
-
-def main(input_candidates, input_all_systems, output_csv):
-    candidates_df = pd.read_csv(input_candidates)
-    all_systems_df = pd.read_csv(input_all_systems)
-
-    occupied_df = all_systems_df[all_systems_df["occupation_status"] == "occupied"]
-
-    final_df = find_nearby_with_sources(candidates_df, occupied_df)
-    final_df = final_df[
-        [
-            "system_name",
-            "x",
-            "y",
-            "z",
-            "distance_from_sol",
-            "body_count",
-            "landable_count",
-            "ring_count",
-            "source_systems_within_15ly",
-        ]
-    ]
-    final_df.sort_values(
-        by=["body_count", "landable_count", "ring_count"], ascending=False, inplace=True
-    )
-    final_df.to_csv(output_csv, index=False)
+    candidates_df["source_count"] = source_counts
+    candidates_df["nearest_source_ly"] = nearest_ly
+    return candidates_df[source_counts > 0]
+
+
+def main(
+    input_candidates,
+    input_all_systems,
+    output_csv,
+    cache_dir=CACHE_DIR,
+    top=None,
+    score=None,
+    metrics=NULL_METRICS,
+):
+    with metrics.phase("load_candidates") as stats:
+        candidates_df = read_stats(input_candidates, columns=OUTPUT_COLUMNS[:-3])
+        stats.records += len(candidates_df)
+    with metrics.phase("load_index") as stats:
+        index = load_occupied_index(input_all_systems, cache_dir=cache_dir)
+        stats.records += len(index)
+
+    with metrics.phase("neighbour_search") as stats:
+        final_df = find_nearby_in_index(candidates_df, index)
+        stats.records += len(candidates_df)
+    final_df = final_df[OUTPUT_COLUMNS]
+    with metrics.phase("rank"):
+        final_df = rank_frame(final_df, top, score)
+    with metrics.phase("write") as stats:
+        write_stats(final_df, output_csv)
+        stats.records += len(final_df)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Find colonisation candidates near occupied systems with sources"
     )
-    parser.add_argument("candidates", help="CSV with candidate systems")
-    parser.add_argument("systems", help="CSV with all system stats")
-    parser.add_argument("output", help="Output CSV path")
+    parser.add_argument("candidates", help="CSV/Parquet with candidate systems")
+    parser.add_argument(
+        "systems",
+        help="CSV/Parquet with all system stats, or a coordinate store written "
+        "by extract_system_stats.py --coords",
+    )
+    parser.add_argument("output", help="Output CSV/Parquet path")
+    parser.add_argument(
+        "--cache-dir",
+        default=CACHE_DIR,
+        help="Directory for the cached occupied-systems index",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Rebuild the occupied-systems index without reading or writing the cache",
+    )
+    add_ranking_arguments(parser)
+    add_metrics_arguments(parser)
     args = parser.parse_args()
 
-    main(args.candidates, args.systems, args.output)
+    metrics = metrics_from_args(args)
+    main(
+        args.candidates,
+        args.systems,
+        args.output,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        top=args.top,
+        score=score_from_args(args),
+        metrics=metrics,
+    )
+    if args.metrics:
+        metrics.write(args.metrics)
@@ -13,3 +13,15 @@ def distance(
         + (xyz_a[1] - xyz_b[1]) ** 2
         + (xyz_a[2] - xyz_b[2]) ** 2
     ) ** 0.5
+
+
+def distance_by_id64(store, id64_a: int, id64_b: int) -> float:
+    """Calculate the distance between two systems in a coordinate store.
+    Args:
+        store (CoordStore): Store opened from extract_system_stats.py --coords.
+        id64_a (int): The id64 of the first system.
+        id64_b (int): The id64 of the second system.
+    Returns:
+        float: The distance between the two systems.
+    """
+    return distance(store.coords(id64_a), store.coords(id64_b))
@@ -0,0 +1,247 @@
+import collections
+import contextlib
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+
+def peak_rss_bytes(who=resource.RUSAGE_SELF):
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PhaseStats:
+    def __init__(self):
+        self.seconds = 0.0
+        self.records = 0
+        self.bytes = 0
+        self.batches = 0
+
+    def to_dict(self):
+        return {
+            "seconds": self.seconds,
+            "records": self.records,
+            "bytes": self.bytes,
+            "batches": self.batches,
+            "records_per_s": self.records / self.seconds if self.seconds else None,
+            "bytes_per_s": self.bytes / self.seconds if self.seconds else None,
+        }
+
+
+class SamplingProfiler:
+    """
+    Sample the stack of one thread at a fixed interval from a background thread.
+
+    Samples are only kept while `active` is true, so a single phase of a run
+    can be profiled while the rest of it is not.
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.active = False
+        self.samples = 0
+        self.self_counts = collections.Counter()
+        self.cumulative_counts = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.active:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            seen = set()
+            leaf = True
+            while frame is not None:
+                code = frame.f_code
+                key = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                if leaf:
+                    self.self_counts[key] += 1
+                    leaf = False
+                if key not in seen:
+                    self.cumulative_counts[key] += 1
+                    seen.add(key)
+                frame = frame.f_back
+
+    def to_dict(self, top=25):
+        def share(counts):
+            return [
+                {"function": key, "samples": n, "share": n / self.samples}
+                for key, n in counts.most_common(top)
+            ]
+
+        return {
+            "interval": self.interval,
+            "samples": self.samples,
+            "self": share(self.self_counts),
+            "cumulative": share(self.cumulative_counts),
+        }
+
+
+class Metrics:
+    """
+    Collect wall time, record/byte/batch counts and peak memory per phase.
+
+    Coarse phases are timed with `phase`. Phases that interleave record by
+    record, such as parsing and classifying a stream of systems, are timed with
+    `timed` (time spent producing each item) and `timed_map` (time spent in a
+    function applied to each item). When profile_phase names a phase, a
+    SamplingProfiler records stacks while that phase is running.
+    """
+
+    enabled = True
+
+    def __init__(self, profile_phase=None, profile_interval=0.005):
+        self.phases = collections.OrderedDict()
+        self.profile_phase = profile_phase
+        self.profiler = None
+        if profile_phase:
+            self.profiler = SamplingProfiler(profile_interval)
+            self.profiler.start()
+        self._started = time.perf_counter()
+
+    def _stats(self, name):
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats()
+        return stats
+
+    def _profiling(self, name, active):
+        if self.profiler is not None and name == self.profile_phase:
+            self.profiler.active = active
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        stats = self._stats(name)
+        self._profiling(name, True)
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.seconds += time.perf_counter() - start
+            self._profiling(name, False)
+
+    def timed(self, name, iterable, count_records=True):
+        """
+        Yield from iterable, charging the time spent in its __next__ to `name`
+        and, unless count_records is false, counting each item as a record.
+        """
+        stats = self._stats(name)
+        iterator = iter(iterable)
+        clock = time.perf_counter
+        while True:
+            self._profiling(name, True)
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                stats.seconds += clock() - start
+                self._profiling(name, False)
+            if count_records:
+                stats.records += 1
+            yield item
+
+    def timed_map(self, name, function, iterable):
+        """
+        Yield function(item) for each item, charging only the calls to `name`.
+        """
+        stats = self._stats(name)
+        clock = time.perf_counter
+        for item in iterable:
+            self._profiling(name, True)
+            start = clock()
+            result = function(item)
+            stats.seconds += clock() - start
+            self._profiling(name, False)
+            stats.records += 1
+            yield result
+
+    def add(self, name, records=0, bytes=0, batches=0):
+        stats = self._stats(name)
+        stats.records += records
+        stats.bytes += bytes
+        stats.batches += batches
+
+    def to_dict(self):
+        result = {
+            "seconds": time.perf_counter() - self._started,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "peak_children_rss_bytes": peak_rss_bytes(resource.RUSAGE_CHILDREN),
+            "phases": {name: s.to_dict() for name, s in self.phases.items()},
+        }
+        if self.profiler is not None:
+            result["profile"] = dict(
+                phase=self.profile_phase, **self.profiler.to_dict()
+            )
+        return result
+
+    def write(self, path):
+        """
+        Stop the profiler, if any, and write the collected metrics to path.
+        """
+        if self.profiler is not None:
+            self.profiler.stop()
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+class NullMetrics:
+    """
+    Stand-in for Metrics when metrics are off. Every hook is a no-op, and
+    `timed` returns the iterable itself so the hot loop is untouched.
+    """
+
+    enabled = False
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        yield PhaseStats()
+
+    def timed(self, name, iterable, count_records=True):
+        return iterable
+
+    def timed_map(self, name, function, iterable):
+        return map(function, iterable)
+
+    def add(self, name, records=0, bytes=0, batches=0):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+def add_metrics_arguments(parser):
+    """
+    Add --metrics and --profile-phase to an argparse parser.
+    """
+    parser.add_argument(
+        "--metrics", metavar="PATH", help="Write per-phase metrics as JSON to PATH"
+    )
+    parser.add_argument(
+        "--profile-phase",
+        metavar="PHASE",
+        help="Run a sampling profiler during this phase and add it to --metrics",
+    )
+
+
+def metrics_from_args(args):
+    if not args.metrics:
+        return NULL_METRICS
+    return Metrics(profile_phase=args.profile_phase)
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from scipy.spatial import KDTree
+
+from coord_store import META_FILE, CoordStore, is_coord_store
+from stage_cache import source_fingerprint
+from stats_io import read_stats
+
+CACHE_DIR = ".kdtree_cache"
+
+INDEX_COLUMNS = ["system_name", "x", "y", "z", "occupation_status"]
+
+
+class OccupiedIndex:
+    """
+    KD-tree over a subset of systems plus arrays aligned with the tree's points.
+
+    row_ids holds each point's row position in the source stats table, names
+    its system name.
+    """
+
+    def __init__(self, tree, coords, row_ids, names):
+        self.tree = tree
+        self.coords = coords
+        self.row_ids = row_ids
+        self.names = names
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    @classmethod
+    def from_frame(cls, df, row_ids=None):
+        coords = df[["x", "y", "z"]].to_numpy(dtype=np.float64)
+        names = df["system_name"].to_numpy(dtype=str)
+        if row_ids is None:
+            row_ids = np.arange(len(df), dtype=np.int64)
+        return cls(KDTree(coords), coords, row_ids, names)
+
+    @classmethod
+    def from_records(cls, records, row_ids=None):
+        """
+        Build the index over every row of a StatsRecords container.
+        """
+        coords = records.coords()
+        names = np.array(records.names(), dtype=str)
+        if row_ids is None:
+            row_ids = np.arange(len(records), dtype=np.int64)
+        return cls(KDTree(coords), coords, row_ids, names)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "coords.npy"), self.coords)
+        np.save(os.path.join(path, "row_ids.npy"), self.row_ids)
+        np.save(os.path.join(path, "names.npy"), self.names)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a saved index, memory-mapping its arrays.
+
+        The tree is rebuilt over the mapped coordinates instead of being
+        stored with its own copy of them; for the tens of thousands of
+        occupied systems that takes a few tens of milliseconds.
+        """
+        coords = np.load(os.path.join(path, "coords.npy"), mmap_mode="r")
+        return cls(
+            KDTree(coords, copy_data=False),
+            coords,
+            np.load(os.path.join(path, "row_ids.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "names.npy"), mmap_mode="r"),
+        )
+
+
+def systems_fingerprint(systems_path):
+    """
+    source_fingerprint of a stats table, or of a CoordStore's meta.json: stores
+    are rewritten whole, with meta.json last.
+    """
+    if is_coord_store(systems_path):
+        return source_fingerprint(os.path.join(systems_path, META_FILE))
+    return source_fingerprint(systems_path)
+
+
+def build_occupied_index(systems_path, statuses=("occupied",)):
+    if is_coord_store(systems_path):
+        store = CoordStore(systems_path)
+        row_ids = np.flatnonzero(store.status_mask(statuses))
+        coords = np.asarray(store.xyz[row_ids], dtype=np.float64)
+        names = np.array(store.names(row_ids), dtype=str)
+        return OccupiedIndex(KDTree(coords), coords, row_ids, names)
+    df = read_stats(systems_path, columns=INDEX_COLUMNS)
+    mask = df["occupation_status"].isin(list(statuses)).to_numpy()
+    return OccupiedIndex.from_frame(df[mask], row_ids=np.flatnonzero(mask))
+
+
+def load_occupied_index(systems_path, statuses=("occupied",), cache_dir=CACHE_DIR):
+    """
+    Return the index of systems_path rows whose status is in statuses.
+
+    systems_path is a stats table or a CoordStore directory. The built index is
+    cached under cache_dir, keyed by the fingerprint of the source and the
+    status filter. A new dump gets a new key, so stale entries are never
+    reused; they are removed when their replacement is built.
+    """
+    statuses = tuple(sorted(statuses))
+    if cache_dir is None:
+        return build_occupied_index(systems_path, statuses)
+
+    key = hashlib.sha256(
+        f"{systems_fingerprint(systems_path)}:{','.join(statuses)}".encode()
+    ).hexdigest()[:32]
+    entry = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(entry, "meta.json")):
+        return OccupiedIndex.load(entry)
+
+    index = build_occupied_index(systems_path, statuses)
+    meta = {"source": os.path.abspath(systems_path), "statuses": list(statuses)}
+
+    os.makedirs(cache_dir, exist_ok=True)
+    _remove_stale_entries(cache_dir, meta)
+    # Write into a scratch directory and rename it into place, so a concurrent
+    # run never sees a half-written entry.
+    tmp_entry = tempfile.mkdtemp(dir=cache_dir, prefix=".tmp-")
+    index.save(tmp_entry)
+    with open(os.path.join(tmp_entry, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    if os.path.isdir(entry) and not os.path.exists(os.path.join(entry, "meta.json")):
+        # Left behind incomplete by an interrupted run.
+        shutil.rmtree(entry, ignore_errors=True)
+    try:
+        os.rename(tmp_entry, entry)
+    except OSError:
+        # Another process published the same entry first.
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+    if not os.path.exists(os.path.join(entry, "meta.json")):
+        return index
+    return OccupiedIndex.load(entry)
+
+
+def _remove_stale_entries(cache_dir, meta):
+    for name in os.listdir(cache_dir):
+        meta_path = os.path.join(cache_dir, name, "meta.json")
+        try:
+            with open(meta_path) as f:
+                old_meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if old_meta == meta:
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
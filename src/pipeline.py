@@ -0,0 +1,166 @@
+import argparse
+import os
+import tempfile
+from dataclasses import asdict
+
+import pandas as pd
+
+from extract_system_stats import (
+    BATCH_SIZE,
+    extract_system_stats,
+    iter_batches,
+    iter_systems,
+)
+from filter_candidate_systems import (
+    FilterConfig,
+    add_filter_arguments,
+    config_from_args,
+    filter_candidates,
+)
+from find_nearby_occupied import OUTPUT_COLUMNS, find_nearby_in_index
+from occupied_index import OccupiedIndex
+from pushdown import Sphere, iter_filtered_systems
+from ranking import add_ranking_arguments, rank_frame, score_from_args
+from stage_cache import add_cache_arguments, cache_from_args
+from stats_io import FIELDNAMES, write_stats
+from stats_records import StatsRecords
+
+# Slack added to the pushdown sphere so that rounding in the distance tests
+# never drops a source exactly at the edge of a candidate's radius.
+PUSHDOWN_MARGIN_LY = 1e-6
+
+
+def pushdown_predicate(config=None, radius_ly=15):
+    """
+    Return the Sphere outside which no system can affect the result: a
+    candidate lies within max_distance of the reference, and its sources
+    within radius_ly of it.
+    """
+    config = config or FilterConfig()
+    return Sphere(
+        config.max_distance + radius_ly + PUSHDOWN_MARGIN_LY, config.reference
+    )
+
+
+def collect_stages(input_path, config=None, batch_size=BATCH_SIZE, predicate=None):
+    """
+    Stream the dump once and split its stats rows into the two sets the final
+    stage needs: occupied systems and filtered candidates.
+
+    Each batch of rows is routed to both sets at once and kept as compact
+    StatsRecords, so no row dicts or intermediate files outlive their batch.
+    With a predicate, systems whose header fails it are skipped undecoded.
+    """
+    if predicate is None:
+        systems = iter_systems(input_path)
+    else:
+        systems = iter_filtered_systems(input_path, predicate)
+    rows = (extract_system_stats(system) for system in systems)
+    occupied = StatsRecords()
+    candidates = StatsRecords()
+    for batch in iter_batches(rows, batch_size):
+        df = pd.DataFrame(batch, columns=FIELDNAMES)
+        occupied.extend_frame(df[df["occupation_status"] == "occupied"])
+        candidates.extend_frame(filter_candidates(df, config))
+    return occupied, candidates
+
+
+def cached_collect_stages(
+    input_path, config=None, batch_size=BATCH_SIZE, cache=None, predicate=None
+):
+    """
+    collect_stages through a StageCache: a rerun with the same dump and filter
+    settings (a new radius, say) skips parsing the dump.
+    """
+    if cache is None:
+        return collect_stages(input_path, config, batch_size, predicate)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        occupied_dir = os.path.join(tmp_dir, "occupied")
+        candidates_dir = os.path.join(tmp_dir, "candidates")
+
+        def produce():
+            occupied, candidates = collect_stages(
+                input_path, config, batch_size, predicate
+            )
+            occupied.save(occupied_dir)
+            candidates.save(candidates_dir)
+
+        params = {
+            "config": asdict(config or FilterConfig()),
+            "pushdown": repr(predicate),
+        }
+        cache.run("collect_stages", [input_path], params, tmp_dir, produce)
+        return StatsRecords.load(occupied_dir), StatsRecords.load(candidates_dir)
+
+
+def main(
+    input_path,
+    output_path,
+    config=None,
+    radius_ly=15,
+    batch_size=BATCH_SIZE,
+    top=None,
+    score=None,
+    cache=None,
+    pushdown=False,
+):
+    predicate = pushdown_predicate(config, radius_ly) if pushdown else None
+    occupied, candidates = cached_collect_stages(
+        input_path, config, batch_size, cache, predicate
+    )
+    index = OccupiedIndex.from_records(occupied)
+
+    # Sorting first keeps the order through the neighbour search, which only
+    # drops rows.
+    candidates = candidates.take(
+        candidates.sort_order(["body_count", "landable_count", "ring_count"])
+    )
+    final_df = find_nearby_in_index(candidates.to_frame(), index, radius_ly)
+    if top is not None or score is not None:
+        final_df = rank_frame(final_df, top, score)
+    write_stats(final_df[OUTPUT_COLUMNS], output_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Find colonisation candidates near occupied systems in one "
+        "pass over a Spansh galaxy JSON dump"
+    )
+    parser.add_argument("input", help="Path to input galaxy JSON file")
+    parser.add_argument("output", help="Output CSV/Parquet path")
+    parser.add_argument(
+        "--radius",
+        type=float,
+        default=15,
+        help="Maximum distance in ly from a candidate to an occupied system",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help="Number of systems routed per batch",
+    )
+    parser.add_argument(
+        "--pushdown",
+        action="store_true",
+        help="Skip, without decoding their bodies and stations, systems too far "
+        "from the reference to be a candidate or a candidate's source (requires "
+        "one system per line, as in Spansh dumps)",
+    )
+    add_filter_arguments(parser)
+    add_ranking_arguments(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    main(
+        args.input,
+        args.output,
+        config_from_args(args),
+        radius_ly=args.radius,
+        batch_size=args.batch_size,
+        top=args.top,
+        score=score_from_args(args) if args.score else None,
+        cache=cache_from_args(args),
+        pushdown=args.pushdown,
+    )
@@ -0,0 +1,113 @@
+import json
+import re
+from dataclasses import dataclass
+
+from dump_io import open_dump
+from geometry import point_distance
+
+# The first top-level nested array of a system line. Spansh dumps put a
+# system's scalar fields and coords before its bodies and stations, so the
+# text before this match is a small JSON object on its own once closed.
+_NESTED_KEY = re.compile(rb',\s*"(?:bodies|stations)"\s*:')
+
+
+def system_line(line):
+    """
+    Strip the array brackets and trailing comma around one line of a dump,
+    leaving the system's JSON object (or b"" for a line without one).
+    """
+    return line.strip().lstrip(b"[").rstrip(b",]")
+
+
+def decode_header(line):
+    """
+    Decode the top-level fields of a dump line that come before the system's
+    bodies and stations, without decoding the nested arrays. Returns None for
+    a line without a system.
+    """
+    start = line.find(b"{")
+    if start < 0:
+        return None
+    match = _NESTED_KEY.search(line, start)
+    if match is None:
+        return json.loads(system_line(line))
+    return json.loads(line[start : match.start()] + b"}")
+
+
+def iter_pushdown_systems(lines, predicate, counts=None):
+    """
+    Yield the systems of an iterable of dump lines for which
+    predicate(header) is true, where header holds the fields decode_header
+    returns. Only those systems are decoded in full; the others are skipped
+    as raw bytes. With a counts dict, tallies "kept" and "skipped".
+    """
+    kept = skipped = 0
+    try:
+        for line in lines:
+            header = decode_header(line)
+            if header is None:
+                continue
+            if predicate(header):
+                kept += 1
+                yield json.loads(system_line(line))
+            else:
+                skipped += 1
+    finally:
+        if counts is not None:
+            counts["kept"] = counts.get("kept", 0) + kept
+            counts["skipped"] = counts.get("skipped", 0) + skipped
+
+
+def iter_filtered_systems(input_path, predicate, counts=None):
+    """
+    Yield the systems of a Spansh dump (one system per line, possibly
+    compressed) that pass predicate, see iter_pushdown_systems.
+    """
+    with open_dump(input_path) as f:
+        yield from iter_pushdown_systems(f, predicate, counts)
+
+
+@dataclass
+class Sphere:
+    """
+    Header predicate that keeps systems within max_distance ly of reference,
+    or of Sol when None.
+
+    Distances are computed the way filter_candidates computes them, so a
+    system it would keep is never skipped.
+    """
+
+    max_distance: float
+    reference: tuple = None
+
+    def __call__(self, header):
+        coords = header.get("coords", {})
+        point = (coords.get("x", 0), coords.get("y", 0), coords.get("z", 0))
+        return point_distance(point, self.reference) <= self.max_distance
+
+
+def add_pushdown_arguments(parser):
+    """
+    Add --within and --center to an argparse parser.
+    """
+    parser.add_argument(
+        "--within",
+        type=float,
+        metavar="LY",
+        help="Only extract systems within LY of --center; the bodies and "
+        "stations of the others are skipped without being decoded (requires "
+        "one system per line, as in Spansh dumps)",
+    )
+    parser.add_argument(
+        "--center",
+        type=float,
+        nargs=3,
+        metavar=("X", "Y", "Z"),
+        help="Centre for --within (default Sol)",
+    )
+
+
+def predicate_from_args(args):
+    if args.within is None:
+        return None
+    return Sphere(args.within, tuple(args.center) if args.center else None)
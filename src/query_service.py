@@ -0,0 +1,344 @@
+import argparse
+import asyncio
+import json
+import socket
+import sys
+
+import numpy as np
+
+from coord_store import CoordStore, is_coord_store
+from filter_candidate_systems import FilterConfig, filter_candidates
+from geometry import distances
+from occupied_index import CACHE_DIR, load_occupied_index, systems_fingerprint
+from ranking import rank_frame
+from stats_io import read_stats
+
+RELOAD_INTERVAL = 5.0
+FILTER_LIMIT = 100
+
+
+class ServiceState:
+    """
+    Everything a query runs against: the stats table (None for a coordinate
+    store), the index of source systems and a name -> coordinates lookup.
+    Replaced whole on reload, so a batch always sees one consistent state.
+    """
+
+    def __init__(self, systems_path, statuses, cache_dir):
+        self.fingerprint = systems_fingerprint(systems_path)
+        self.index = load_occupied_index(systems_path, statuses, cache_dir)
+        if is_coord_store(systems_path):
+            store = CoordStore(systems_path)
+            self.stats = None
+            names, coords = store.names(), store.xyz
+        else:
+            self.stats = read_stats(systems_path)
+            names = self.stats["system_name"]
+            coords = self.stats[["x", "y", "z"]].to_numpy(dtype=np.float64)
+        self.positions = {}
+        for row, name in enumerate(names):
+            self.positions.setdefault(name, row)
+        self.coords = coords
+
+    def point(self, request):
+        if "system" in request:
+            row = self.positions.get(request["system"])
+            if row is None:
+                raise KeyError(f"Unknown system: {request['system']}")
+            return [float(v) for v in self.coords[row]]
+        return [float(v) for v in request["point"]]
+
+
+class _Batcher:
+    """
+    Collect the requests submitted during one event loop iteration (or within
+    `window` seconds of the first) and run them as one call of run_batch, in a
+    worker thread so the event loop keeps accepting requests meanwhile.
+    """
+
+    def __init__(self, run_batch, window=0.0):
+        self.run_batch = run_batch
+        self.window = window
+        self._pending = []
+        self._tasks = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) == 1:
+            if self.window:
+                loop.call_later(self.window, self._start_flush)
+            else:
+                loop.call_soon(self._start_flush)
+        return await future
+
+    def _start_flush(self):
+        task = asyncio.get_running_loop().create_task(self._flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self):
+        pending, self._pending = self._pending, []
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                None, self.run_batch, [item for item, _ in pending]
+            )
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(pending, results):
+            # The client may have gone away while the batch ran.
+            if not future.done():
+                future.set_result(result)
+
+
+def _match(index, i, distance):
+    return {
+        "system_name": str(index.names[i]),
+        "x": float(index.coords[i][0]),
+        "y": float(index.coords[i][1]),
+        "z": float(index.coords[i][2]),
+        "distance": float(distance),
+    }
+
+
+class QueryService:
+    """
+    Answer radius, nearest-source and filter queries over newline-delimited
+    JSON, keeping the stats table and the source index in memory.
+
+    Radius and nearest queries that arrive together are answered with one
+    vectorised KD-tree call. The source file is polled every reload_interval
+    seconds and the state is rebuilt in a worker thread when it changes; the
+    old state keeps serving until the new one is swapped in.
+    """
+
+    def __init__(
+        self,
+        systems_path,
+        statuses=("occupied",),
+        cache_dir=CACHE_DIR,
+        reload_interval=RELOAD_INTERVAL,
+        batch_window=0.0,
+    ):
+        self.systems_path = systems_path
+        self.statuses = tuple(statuses)
+        self.cache_dir = cache_dir
+        self.reload_interval = reload_interval
+        self.state = self._load()
+        self._radius = _Batcher(self._radius_batch, batch_window)
+        self._nearest = _Batcher(self._nearest_batch, batch_window)
+
+    def _load(self):
+        return ServiceState(self.systems_path, self.statuses, self.cache_dir)
+
+    async def reload(self, force=False):
+        """
+        Swap in a fresh state if the source changed (or always, with force).
+        Returns whether it did.
+        """
+        loop = asyncio.get_running_loop()
+        fingerprint = await loop.run_in_executor(
+            None, systems_fingerprint, self.systems_path
+        )
+        if not force and fingerprint == self.state.fingerprint:
+            return False
+        self.state = await loop.run_in_executor(None, self._load)
+        return True
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                # Most likely the table is being rewritten and was read half
+                # written; keep serving the old state and try again next time.
+                print(f"Reload of {self.systems_path} failed: {e!r}", file=sys.stderr)
+
+    def _radius_batch(self, queries):
+        state = self.state
+        points = np.array([point for point, _ in queries], dtype=np.float64)
+        radii = np.array([radius for _, radius in queries], dtype=np.float64)
+        neighbours = state.index.tree.query_ball_point(points, radii)
+        results = []
+        for point, indices in zip(points, neighbours):
+            found = distances(state.index.coords[indices], point)
+            order = np.argsort(found, kind="stable")
+            results.append([_match(state.index, indices[i], found[i]) for i in order])
+        return results
+
+    def _nearest_batch(self, queries):
+        state = self.state
+        points = np.array([point for point, _ in queries], dtype=np.float64)
+        k = min(max(k for _, k in queries), len(state.index))
+        if not k:
+            return [[] for _ in queries]
+        # A list k keeps the result two-dimensional even when k is 1.
+        found, indices = state.index.tree.query(points, k=list(range(1, k + 1)))
+        return [
+            [_match(state.index, i, d) for i, d in zip(row_i[:want], row_d[:want])]
+            for (_, want), row_i, row_d in zip(queries, indices, found)
+        ]
+
+    def _filter(self, request):
+        state = self.state
+        if state.stats is None:
+            raise ValueError(
+                "Filter queries need a stats table, not a coordinate store"
+            )
+        settings = {k: v for k, v in request.items() if k not in ("id", "op", "limit")}
+        candidates = filter_candidates(state.stats, FilterConfig.from_dict(settings))
+        candidates = rank_frame(candidates, request.get("limit", FILTER_LIMIT))
+        candidates["occupation_status"] = candidates["occupation_status"].astype(str)
+        return candidates.to_dict(orient="records")
+
+    async def handle(self, request):
+        op = request.get("op")
+        if op == "radius":
+            point = self.state.point(request)
+            radius = float(request.get("radius", 15))
+            if not 0 <= radius < np.inf:
+                raise ValueError(f"radius must be a finite number >= 0, not {radius}")
+            return await self._radius.submit((point, radius))
+        if op == "nearest":
+            point = self.state.point(request)
+            k = int(request.get("k", 1))
+            if k < 1:
+                raise ValueError(f"k must be at least 1, not {k}")
+            return await self._nearest.submit((point, k))
+        if op == "filter":
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._filter, request)
+        if op == "reload":
+            return await self.reload(force=True)
+        raise ValueError(f"Unknown op: {op!r}")
+
+    async def _respond(self, line, writer):
+        request = {}
+        try:
+            request = json.loads(line)
+            response = {"result": await self.handle(request)}
+        except Exception as e:
+            response = {"error": str(e)}
+        if isinstance(request, dict) and "id" in request:
+            response["id"] = request["id"]
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+
+    async def _client(self, reader, writer):
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                # Requests are answered as they complete, not in order; clients
+                # match responses by id.
+                task = asyncio.create_task(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        finally:
+            writer.close()
+
+    async def serve(self, unix_socket=None, port=None):
+        if unix_socket:
+            server = await asyncio.start_unix_server(self._client, path=unix_socket)
+        else:
+            server = await asyncio.start_server(self._client, "127.0.0.1", port)
+        watcher = asyncio.create_task(self._watch())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+class ServiceClient:
+    """
+    Blocking client for a QueryService. query() sends a list of requests in
+    one write, so the server can batch them, and returns the results in
+    request order.
+    """
+
+    def __init__(self, unix_socket=None, port=None):
+        if unix_socket:
+            self._socket = socket.socket(socket.AF_UNIX)
+            self._socket.connect(unix_socket)
+        else:
+            self._socket = socket.create_connection(("127.0.0.1", port))
+        self._file = self._socket.makefile("rb")
+
+    def query(self, requests):
+        payload = b"".join(
+            json.dumps(dict(request, id=i)).encode() + b"\n"
+            for i, request in enumerate(requests)
+        )
+        self._socket.sendall(payload)
+        responses = [None] * len(requests)
+        for _ in requests:
+            response = json.loads(self._file.readline())
+            responses[response["id"]] = response
+        for response in responses:
+            if "error" in response:
+                raise RuntimeError(response["error"])
+        return [response["result"] for response in responses]
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve radius, nearest-source and filter queries over the "
+        "stats table from one long-lived process"
+    )
+    parser.add_argument(
+        "systems", help="CSV/Parquet with all system stats, or a coordinate store"
+    )
+    address = parser.add_mutually_exclusive_group(required=True)
+    address.add_argument("--socket", help="Listen on this Unix socket")
+    address.add_argument("--port", type=int, help="Listen on this localhost port")
+    parser.add_argument(
+        "--sources",
+        nargs="+",
+        default=["occupied"],
+        help="Occupation statuses indexed for radius and nearest queries",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=CACHE_DIR,
+        help="Directory for the cached source index",
+    )
+    parser.add_argument(
+        "--reload-interval",
+        type=float,
+        default=RELOAD_INTERVAL,
+        help="Seconds between checks for a new stats table",
+    )
+    parser.add_argument(
+        "--batch-window",
+        type=float,
+        default=0.0,
+        help="Seconds to wait for more queries before running a batch",
+    )
+    args = parser.parse_args()
+
+    service = QueryService(
+        args.systems,
+        statuses=args.sources,
+        cache_dir=args.cache_dir,
+        reload_interval=args.reload_interval,
+        batch_window=args.batch_window,
+    )
+    asyncio.run(service.serve(unix_socket=args.socket, port=args.port))
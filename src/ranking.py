@@ -0,0 +1,283 @@
+import argparse
+import heapq
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from geometry import distances
+from shards import iter_shard_lines, shard_ranges
+from stats_io import CSV_DTYPES, stats_format, write_stats
+
+BATCH_SIZE = 10_000
+SHARDS_PER_WORKER = 4
+
+
+def lexicographic_score(df):
+    """
+    Rank by body count, then landable count, then ring count, as the stages
+    have always sorted. The counts fit in 16 bits, so packing them into one
+    float64 keeps the order exactly.
+    """
+    return (
+        df["body_count"].to_numpy(np.float64) * 2.0**32
+        + df["landable_count"].to_numpy(np.float64) * 2.0**16
+        + df["ring_count"].to_numpy(np.float64)
+    )
+
+
+def settings_from_dict(cls, values, kind):
+    """
+    Build the settings dataclass cls from a dict, as read from JSON. Unknown
+    keys are an error, and a `reference` point given as a list becomes a tuple.
+    """
+    known = {f.name for f in fields(cls)}
+    unknown = set(values) - known
+    if unknown:
+        raise ValueError(f"Unknown {kind} settings: {', '.join(sorted(unknown))}")
+    if values.get("reference") is not None:
+        values = dict(values, reference=tuple(values["reference"]))
+    return cls(**values)
+
+
+@dataclass
+class WeightedScore:
+    """
+    Weighted sum of the counts, the number of occupied sources in range
+    (source_count, from find_nearby_occupied) and a penalty per light year
+    from `reference`, or from Sol when None.
+    """
+
+    bodies: float = 1.0
+    landables: float = 1.0
+    rings: float = 1.0
+    sources: float = 0.0
+    distance_penalty: float = 0.0
+    reference: tuple = None
+
+    @classmethod
+    def from_dict(cls, values):
+        return settings_from_dict(cls, values, "score")
+
+    def __call__(self, df):
+        score = (
+            self.bodies * df["body_count"].to_numpy(np.float64)
+            + self.landables * df["landable_count"].to_numpy(np.float64)
+            + self.rings * df["ring_count"].to_numpy(np.float64)
+        )
+        if self.sources:
+            score += self.sources * df["source_count"].to_numpy(np.float64)
+        if self.distance_penalty:
+            if self.reference is None:
+                distance = df["distance_from_sol"].to_numpy(np.float64)
+            else:
+                distance = distances(df[["x", "y", "z"]].to_numpy(), self.reference)
+            score -= self.distance_penalty * distance
+        return score
+
+
+class TopK:
+    """
+    The k best rows seen so far, by a score function over DataFrame batches.
+
+    Rows are kept in a min-heap of (score, -origin, -position, row), so a
+    new row only displaces the worst kept one, and equal scores are broken in
+    favour of the earlier row, like a stable sort. `origin` tells apart the
+    shards of a parallel run; their TopKs are combined with merge. With k None
+    every row is kept.
+    """
+
+    def __init__(self, k, score=lexicographic_score, origin=0):
+        self.k = k
+        self.score = score
+        self.origin = origin
+        self.seen = 0
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _push(self, entry):
+        if self.k is None or len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif self._heap and entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def push_frame(self, df):
+        scores = self.score(df)
+        positions = np.arange(self.seen, self.seen + len(df))
+        self.seen += len(df)
+        if self.k == 0:
+            return
+        if self.k is not None and len(self._heap) >= self.k:
+            # Only rows that can beat the current worst are converted to dicts.
+            keep = scores >= self._heap[0][0]
+            df, scores, positions = df[keep], scores[keep], positions[keep]
+        rows = df.to_dict("records")
+        for score, position, row in zip(scores.tolist(), positions.tolist(), rows):
+            self._push((score, -self.origin, -position, row))
+
+    def merge(self, other):
+        for entry in other._heap:
+            self._push(entry)
+
+    def rows(self):
+        """
+        Return the kept rows, best first.
+        """
+        return [entry[-1] for entry in sorted(self._heap, reverse=True)]
+
+    def to_frame(self, columns):
+        return pd.DataFrame(self.rows(), columns=columns)
+
+
+def rank_frame(df, k=None, score=lexicographic_score, batch_size=BATCH_SIZE):
+    """
+    Return the k best rows of df, best first, without sorting all of it.
+    """
+    score = score or lexicographic_score
+    if k is None:
+        # Keeping everything is a plain stable sort.
+        return df.iloc[np.argsort(-score(df), kind="stable")]
+    top = TopK(k, score)
+    for start in range(0, len(df), batch_size):
+        top.push_frame(df.iloc[start : start + batch_size])
+    return top.to_frame(df.columns).astype(df.dtypes.to_dict())
+
+
+def _iter_csv_shard(path, start, end, batch_size):
+    with open(path, "rb") as f:
+        header = f.readline()
+    columns = header.decode("utf-8").rstrip("\r\n").split(",")
+    dtypes = {name: CSV_DTYPES[name] for name in columns if name in CSV_DTYPES}
+    # Starting past byte 0 makes the first shard skip the header line too.
+    lines = []
+    for line in iter_shard_lines(path, max(start, 1), end):
+        lines.append(line)
+        if len(lines) == batch_size:
+            yield _parse_csv_lines(lines, columns, dtypes)
+            lines = []
+    if lines:
+        yield _parse_csv_lines(lines, columns, dtypes)
+
+
+def _parse_csv_lines(lines, columns, dtypes):
+    return pd.read_csv(
+        io.BytesIO(b"".join(lines)),
+        header=None,
+        names=columns,
+        dtype=dtypes,
+        float_precision="round_trip",
+    )
+
+
+def _iter_parquet_shard(path, first_group, last_group, batch_size):
+    part = pq.ParquetFile(path)
+    groups = list(range(first_group, last_group))
+    if groups:
+        for batch in part.iter_batches(batch_size=batch_size, row_groups=groups):
+            yield batch.to_pandas()
+
+
+def _rank_shard(shard):
+    path, origin, start, end, k, score, batch_size = shard
+    top = TopK(k, score, origin=origin)
+    if stats_format(path) == "parquet":
+        batches = _iter_parquet_shard(path, start, end, batch_size)
+    else:
+        batches = _iter_csv_shard(path, start, end, batch_size)
+    for df in batches:
+        top.push_frame(df)
+    return top
+
+
+def rank_table(path, k, score=lexicographic_score, workers=1, batch_size=BATCH_SIZE):
+    """
+    Return the k best rows of a CSV/Parquet table, best first.
+
+    With several workers the table is split into shards (Parquet row groups,
+    or CSV byte ranges on line boundaries), each worker keeps the top k of its
+    shards, and the per-shard results are merged. Each worker holds one batch
+    and k rows at a time.
+    """
+    score = score or lexicographic_score
+    if stats_format(path) == "parquet":
+        groups = pq.ParquetFile(path).num_row_groups
+        count = max(1, min(workers * SHARDS_PER_WORKER, groups))
+        bounds = [groups * i // count for i in range(count + 1)]
+        ranges = list(zip(bounds[:-1], bounds[1:]))
+        columns = pq.read_schema(path).names
+    else:
+        ranges = shard_ranges(path, workers * SHARDS_PER_WORKER)
+        with open(path, encoding="utf-8") as f:
+            columns = f.readline().rstrip("\r\n").split(",")
+    shards = [
+        (path, origin, start, end, k, score, batch_size)
+        for origin, (start, end) in enumerate(ranges)
+    ]
+
+    top = TopK(k, score)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for shard_top in pool.map(_rank_shard, shards):
+                top.merge(shard_top)
+    else:
+        for shard in shards:
+            top.merge(_rank_shard(shard))
+    return top.to_frame(columns)
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {number}")
+    return number
+
+
+def add_ranking_arguments(parser):
+    """
+    Add --top and --score to an argparse parser.
+    """
+    parser.add_argument(
+        "--top",
+        type=_positive_int,
+        help="Keep only the best TOP rows (ranked with a bounded heap, no full sort)",
+    )
+    parser.add_argument(
+        "--score",
+        metavar="JSON",
+        help="JSON file with WeightedScore settings (bodies, landables, rings, "
+        "sources, distance_penalty, reference); default ranks by body, landable "
+        "and ring count",
+    )
+
+
+def score_from_args(args):
+    if not args.score:
+        return lexicographic_score
+    with open(args.score) as f:
+        return WeightedScore.from_dict(json.load(f))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rank the rows of a stats or candidates table"
+    )
+    parser.add_argument("input", help="CSV/Parquet to rank")
+    parser.add_argument("output", help="Output CSV/Parquet path")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Rank shards of the input in parallel with this many processes",
+    )
+    add_ranking_arguments(parser)
+    args = parser.parse_args()
+
+    ranked = rank_table(args.input, args.top, score_from_args(args), args.workers)
+    write_stats(ranked, args.output)
@@ -0,0 +1,239 @@
+import argparse
+import itertools
+
+import numpy as np
+from scipy.spatial import KDTree
+
+from metrics import NULL_METRICS, add_metrics_arguments, metrics_from_args
+from stats_io import read_stats, write_stats
+
+CHUNK_SIZE = 50_000
+UNREACHABLE = -1
+
+REACH_COLUMNS = ["system_name", "x", "y", "z", "occupation_status"]
+
+# Columns main() matches candidates to reach results on, besides system_name.
+JOIN_COORDS = ["_join_x", "_join_y", "_join_z"]
+
+
+def _neighbours(tree, coords, radius, workers=-1):
+    """
+    Return (rows, neighbours): for every point in coords, the indices of the
+    tree points within radius, flattened, with the position in coords each
+    came from.
+    """
+    lists = tree.query_ball_point(coords, radius, workers=workers)
+    counts = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+    neighbours = np.fromiter(
+        itertools.chain.from_iterable(lists), dtype=np.int64, count=counts.sum()
+    )
+    return np.repeat(np.arange(len(coords)), counts), neighbours
+
+
+def iter_radius_pairs(tree, coords, radius, chunk_size=CHUNK_SIZE, workers=-1):
+    """
+    Yield the edges (i, j), i < j, of the radius graph as pairs of index
+    arrays, one chunk of points at a time, so the whole edge list is never
+    held in memory.
+    """
+    for start in range(0, len(coords), chunk_size):
+        rows, neighbours = _neighbours(
+            tree, coords[start : start + chunk_size], radius, workers
+        )
+        rows += start
+        forward = neighbours > rows
+        yield rows[forward], neighbours[forward]
+
+
+def _find(parent, nodes):
+    roots = parent[nodes]
+    while True:
+        grand = parent[roots]
+        if np.array_equal(grand, roots):
+            return roots
+        roots = grand
+
+
+def connected_components(coords, radius, tree=None, chunk_size=CHUNK_SIZE, workers=-1):
+    """
+    Label the connected components of the radius graph over coords.
+
+    Union-find runs vectorised over each chunk of edges: both ends are
+    resolved to their roots and the larger root is linked under the smaller
+    until every edge in the chunk joins one component. Returns an array of
+    component labels, each the smallest point index in its component.
+    """
+    tree = tree if tree is not None else KDTree(coords)
+    parent = np.arange(len(coords), dtype=np.int64)
+    for a, b in iter_radius_pairs(tree, coords, radius, chunk_size, workers):
+        while len(a):
+            root_a, root_b = _find(parent, a), _find(parent, b)
+            split = root_a != root_b
+            if not split.any():
+                break
+            low = np.minimum(root_a[split], root_b[split])
+            high = np.maximum(root_a[split], root_b[split])
+            np.minimum.at(parent, high, low)
+            a, b = a[split], b[split]
+        # Compress paths so later chunks resolve roots in a step or two.
+        parent = _find(parent, parent)
+    return _find(parent, np.arange(len(coords)))
+
+
+def hop_distances(
+    coords,
+    sources,
+    radius,
+    max_hops=None,
+    tree=None,
+    chunk_size=CHUNK_SIZE,
+    workers=-1,
+):
+    """
+    Breadth-first hop count from the nearest source point over the radius
+    graph; UNREACHABLE for points further than max_hops (or not connected).
+
+    Each level queries the tree only around the current frontier, in chunks,
+    so every point is expanded once and no edges are stored.
+    """
+    tree = tree if tree is not None else KDTree(coords)
+    hops = np.full(len(coords), UNREACHABLE, dtype=np.int32)
+    frontier = np.flatnonzero(sources)
+    hops[frontier] = 0
+    level = 0
+    while len(frontier) and (max_hops is None or level < max_hops):
+        level += 1
+        reached = []
+        for start in range(0, len(frontier), chunk_size):
+            chunk = frontier[start : start + chunk_size]
+            _, neighbours = _neighbours(tree, coords[chunk], radius, workers)
+            neighbours = np.unique(neighbours)
+            neighbours = neighbours[hops[neighbours] == UNREACHABLE]
+            hops[neighbours] = level
+            reached.append(neighbours)
+        frontier = np.concatenate(reached) if reached else frontier[:0]
+    return hops
+
+
+def reachable_systems(
+    systems_df,
+    radius_ly=15,
+    max_hops=None,
+    sources=("occupied",),
+    components=False,
+    chunk_size=CHUNK_SIZE,
+    workers=-1,
+):
+    """
+    Add a `hops` column to systems_df: the number of radius_ly jumps from the
+    nearest system whose status is in sources, where every system on the way
+    may itself be colonised. With components, also add `component` and
+    `component_size` for the connected components of the whole network.
+    """
+    coords = systems_df[["x", "y", "z"]].to_numpy(dtype=np.float64)
+    tree = KDTree(coords)
+    is_source = systems_df["occupation_status"].isin(list(sources)).to_numpy()
+
+    result = systems_df.copy()
+    result["hops"] = hop_distances(
+        coords, is_source, radius_ly, max_hops, tree, chunk_size, workers
+    )
+    if components:
+        labels = connected_components(coords, radius_ly, tree, chunk_size, workers)
+        _, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+        result["component"] = labels
+        result["component_size"] = sizes[inverse]
+    return result
+
+
+def _with_join_coords(df):
+    """
+    Add JOIN_COORDS: x/y/z rounded to float32, the precision of Parquet stats
+    tables, so that a CSV and a Parquet table of the same systems join.
+    System names alone are not unique.
+    """
+    coords = df[["x", "y", "z"]].to_numpy(dtype=np.float32)
+    return df.assign(**dict(zip(JOIN_COORDS, coords.T)))
+
+
+def main(
+    input_systems,
+    output_path,
+    input_candidates=None,
+    radius_ly=15,
+    max_hops=None,
+    sources=("occupied",),
+    components=False,
+    metrics=NULL_METRICS,
+):
+    with metrics.phase("load") as stats:
+        systems_df = read_stats(input_systems, columns=REACH_COLUMNS)
+        stats.records += len(systems_df)
+    with metrics.phase("reach") as stats:
+        reach_df = reachable_systems(
+            systems_df, radius_ly, max_hops, sources, components
+        )
+        stats.records += len(reach_df)
+    reach_df = reach_df[reach_df["hops"] > 0]
+
+    if input_candidates is None:
+        result = reach_df[reach_df["occupation_status"] == "uncolonised"]
+    else:
+        candidates_df = read_stats(input_candidates)
+        extra = [c for c in reach_df.columns if c not in REACH_COLUMNS]
+        keys = ["system_name"] + JOIN_COORDS
+        result = _with_join_coords(candidates_df).merge(
+            _with_join_coords(reach_df)[keys + extra], on=keys, how="inner"
+        )
+        result = result.drop(columns=JOIN_COORDS)
+    result = result.sort_values("hops", kind="stable")
+    with metrics.phase("write") as stats:
+        write_stats(result, output_path)
+        stats.records += len(result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Find systems reachable from occupied space in chains of "
+        "short jumps, as colonisation spreads"
+    )
+    parser.add_argument("systems", help="CSV/Parquet with all system stats")
+    parser.add_argument("output", help="Output CSV/Parquet path")
+    parser.add_argument(
+        "--candidates",
+        help="CSV/Parquet of candidate systems to keep (default: every "
+        "reachable uncolonised system)",
+    )
+    parser.add_argument(
+        "--radius", type=float, default=15, help="Maximum jump in ly (default 15)"
+    )
+    parser.add_argument(
+        "--max-hops", type=int, help="Only follow chains of up to this many jumps"
+    )
+    parser.add_argument(
+        "--sources",
+        nargs="+",
+        default=["occupied"],
+        help="Occupation statuses the chains start from (default occupied)",
+    )
+    parser.add_argument(
+        "--components",
+        action="store_true",
+        help="Also label the connected component of every system",
+    )
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    metrics = metrics_from_args(args)
+    main(
+        args.systems,
+        args.output,
+        input_candidates=args.candidates,
+        radius_ly=args.radius,
+        max_hops=args.max_hops,
+        sources=args.sources,
+        components=args.components,
+        metrics=metrics,
+    )
+    if args.metrics:
+        metrics.write(args.metrics)
@@ -0,0 +1,30 @@
+import os
+
+
+def shard_ranges(input_path, shard_count):
+    """
+    Split a file into shard_count contiguous byte ranges.
+
+    The ranges are not aligned to line boundaries: a line belongs to the shard
+    in which its first byte falls (see iter_shard_lines).
+    """
+    size = os.path.getsize(input_path)
+    shard_count = max(1, min(shard_count, size))
+    bounds = [size * i // shard_count for i in range(shard_count + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def iter_shard_lines(input_path, start, end):
+    """
+    Yield the lines of a file that start within [start, end).
+    """
+    with open(input_path, "rb") as f:
+        if start > 0:
+            # Skip the line straddling the shard start; the previous shard owns it.
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line
@@ -0,0 +1,192 @@
+import functools
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+STAGE_CACHE_DIR = ".stage_cache"
+DEFAULT_BUDGET_BYTES = 10 * 1024**3
+
+# Bytes hashed from the start and end of a file. Together with the size and
+# modification time this identifies a dump without reading all of it.
+SAMPLE_BYTES = 1 << 20
+
+ARTIFACT = "artifact"
+META_FILE = "meta.json"
+
+
+def source_fingerprint(path):
+    """
+    Hash a file's size, modification time and its first and last SAMPLE_BYTES.
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(SAMPLE_BYTES))
+        if stat.st_size > SAMPLE_BYTES:
+            f.seek(max(SAMPLE_BYTES, stat.st_size - SAMPLE_BYTES))
+            digest.update(f.read(SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def code_fingerprint():
+    """
+    Hash the source of every module next to this one. Part of each cache key,
+    so editing any stage's code (or a helper it uses) invalidates its outputs.
+    """
+    digest = hashlib.sha256()
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    for path in sorted(glob.glob(os.path.join(source_dir, "*.py"))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def _size(path):
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    return os.path.getsize(path)
+
+
+def _copy(source, destination):
+    if os.path.isdir(source):
+        if os.path.exists(destination):
+            shutil.rmtree(destination)
+        shutil.copytree(source, destination)
+    else:
+        # A copy, not a link: writers truncate their output in place, which
+        # would corrupt a linked cache entry.
+        shutil.copyfile(source, destination)
+
+
+class StageCache:
+    """
+    Content-addressed cache of stage outputs.
+
+    An entry is keyed by the stage name, the fingerprint of every input file,
+    the stage's parameters and code_fingerprint, so a stage whose inputs,
+    settings and code are unchanged gets its earlier output back instead of
+    recomputing it. Entries are evicted least recently used first once the
+    cache grows past budget_bytes.
+    """
+
+    def __init__(self, cache_dir=STAGE_CACHE_DIR, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.cache_dir = cache_dir
+        self.budget_bytes = budget_bytes
+
+    def key(self, stage, inputs, params):
+        digest = hashlib.sha256(stage.encode())
+        digest.update(code_fingerprint().encode())
+        for path in inputs:
+            digest.update(source_fingerprint(path).encode())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()[:32]
+
+    def lookup(self, key):
+        """
+        Return the artifact path of an entry, marking it as used, or None.
+        """
+        entry = os.path.join(self.cache_dir, key)
+        meta_path = os.path.join(entry, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        os.utime(meta_path)
+        return os.path.join(entry, ARTIFACT)
+
+    def store(self, key, output_path, meta):
+        """
+        Copy output_path (a file or directory) into the entry for key, then
+        evict old entries until the cache fits its budget.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Copy into a scratch directory and rename it into place, so a
+        # concurrent run never sees a half-written entry.
+        tmp_entry = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp-")
+        _copy(output_path, os.path.join(tmp_entry, ARTIFACT))
+        with open(os.path.join(tmp_entry, META_FILE), "w") as f:
+            json.dump(dict(meta, created=time.time()), f, default=str)
+        try:
+            os.rename(tmp_entry, os.path.join(self.cache_dir, key))
+        except OSError:
+            # Another process stored the same entry first.
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            meta_path = os.path.join(self.cache_dir, name, META_FILE)
+            if name.startswith(".") or not os.path.exists(meta_path):
+                continue
+            entry = os.path.join(self.cache_dir, name)
+            entries.append((os.path.getmtime(meta_path), _size(entry), name, entry))
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, name, entry in sorted(entries):
+            if total <= self.budget_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def run(self, stage, inputs, params, output_path, produce):
+        """
+        Write the output of a stage to output_path, from the cache when an
+        entry for the same inputs and params exists, otherwise by calling
+        produce() and caching what it wrote. Returns whether it was a hit.
+        """
+        key = self.key(stage, inputs, params)
+        artifact = self.lookup(key)
+        if artifact is not None:
+            _copy(artifact, output_path)
+            print(
+                f"{stage}: reused the cached output for these inputs and settings "
+                f"from {self.cache_dir}",
+                file=sys.stderr,
+            )
+            return True
+        produce()
+        meta = {"stage": stage, "inputs": [os.path.abspath(p) for p in inputs]}
+        self.store(key, output_path, dict(meta, params=params))
+        return False
+
+
+def add_cache_arguments(parser):
+    """
+    Add --cache, --cache-dir and --cache-budget to an argparse parser.
+    """
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse the output of an earlier run with the same input, settings "
+        "and code, and cache this run's output",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=STAGE_CACHE_DIR,
+        help=f"Directory for cached stage outputs (default {STAGE_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache-budget",
+        type=float,
+        default=DEFAULT_BUDGET_BYTES / 1024**3,
+        metavar="GB",
+        help="Evict least recently used outputs beyond this size "
+        f"(default {DEFAULT_BUDGET_BYTES // 1024**3} GB)",
+    )
+
+
+def cache_from_args(args):
+    if not args.cache:
+        return None
+    return StageCache(args.cache_dir, int(args.cache_budget * 1024**3))
@@ -0,0 +1,160 @@
+import csv
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+FIELDNAMES = [
+    "system_name",
+    "x",
+    "y",
+    "z",
+    "distance_from_sol",
+    "body_count",
+    "landable_count",
+    "ring_count",
+    "has_station",
+    "occupation_status",
+]
+
+# Fixed schema for the columnar stats table, so downstream stages never have to
+# infer types from the data.
+STATS_SCHEMA = pa.schema(
+    [
+        ("system_name", pa.string()),
+        ("x", pa.float32()),
+        ("y", pa.float32()),
+        ("z", pa.float32()),
+        ("distance_from_sol", pa.float32()),
+        ("body_count", pa.uint16()),
+        ("landable_count", pa.uint16()),
+        ("ring_count", pa.uint16()),
+        ("has_station", pa.bool_()),
+        ("occupation_status", pa.dictionary(pa.int8(), pa.string())),
+    ]
+)
+
+# Explicit dtypes for the CSV format. Coordinates stay float64 so that values
+# round-trip through CSV unchanged.
+CSV_DTYPES = {
+    "system_name": "string",
+    "x": "float64",
+    "y": "float64",
+    "z": "float64",
+    "distance_from_sol": "float64",
+    "body_count": "int32",
+    "landable_count": "int32",
+    "ring_count": "int32",
+    "has_station": "bool",
+    "occupation_status": "category",
+}
+
+PARQUET_SUFFIXES = (".parquet", ".pq")
+
+
+def stats_format(path):
+    """
+    Return "parquet" or "csv" depending on the file extension of path.
+    """
+    if str(path).lower().endswith(PARQUET_SUFFIXES):
+        return "parquet"
+    return "csv"
+
+
+class CsvStatsWriter:
+    def __init__(self, path, fieldnames=FIELDNAMES, header=True):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        if header:
+            self._writer.writeheader()
+
+    def write_rows(self, rows):
+        self._writer.writerows(rows)
+
+    def write_table(self, table):
+        self._writer.writerows(table.to_pylist())
+
+    def append_part(self, part_path):
+        """
+        Append a headerless part written by another CsvStatsWriter.
+        """
+        with open(part_path, "r", newline="", encoding="utf-8") as part:
+            shutil.copyfileobj(part, self._file)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParquetStatsWriter:
+    def __init__(self, path, schema=STATS_SCHEMA):
+        self._schema = schema
+        self._writer = pq.ParquetWriter(path, schema)
+
+    def write_rows(self, rows):
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self._schema))
+
+    def write_table(self, table):
+        self._writer.write_table(table.select(self._schema.names).cast(self._schema))
+
+    def append_part(self, part_path):
+        """
+        Append the row groups of a part written by another ParquetStatsWriter.
+        """
+        part = pq.ParquetFile(part_path)
+        for i in range(part.num_row_groups):
+            self._writer.write_table(part.read_row_group(i))
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_stats_writer(path, header=True):
+    """
+    Open a batch writer for the stats table, choosing the format from path.
+    """
+    if stats_format(path) == "parquet":
+        return ParquetStatsWriter(path)
+    return CsvStatsWriter(path, header=header)
+
+
+def read_stats(path, columns=None):
+    """
+    Load the stats table (CSV or Parquet) into a DataFrame.
+
+    Only the requested columns are read. Parquet files are read with their
+    stored schema; CSV files are parsed with CSV_DTYPES instead of inferring
+    types from the data.
+    """
+    if stats_format(path) == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    names = columns if columns is not None else FIELDNAMES
+    dtypes = {name: CSV_DTYPES[name] for name in names if name in CSV_DTYPES}
+    return pd.read_csv(path, usecols=columns, dtype=dtypes)
+
+
+def write_stats(df, path):
+    """
+    Write a DataFrame of stats rows as CSV or Parquet, choosing from path.
+    """
+    if stats_format(path) == "parquet":
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        for i, name in enumerate(table.column_names):
+            if name in STATS_SCHEMA.names:
+                field = STATS_SCHEMA.field(name)
+                table = table.set_column(i, field, table.column(i).cast(field.type))
+        pq.write_table(table, path)
+    else:
+        df.to_csv(path, index=False)
@@ -0,0 +1,199 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from coord_store import STATUS_CODES, STATUS_INDEX, encode_statuses
+from stats_io import FIELDNAMES
+
+# Fixed-width part of a stats row. System names live in a shared UTF-8 buffer;
+# name_offset/name_length locate each one in it.
+RECORD_DTYPE = np.dtype(
+    [
+        ("x", np.float64),
+        ("y", np.float64),
+        ("z", np.float64),
+        ("distance_from_sol", np.float64),
+        ("body_count", np.uint16),
+        ("landable_count", np.uint16),
+        ("ring_count", np.uint16),
+        ("has_station", np.bool_),
+        ("occupation_status", np.uint8),
+        ("name_offset", np.uint64),
+        ("name_length", np.uint32),
+    ]
+)
+
+CHUNK_SIZE = 65_536
+
+
+class StatsRecords:
+    """
+    Compact in-memory table of extract_system_stats rows.
+
+    A row takes 52 bytes plus its name in UTF-8, against several hundred for a
+    dict of ten keys. Rows are appended into fixed-size chunks of a NumPy
+    structured array, so growing never copies what is already stored; the
+    chunks are joined once, on first column access.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._chunks = []
+        self._current = np.empty(chunk_size, dtype=RECORD_DTYPE)
+        self._filled = 0
+        self._names = bytearray()
+        self._array = None
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self._chunks) + self._filled
+
+    def _seal(self):
+        self._chunks.append(self._current[: self._filled])
+        self._current = np.empty(self.chunk_size, dtype=RECORD_DTYPE)
+        self._filled = 0
+
+    def append(self, row):
+        """
+        Append one row dict as produced by extract_system_stats.
+        """
+        if self._filled == self.chunk_size:
+            self._seal()
+        name = row["system_name"].encode("utf-8")
+        self._current[self._filled] = (
+            row["x"],
+            row["y"],
+            row["z"],
+            row["distance_from_sol"],
+            row["body_count"],
+            row["landable_count"],
+            row["ring_count"],
+            row["has_station"],
+            STATUS_INDEX[row["occupation_status"]],
+            len(self._names),
+            len(name),
+        )
+        self._names += name
+        self._filled += 1
+        self._array = None
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def extend_frame(self, df):
+        """
+        Append the rows of a DataFrame with the FIELDNAMES columns.
+        """
+        names = [name.encode("utf-8") for name in df["system_name"]]
+        lengths = np.fromiter(map(len, names), dtype=np.uint64, count=len(names))
+        block = np.empty(len(df), dtype=RECORD_DTYPE)
+        for field in FIELDNAMES[1:-1]:
+            block[field] = df[field].to_numpy()
+        block["occupation_status"] = encode_statuses(df["occupation_status"])
+        block["name_offset"] = len(self._names) + np.cumsum(lengths) - lengths
+        block["name_length"] = lengths
+        self._names += b"".join(names)
+
+        if self._filled:
+            self._seal()
+        self._chunks.append(block)
+        self._array = None
+
+    def array(self):
+        """
+        Return all rows as one structured array with RECORD_DTYPE.
+        """
+        if self._array is None:
+            if self._filled:
+                self._seal()
+            if len(self._chunks) != 1:
+                self._chunks = [
+                    (
+                        np.concatenate(self._chunks)
+                        if self._chunks
+                        else np.empty(0, dtype=RECORD_DTYPE)
+                    )
+                ]
+            self._array = self._chunks[0]
+        return self._array
+
+    def column(self, name):
+        return self.array()[name]
+
+    def coords(self):
+        """
+        Return an (n, 3) float64 array of x, y, z.
+        """
+        records = self.array()
+        return np.column_stack([records["x"], records["y"], records["z"]])
+
+    def names(self):
+        records = self.array()
+        names = bytes(self._names)
+        return [
+            names[offset : offset + length].decode("utf-8")
+            for offset, length in zip(
+                records["name_offset"].tolist(), records["name_length"].tolist()
+            )
+        ]
+
+    def sort_order(self, by, descending=True):
+        """
+        Return the stable permutation that sorts the rows by the columns in
+        `by`, first column first.
+        """
+        keys = [self.column(name).astype(np.int64) for name in reversed(by)]
+        if descending:
+            keys = [-key for key in keys]
+        return np.lexsort(keys) if keys else np.arange(len(self))
+
+    def take(self, indices):
+        """
+        Return a new StatsRecords with the rows at indices, in that order.
+        """
+        records = self.array()[indices]
+        names = bytes(self._names)
+        lengths = records["name_length"].astype(np.uint64)
+        taken = StatsRecords(self.chunk_size)
+        taken._names = bytearray(
+            b"".join(
+                names[start : start + length]
+                for start, length in zip(
+                    records["name_offset"].tolist(), lengths.tolist()
+                )
+            )
+        )
+        records["name_offset"] = np.cumsum(lengths) - lengths
+        taken._chunks = [records]
+        return taken
+
+    def to_frame(self):
+        """
+        Return the rows as a DataFrame with the FIELDNAMES columns.
+        """
+        records = self.array()
+        columns = {"system_name": self.names()}
+        for field in FIELDNAMES[1:-1]:
+            columns[field] = records[field]
+        columns["occupation_status"] = pd.Categorical.from_codes(
+            records["occupation_status"], categories=list(STATUS_CODES)
+        )
+        return pd.DataFrame(columns, columns=FIELDNAMES)
+
+    def save(self, path):
+        """
+        Write the rows to a directory that load reads back.
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "records.npy"), self.array())
+        with open(os.path.join(path, "names.utf8"), "wb") as f:
+            f.write(self._names)
+
+    @classmethod
+    def load(cls, path, chunk_size=CHUNK_SIZE):
+        records = cls(chunk_size)
+        records._chunks = [np.load(os.path.join(path, "records.npy"))]
+        with open(os.path.join(path, "names.utf8"), "rb") as f:
+            records._names = bytearray(f.read())
+        return records
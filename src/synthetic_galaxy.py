@@ -0,0 +1,245 @@
+import argparse
+import json
+import math
+import random
+
+# Station types and market id prefixes as seen by detect_occupation_status.
+REGULAR_STATION_TYPES = [
+    "Coriolis Starport",
+    "Orbis Starport",
+    "Ocellus Starport",
+    "Outpost",
+    "Planetary Outpost",
+    "Settlement",
+]
+CONSTRUCTION_STATION_TYPES = [
+    "Orbital Construction Site",
+    "Planetary Construction Site",
+]
+COLONISED_STATION_TYPES = ["Coriolis Starport", "Outpost", "Settlement"]
+
+STAR_SUB_TYPES = [
+    "M (Red dwarf) Star",
+    "K (Yellow-Orange) Star",
+    "G (White-Yellow) Star",
+]
+PLANET_SUB_TYPES = [
+    "High metal content world",
+    "Rocky body",
+    "Icy body",
+    "Rocky ice world",
+    "Gas giant with water based life",
+    "Class I gas giant",
+]
+
+ECONOMIES = ["Industrial", "Extraction", "Agriculture", "High Tech", "Refinery"]
+GOVERNMENTS = ["Democracy", "Corporate", "Dictatorship", "Confederacy"]
+ALLEGIANCES = ["Federation", "Empire", "Alliance", "Independent"]
+
+
+class GalaxySpec:
+    """
+    Shape of a synthetic galaxy.
+
+    A share of the systems (bubble_fraction) is clustered around the origin,
+    like the populated bubble around Sol; the rest are spread over a thin disc.
+    Inside the bubble most systems with stations are occupied; towards its edge
+    colonised and colonising systems take over, as they do in the real galaxy.
+    """
+
+    def __init__(
+        self,
+        systems=10_000,
+        mean_bodies=12,
+        max_bodies=80,
+        station_chance=0.25,
+        max_stations=4,
+        bubble_fraction=0.3,
+        bubble_radius=200.0,
+        disc_radius=40_000.0,
+        disc_height=1_000.0,
+        seed=0,
+    ):
+        if max_bodies > 255:
+            # Body id64s carry the body id in their top bits.
+            raise ValueError("max_bodies must be at most 255")
+        self.systems = systems
+        self.mean_bodies = mean_bodies
+        self.max_bodies = max_bodies
+        self.station_chance = station_chance
+        self.max_stations = max_stations
+        self.bubble_fraction = bubble_fraction
+        self.bubble_radius = bubble_radius
+        self.disc_radius = disc_radius
+        self.disc_height = disc_height
+        self.seed = seed
+
+
+def _coords(rng, spec):
+    if rng.random() < spec.bubble_fraction:
+        sigma = spec.bubble_radius / 2
+        return {
+            "x": rng.gauss(0, sigma),
+            "y": rng.gauss(0, sigma / 3),
+            "z": rng.gauss(0, sigma),
+        }
+    radius = spec.disc_radius * math.sqrt(rng.random())
+    angle = rng.random() * 2 * math.pi
+    return {
+        "x": radius * math.cos(angle),
+        "y": rng.uniform(-spec.disc_height, spec.disc_height),
+        "z": radius * math.sin(angle),
+    }
+
+
+def _body(rng, id64, system_name, body_id, update_time):
+    is_star = body_id == 0 or rng.random() < 0.05
+    body = {
+        "id64": id64 + (body_id << 55),
+        "bodyId": body_id,
+        "name": system_name if body_id == 0 else f"{system_name} {body_id}",
+        "type": "Star" if is_star else "Planet",
+        "subType": rng.choice(STAR_SUB_TYPES if is_star else PLANET_SUB_TYPES),
+        "distanceToArrival": 0.0 if body_id == 0 else rng.uniform(5, 200_000),
+        "mainStar": body_id == 0,
+        "surfaceTemperature": rng.uniform(20, 8_000),
+        "orbitalPeriod": rng.uniform(0.1, 10_000),
+        "semiMajorAxis": rng.uniform(0.001, 100),
+        "updateTime": update_time,
+    }
+    if is_star:
+        body["age"] = rng.randint(1, 13_000)
+        body["solarMasses"] = rng.uniform(0.1, 3)
+    else:
+        body["isLandable"] = rng.random() < 0.45
+    if rng.random() < 0.15:
+        body["rings"] = [
+            {"name": f"{body['name']} A Ring", "type": rng.choice(["Icy", "Rocky"])}
+        ]
+    return body
+
+
+def _stations(rng, spec, id64, system_name, distance, update_time):
+    if rng.random() >= spec.station_chance:
+        return []
+    # Occupied systems dominate inside the bubble, colonisation near its edge.
+    edge = min(1.0, distance / (spec.bubble_radius * 1.5))
+    roll = rng.random()
+    if distance > spec.bubble_radius * 3:
+        kind = "colonising" if roll < 0.05 else "none"
+    elif roll < 0.8 * (1 - edge):
+        kind = "occupied"
+    elif roll < 0.8 * (1 - edge) + 0.5 * edge:
+        kind = "colonised"
+    else:
+        kind = "colonising"
+    if kind == "none":
+        return []
+
+    stations = []
+    for i in range(rng.randint(1, spec.max_stations)):
+        if kind == "occupied":
+            market_id = rng.randint(3_220_000_000, 3_229_999_999)
+            station_type = rng.choice(REGULAR_STATION_TYPES)
+        elif kind == "colonised":
+            market_id = rng.randint(4_200_000_000, 4_299_999_999)
+            station_type = rng.choice(COLONISED_STATION_TYPES)
+        else:
+            market_id = rng.randint(3_950_000_000, 3_969_999_999)
+            station_type = rng.choice(CONSTRUCTION_STATION_TYPES)
+        stations.append(
+            {
+                "id": market_id,
+                "name": f"{system_name} Station {i}",
+                "market_id": market_id,
+                "type": station_type,
+                "distanceToArrival": rng.uniform(5, 5_000),
+                "controllingFaction": f"{system_name} Faction",
+                "primaryEconomy": rng.choice(ECONOMIES),
+                "government": rng.choice(GOVERNMENTS),
+                "updateTime": update_time,
+            }
+        )
+    return stations
+
+
+def iter_galaxy(spec):
+    """
+    Yield Spansh-shaped system dicts. The same spec always yields the same systems.
+    """
+    rng = random.Random(spec.seed)
+    for i in range(spec.systems):
+        id64 = i * 8 + 1
+        name = f"Synthetic Sector {i // 1000}-{i % 1000}"
+        coords = _coords(rng, spec)
+        distance = math.sqrt(coords["x"] ** 2 + coords["y"] ** 2 + coords["z"] ** 2)
+        date = f"2025-0{rng.randint(1, 9)}-{rng.randint(10, 28)} 12:00:00+00"
+        body_count = min(spec.max_bodies, int(rng.expovariate(1 / spec.mean_bodies)))
+        stations = _stations(rng, spec, id64, name, distance, date)
+        yield {
+            "id64": id64,
+            "name": name,
+            "coords": coords,
+            "allegiance": rng.choice(ALLEGIANCES) if stations else None,
+            "government": rng.choice(GOVERNMENTS) if stations else None,
+            "primaryEconomy": rng.choice(ECONOMIES) if stations else None,
+            "security": "Medium" if stations else "Anarchy",
+            "population": rng.randint(1_000, 10**9) if stations else 0,
+            "date": date,
+            "bodies": [_body(rng, id64, name, b, date) for b in range(body_count)],
+            "stations": stations,
+        }
+
+
+def write_galaxy(path, spec):
+    """
+    Write a synthetic dump in the Spansh layout: a JSON array with one system
+    per line.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i, system in enumerate(iter_galaxy(spec)):
+            if i:
+                f.write(",\n")
+            f.write(json.dumps(system))
+        f.write("\n]\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a deterministic Spansh-shaped galaxy JSON dump"
+    )
+    parser.add_argument("output", help="Path to output galaxy JSON file")
+    parser.add_argument("--systems", type=int, default=10_000)
+    parser.add_argument("--mean-bodies", type=float, default=12)
+    parser.add_argument("--max-bodies", type=int, default=80)
+    parser.add_argument(
+        "--station-chance",
+        type=float,
+        default=0.25,
+        help="Probability that a system has stations",
+    )
+    parser.add_argument("--max-stations", type=int, default=4)
+    parser.add_argument(
+        "--bubble-fraction",
+        type=float,
+        default=0.3,
+        help="Share of systems clustered around the bubble",
+    )
+    parser.add_argument("--bubble-radius", type=float, default=200.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_galaxy(
+        args.output,
+        GalaxySpec(
+            systems=args.systems,
+            mean_bodies=args.mean_bodies,
+            max_bodies=args.max_bodies,
+            station_chance=args.station_chance,
+            max_stations=args.max_stations,
+            bubble_fraction=args.bubble_fraction,
+            bubble_radius=args.bubble_radius,
+            seed=args.seed,
+        ),
+    )
@@ -0,0 +1,1405 @@
+import duckdb
+import json
+import os
+import sys
+from datetime import datetime
+import ijson
+import pprint
+import shutil
+import argparse
+import pyarrow as pa
+
+from dump_io import open_dump
+from extract_system_stats import distance_from_sol, extract_system_stats
+from filter_candidate_systems import (
+    add_filter_arguments,
+    build_filter_conditions,
+    config_from_args,
+)
+from metrics import NULL_METRICS, add_metrics_arguments, metrics_from_args
+from ranking import add_ranking_arguments, rank_frame, score_from_args
+from stats_io import FIELDNAMES, write_stats
+
+# Path to the DuckDB database file
+DB_PATH = "spansh_data.db"
+
+# Directory of Parquet snapshots: one base and the deltas since
+SNAPSHOT_DIR = "snapshots"
+SNAPSHOT_MANIFEST = "manifest.json"
+
+# Number of systems collected into one columnar batch by the bulk loader
+BULK_BATCH_SIZE = 50_000
+
+# Staging schemas for the bulk loader, in the column order of the target tables.
+# `seq` records arrival order so that the last occurrence of a key wins, as it
+# does when rows are upserted one at a time.
+SYSTEMS_STAGING_SCHEMA = pa.schema(
+    [
+        ("system_id", pa.int64()),
+        ("name", pa.string()),
+        ("x", pa.float64()),
+        ("y", pa.float64()),
+        ("z", pa.float64()),
+        ("allegiance", pa.string()),
+        ("government", pa.string()),
+        ("primary_economy", pa.string()),
+        ("secondary_economy", pa.string()),
+        ("security", pa.string()),
+        ("population", pa.int64()),
+        ("date", pa.string()),
+        ("seq", pa.int64()),
+    ]
+)
+
+BODIES_STAGING_SCHEMA = pa.schema(
+    [
+        ("body_id", pa.int64()),
+        ("system_id", pa.int64()),
+        ("name", pa.string()),
+        ("type", pa.string()),
+        ("sub_type", pa.string()),
+        ("distance_to_arrival", pa.float64()),
+        ("main_star", pa.bool_()),
+        ("age", pa.int64()),
+        ("spectral_class", pa.string()),
+        ("luminosity", pa.string()),
+        ("absolute_magnitude", pa.float64()),
+        ("solar_masses", pa.float64()),
+        ("solar_radius", pa.float64()),
+        ("surface_temperature", pa.float64()),
+        ("rotational_period", pa.float64()),
+        ("axial_tilt", pa.float64()),
+        ("orbital_period", pa.float64()),
+        ("semi_major_axis", pa.float64()),
+        ("orbital_eccentricity", pa.float64()),
+        ("orbital_inclination", pa.float64()),
+        ("arg_of_periapsis", pa.float64()),
+        ("mean_anomaly", pa.float64()),
+        ("ascending_node", pa.float64()),
+        ("update_time", pa.string()),
+        ("seq", pa.int64()),
+    ]
+)
+
+STATIONS_STAGING_SCHEMA = pa.schema(
+    [
+        ("station_id", pa.int64()),
+        ("system_id", pa.int64()),
+        ("name", pa.string()),
+        ("type", pa.string()),
+        ("controlling_faction", pa.string()),
+        ("controlling_faction_state", pa.string()),
+        ("distance_to_arrival", pa.float64()),
+        ("primary_economy", pa.string()),
+        ("government", pa.string()),
+        ("update_time", pa.string()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("seq", pa.int64()),
+    ]
+)
+
+SYSTEM_STATS_STAGING_SCHEMA = pa.schema(
+    [
+        ("system_id", pa.int64()),
+        ("x", pa.float64()),
+        ("y", pa.float64()),
+        ("z", pa.float64()),
+        ("distance_from_sol", pa.float64()),
+        ("body_count", pa.int32()),
+        ("landable_count", pa.int32()),
+        ("ring_count", pa.int32()),
+        ("has_station", pa.bool_()),
+        ("occupation_status", pa.string()),
+        ("seq", pa.int64()),
+    ]
+)
+
+
+def get_connection(db_path=None):
+    """
+    Establish and return a connection to the DuckDB database.
+    """
+    return duckdb.connect(db_path or DB_PATH)
+
+
+def initialize_database(db_path=None):
+    """
+    Create tables in the DuckDB database if they don't already exist.
+    """
+    conn = get_connection(db_path)
+    create_systems_table = """
+    CREATE TABLE IF NOT EXISTS systems (
+        system_id BIGINT PRIMARY KEY,
+        name TEXT,
+        x DECIMAL,
+        y DECIMAL,
+        z DECIMAL,
+        allegiance TEXT,
+        government TEXT,
+        primary_economy TEXT,
+        secondary_economy TEXT,
+        security TEXT,
+        population BIGINT,
+        date TIMESTAMP,
+        load_id BIGINT
+    );
+    """
+    create_bodies_table = """
+    CREATE TABLE IF NOT EXISTS bodies (
+        body_id BIGINT PRIMARY KEY,
+        system_id BIGINT REFERENCES systems(system_id),
+        name TEXT,
+        type TEXT,
+        sub_type TEXT,
+        distance_to_arrival DECIMAL,
+        main_star BOOLEAN,
+        age BIGINT,
+        spectral_class TEXT,
+        luminosity TEXT,
+        absolute_magnitude DECIMAL,
+        solar_masses DECIMAL,
+        solar_radius DECIMAL,
+        surface_temperature DECIMAL,
+        rotational_period DECIMAL,
+        axial_tilt DECIMAL,
+        orbital_period DECIMAL,
+        semi_major_axis DECIMAL,
+        orbital_eccentricity DECIMAL,
+        orbital_inclination DECIMAL,
+        arg_of_periapsis DECIMAL,
+        mean_anomaly DECIMAL,
+        ascending_node DECIMAL,
+        update_time TIMESTAMP,
+        load_id BIGINT
+    );
+    """
+    create_stations_table = """
+    CREATE TABLE IF NOT EXISTS stations (
+        station_id BIGINT PRIMARY KEY,
+        system_id BIGINT REFERENCES systems(system_id),
+        name TEXT,
+        type TEXT,
+        controlling_faction TEXT,
+        controlling_faction_state TEXT,
+        distance_to_arrival DECIMAL,
+        primary_economy TEXT,
+        government TEXT,
+        update_time TIMESTAMP,
+        latitude DECIMAL,
+        longitude DECIMAL,
+        load_id BIGINT
+    );
+    """
+    # Per-system aggregates as computed by extract_system_stats. The bodies
+    # table does not keep isLandable or rings, so these come from the dump and
+    # are written with the system's other rows.
+    create_system_stats_table = """
+    CREATE TABLE IF NOT EXISTS system_stats (
+        system_id BIGINT PRIMARY KEY REFERENCES systems(system_id),
+        x DOUBLE,
+        y DOUBLE,
+        z DOUBLE,
+        distance_from_sol DOUBLE,
+        body_count INTEGER,
+        landable_count INTEGER,
+        ring_count INTEGER,
+        has_station BOOLEAN,
+        occupation_status TEXT,
+        load_id BIGINT
+    );
+    """
+    # One row per load. Every row of the tables above carries the load_id of
+    # the load that last wrote it, which is what snapshots select deltas by.
+    create_loads_table = """
+    CREATE SEQUENCE IF NOT EXISTS load_ids;
+    CREATE TABLE IF NOT EXISTS loads (
+        load_id BIGINT PRIMARY KEY,
+        source TEXT,
+        started TIMESTAMP
+    );
+    """
+    conn.execute(create_systems_table)
+    conn.execute(create_bodies_table)
+    conn.execute(create_stations_table)
+    conn.execute(create_system_stats_table)
+    conn.execute(create_loads_table)
+    # Databases created before loads were tracked; their rows keep a NULL
+    # load_id until they are next written.
+    for table in SNAPSHOT_TABLES:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS load_id BIGINT")
+    conn.close()
+
+
+def _start_load(conn, source):
+    """
+    Record a new load of `source` and return its load_id, which every row the
+    load inserts or updates is stamped with.
+    """
+    return conn.execute(
+        "INSERT INTO loads VALUES (nextval('load_ids'), ?, now()) RETURNING load_id",
+        [str(source)],
+    ).fetchone()[0]
+
+
+def update_from_json(json_file, metrics=NULL_METRICS):
+    """
+    Update records in the database from a large JSON data dump file using incremental parsing.
+
+    Each system is written in one transaction with its bodies, stations and
+    system_stats row, so a failure never leaves a system half updated or its
+    stats out of step. One commit per system instead of one per statement is
+    also faster.
+    """
+    conn = get_connection()
+    load_id = _start_load(conn, json_file)
+
+    # Open the JSON file and parse it incrementally
+    with open_dump(json_file) as f:
+        # Parse the JSON array incrementally
+        systems = ijson.items(
+            f, "item"
+        )  # Assumes the JSON file contains an array of systems
+
+        for system in metrics.timed("parse", systems):
+            # The system, its bodies, stations and stats are written together.
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                _upsert_system(conn, system, load_id)
+                conn.execute(
+                    SYSTEM_STATS_UPSERT_SQL, _system_stats_record(system) + (load_id,)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    metrics.add("parse", bytes=os.path.getsize(json_file))
+    conn.close()
+    print("Database updated from JSON file.")
+
+
+def _upsert_system(conn, system, load_id):
+    """
+    Upsert one system with its bodies and stations, one statement per row,
+    stamping each row with load_id.
+    """
+    # Insert or update systems
+    system_query = """
+    INSERT INTO systems (system_id, name, x, y, z, allegiance, government, primary_economy, secondary_economy, security, population, date, load_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (system_id) DO UPDATE SET
+        name=excluded.name,
+        x=excluded.x,
+        y=excluded.y,
+        z=excluded.z,
+        allegiance=excluded.allegiance,
+        government=excluded.government,
+        primary_economy=excluded.primary_economy,
+        secondary_economy=excluded.secondary_economy,
+        security=excluded.security,
+        population=excluded.population,
+        date=excluded.date,
+        load_id=excluded.load_id;
+    """
+    conn.execute(
+        system_query,
+        (
+            system["id64"],
+            system["name"],
+            system["coords"]["x"],
+            system["coords"]["y"],
+            system["coords"]["z"],
+            system.get("allegiance", None),
+            system.get("government", None),
+            system.get("primaryEconomy", None),
+            system.get("secondaryEconomy", None),
+            system.get("security", None),
+            system.get("population", 0),
+            system["date"],
+            load_id,
+        ),
+    )
+
+    # Insert or update bodies
+    for body in system.get("bodies", []):
+        body_query = """
+        INSERT INTO bodies (body_id, system_id, name, type, sub_type, distance_to_arrival, main_star, age, spectral_class, luminosity, absolute_magnitude, solar_masses, solar_radius, surface_temperature, rotational_period, axial_tilt, orbital_period, semi_major_axis, orbital_eccentricity, orbital_inclination, arg_of_periapsis, mean_anomaly, ascending_node, update_time, load_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (body_id) DO UPDATE SET
+            name=excluded.name,
+            type=excluded.type,
+            sub_type=excluded.sub_type,
+            distance_to_arrival=excluded.distance_to_arrival,
+            main_star=excluded.main_star,
+            age=excluded.age,
+            spectral_class=excluded.spectral_class,
+            luminosity=excluded.luminosity,
+            absolute_magnitude=excluded.absolute_magnitude,
+            solar_masses=excluded.solar_masses,
+            solar_radius=excluded.solar_radius,
+            surface_temperature=excluded.surface_temperature,
+            rotational_period=excluded.rotational_period,
+            axial_tilt=excluded.axial_tilt,
+            orbital_period=excluded.orbital_period,
+            semi_major_axis=excluded.semi_major_axis,
+            orbital_eccentricity=excluded.orbital_eccentricity,
+            orbital_inclination=excluded.orbital_inclination,
+            arg_of_periapsis=excluded.arg_of_periapsis,
+            mean_anomaly=excluded.mean_anomaly,
+            ascending_node=excluded.ascending_node,
+            update_time=excluded.update_time,
+            load_id=excluded.load_id;
+        """
+
+        conn.execute(
+            body_query,
+            (
+                body["id64"],
+                system["id64"],
+                body["name"],
+                body["type"],
+                body.get("subType"),
+                body.get("distanceToArrival"),
+                # An explicit null counts as absent, as it must in the native
+                # engine, whose JSON reader cannot tell the two apart.
+                body.get("mainStar") or False,
+                body.get("age"),
+                body.get("spectralClass"),
+                body.get("luminosity"),
+                body.get("absoluteMagnitude"),
+                body.get("solarMasses"),
+                body.get("solarRadius"),
+                body.get("surfaceTemperature"),
+                body.get("rotationalPeriod"),
+                body.get("axialTilt"),
+                body.get("orbitalPeriod"),
+                body.get("semiMajorAxis"),
+                body.get("orbitalEccentricity"),
+                body.get("orbitalInclination"),
+                body.get("argOfPeriapsis"),
+                body.get("meanAnomaly"),
+                body.get("ascendingNode"),
+                body["updateTime"],
+                load_id,
+            ),
+        )
+
+    # Insert or update stations
+    for station in system.get("stations", []):
+        station_query = """
+        INSERT INTO stations (station_id, system_id, name, type, controlling_faction, controlling_faction_state, distance_to_arrival, primary_economy, government, update_time, latitude, longitude, load_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (station_id) DO UPDATE SET
+            name=excluded.name,
+            type=excluded.type,
+            controlling_faction=excluded.controlling_faction,
+            controlling_faction_state=excluded.controlling_faction_state,
+            distance_to_arrival=excluded.distance_to_arrival,
+            primary_economy=excluded.primary_economy,
+            government=excluded.government,
+            update_time=excluded.update_time,
+            latitude=excluded.latitude,
+            longitude=excluded.longitude,
+            load_id=excluded.load_id;
+        """
+
+        if (
+            station.get("distanceToArrival") is None
+            and station.get("latitude") is None
+            and station.get("longitude") is None
+        ):
+            print(
+                f"Station {station['name']} in system {system['name']} has not distanceToArrival, latitude, or longitude value."
+            )
+            pprint.pprint(station)
+            break
+
+        conn.execute(
+            station_query,
+            (
+                station["id"],
+                system["id64"],
+                station["name"],
+                station.get("type"),
+                station.get("controllingFaction"),
+                station.get("controllingFactionState"),
+                station.get("distanceToArrival"),
+                station.get("primaryEconomy"),
+                station.get("government"),
+                station["updateTime"],
+                station.get("latitude"),
+                station.get("longitude"),
+                load_id,
+            ),
+        )
+
+        # @TODO Process the stations's market, services and economies
+
+
+def _system_record(system):
+    return (
+        system["id64"],
+        system["name"],
+        system["coords"]["x"],
+        system["coords"]["y"],
+        system["coords"]["z"],
+        system.get("allegiance", None),
+        system.get("government", None),
+        system.get("primaryEconomy", None),
+        system.get("secondaryEconomy", None),
+        system.get("security", None),
+        system.get("population", 0),
+        system["date"],
+    )
+
+
+def _body_record(system, body):
+    return (
+        body["id64"],
+        system["id64"],
+        body["name"],
+        body["type"],
+        body.get("subType"),
+        body.get("distanceToArrival"),
+        body.get("mainStar") or False,
+        body.get("age"),
+        body.get("spectralClass"),
+        body.get("luminosity"),
+        body.get("absoluteMagnitude"),
+        body.get("solarMasses"),
+        body.get("solarRadius"),
+        body.get("surfaceTemperature"),
+        body.get("rotationalPeriod"),
+        body.get("axialTilt"),
+        body.get("orbitalPeriod"),
+        body.get("semiMajorAxis"),
+        body.get("orbitalEccentricity"),
+        body.get("orbitalInclination"),
+        body.get("argOfPeriapsis"),
+        body.get("meanAnomaly"),
+        body.get("ascendingNode"),
+        body["updateTime"],
+    )
+
+
+def _station_records(system):
+    """
+    Yield the station rows of a system, stopping at the first station without a
+    position, as update_from_json does.
+    """
+    for station in system.get("stations", []):
+        if (
+            station.get("distanceToArrival") is None
+            and station.get("latitude") is None
+            and station.get("longitude") is None
+        ):
+            print(
+                f"Station {station['name']} in system {system['name']} has not distanceToArrival, latitude, or longitude value."
+            )
+            return
+        yield (
+            station["id"],
+            system["id64"],
+            station["name"],
+            station.get("type"),
+            station.get("controllingFaction"),
+            station.get("controllingFactionState"),
+            station.get("distanceToArrival"),
+            station.get("primaryEconomy"),
+            station.get("government"),
+            station["updateTime"],
+            station.get("latitude"),
+            station.get("longitude"),
+        )
+
+
+def _system_stats_record(system):
+    """
+    Return the system_stats row of a system, computed by extract_system_stats
+    from all of its bodies and stations.
+    """
+    stats = extract_system_stats(system)
+    # The row loader parses numbers as Decimal; convert first so the distance
+    # is computed in floating point, exactly as from a float parse.
+    x, y, z = (float(stats[axis]) for axis in "xyz")
+    return (
+        system["id64"],
+        x,
+        y,
+        z,
+        distance_from_sol(x, y, z),
+        stats["body_count"],
+        stats["landable_count"],
+        stats["ring_count"],
+        stats["has_station"],
+        stats["occupation_status"],
+    )
+
+
+class _ColumnBatch:
+    """
+    Accumulate row tuples column by column and hand them out as an Arrow table.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.clear()
+
+    def clear(self):
+        self.columns = [[] for _ in self.schema]
+        self.seq = self.columns[-1]
+
+    def append(self, record):
+        for column, value in zip(self.columns, record):
+            column.append(value)
+        self.seq.append(len(self.seq))
+
+    def __len__(self):
+        return len(self.seq)
+
+    def to_arrow(self):
+        return pa.table(
+            [pa.array(c, type=f.type) for c, f in zip(self.columns, self.schema)],
+            schema=self.schema,
+        )
+
+
+def _staging_columns(schema):
+    return [field.name for field in schema if field.name != "seq"]
+
+
+def _upsert_from_staging_sql(
+    table, key, staging, columns, update_columns, changed_only=False
+):
+    """
+    Build a set-based upsert of `table` from the relation `staging`.
+
+    Rows are deduplicated on `key` first, keeping the last one staged, because a
+    single INSERT cannot update the same row twice. With changed_only, rows
+    whose system is not listed in changed_systems are left out. Every row
+    written is stamped with the load_id given as the statement's parameter.
+    """
+    assignments = ",\n        ".join(
+        f"{c}=excluded.{c}" for c in [*update_columns, "load_id"]
+    )
+    where = (
+        "WHERE system_id IN (SELECT system_id FROM changed_systems)"
+        if changed_only
+        else ""
+    )
+    return f"""
+    INSERT INTO {table} ({", ".join(columns)}, load_id)
+    SELECT {", ".join(columns)}, CAST(? AS BIGINT)
+    FROM {staging}
+    {where}
+    QUALIFY row_number() OVER (PARTITION BY {key} ORDER BY seq DESC) = 1
+    ON CONFLICT ({key}) DO UPDATE SET
+        {assignments};
+    """
+
+
+# Set-based counterparts of the per-row statements in update_from_json. As there,
+# bodies and stations keep their original system_id on update.
+SYSTEM_COLUMNS = _staging_columns(SYSTEMS_STAGING_SCHEMA)
+BODY_COLUMNS = _staging_columns(BODIES_STAGING_SCHEMA)
+STATION_COLUMNS = _staging_columns(STATIONS_STAGING_SCHEMA)
+SYSTEM_STATS_COLUMNS = _staging_columns(SYSTEM_STATS_STAGING_SCHEMA)
+
+SYSTEM_STATS_UPSERT_SQL = f"""
+INSERT INTO system_stats ({", ".join(SYSTEM_STATS_COLUMNS)}, load_id)
+VALUES ({", ".join("?" for _ in SYSTEM_STATS_COLUMNS)}, ?)
+ON CONFLICT (system_id) DO UPDATE SET
+    {", ".join(f"{c}=excluded.{c}" for c in [*SYSTEM_STATS_COLUMNS[1:], "load_id"])};
+"""
+
+
+def _upsert_statements(changed_only):
+    return [
+        _upsert_from_staging_sql(
+            "systems",
+            "system_id",
+            "staging_systems",
+            SYSTEM_COLUMNS,
+            SYSTEM_COLUMNS[1:],
+            changed_only,
+        ),
+        _upsert_from_staging_sql(
+            "bodies",
+            "body_id",
+            "staging_bodies",
+            BODY_COLUMNS,
+            BODY_COLUMNS[2:],
+            changed_only,
+        ),
+        _upsert_from_staging_sql(
+            "stations",
+            "station_id",
+            "staging_stations",
+            STATION_COLUMNS,
+            STATION_COLUMNS[2:],
+            changed_only,
+        ),
+        _upsert_from_staging_sql(
+            "system_stats",
+            "system_id",
+            "staging_system_stats",
+            SYSTEM_STATS_COLUMNS,
+            SYSTEM_STATS_COLUMNS[1:],
+            changed_only,
+        ),
+    ]
+
+
+UPSERT_SQL = _upsert_statements(changed_only=False)
+UPSERT_CHANGED_SQL = _upsert_statements(changed_only=True)
+
+# Staged systems that are new, or newer than what is stored. Each stored row
+# keeps its own high-water mark: a system counts as changed when its `date` is
+# newer than the stored one, or when any of its bodies or stations is new or
+# has a newer `updateTime` than the stored row, as happens when a body is
+# rescanned without the system's own date moving.
+CHANGED_SYSTEMS_SQL = """
+CREATE OR REPLACE TEMP TABLE changed_systems AS
+WITH staged AS (
+    SELECT system_id, CAST(date AS TIMESTAMP) AS date
+    FROM staging_systems
+    QUALIFY row_number() OVER (PARTITION BY system_id ORDER BY seq DESC) = 1
+),
+changed_children AS (
+    SELECT staged.system_id
+    FROM staging_bodies AS staged
+    LEFT JOIN bodies AS stored USING (body_id)
+    WHERE stored.body_id IS NULL
+        OR stored.update_time IS NULL
+        OR CAST(staged.update_time AS TIMESTAMP) > stored.update_time
+    UNION
+    SELECT staged.system_id
+    FROM staging_stations AS staged
+    LEFT JOIN stations AS stored USING (station_id)
+    WHERE stored.station_id IS NULL
+        OR stored.update_time IS NULL
+        OR CAST(staged.update_time AS TIMESTAMP) > stored.update_time
+)
+SELECT staged.system_id, stored.system_id IS NULL AS inserted
+FROM staged
+LEFT JOIN systems AS stored USING (system_id)
+LEFT JOIN system_stats AS stats USING (system_id)
+WHERE stored.system_id IS NULL
+    OR stored.date IS NULL
+    OR staged.date > stored.date
+    OR staged.system_id IN (SELECT system_id FROM changed_children)
+    -- Stored before system_stats existed: load it once to fill its stats in.
+    OR stats.system_id IS NULL;
+"""
+
+# Staged systems that are not stored yet, for the counts of a full load.
+NEW_SYSTEMS_SQL = """
+SELECT count(DISTINCT staged.system_id)
+FROM staging_systems AS staged
+LEFT JOIN systems AS stored USING (system_id)
+WHERE stored.system_id IS NULL;
+"""
+
+
+def _merge_staging(conn, load_id, incremental=False):
+    """
+    Upsert the rows in staging_systems, staging_bodies, staging_stations and
+    staging_system_stats into the target tables in a single transaction, so
+    system_stats never disagrees with the rows it summarises. Written rows are
+    stamped with load_id.
+
+    Returns the number of systems inserted, updated and skipped. Systems are
+    only skipped in incremental mode, when neither they nor any of their bodies
+    and stations are newer than the stored rows.
+    """
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        staged_count = conn.execute(
+            "SELECT count(DISTINCT system_id) FROM staging_systems"
+        ).fetchone()[0]
+        if incremental:
+            conn.execute(CHANGED_SYSTEMS_SQL)
+            inserted, changed = conn.execute(
+                "SELECT count(*) FILTER (WHERE inserted), count(*) FROM changed_systems"
+            ).fetchone()
+        else:
+            inserted = conn.execute(NEW_SYSTEMS_SQL).fetchone()[0]
+            changed = staged_count
+        for statement in UPSERT_CHANGED_SQL if incremental else UPSERT_SQL:
+            conn.execute(statement, [load_id])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    return inserted, changed - inserted, staged_count - changed
+
+
+STAGING_NAMES = (
+    "staging_systems",
+    "staging_bodies",
+    "staging_stations",
+    "staging_system_stats",
+)
+
+
+def _flush_batches(conn, batches, load_id, incremental=False):
+    """
+    Merge one batch of parsed rows through the staging relations. `batches`
+    holds the _ColumnBatch of each name in STAGING_NAMES, in that order.
+    """
+    for name, batch in zip(STAGING_NAMES, batches):
+        conn.register(name, batch.to_arrow())
+    try:
+        return _merge_staging(conn, load_id, incremental)
+    finally:
+        for name, batch in zip(STAGING_NAMES, batches):
+            conn.unregister(name)
+            batch.clear()
+
+
+def bulk_update_from_json(
+    json_file, batch_size=BULK_BATCH_SIZE, incremental=False, metrics=NULL_METRICS
+):
+    """
+    Update records in the database from a JSON data dump using set-based upserts.
+
+    Parsed records are collected into columnar batches of batch_size systems
+    and each batch is merged into the systems, bodies, stations and system_stats
+    tables with one statement per table. The resulting table contents match update_from_json.
+
+    With incremental, systems are skipped together with their bodies and
+    stations unless the system's `date`, or the `updateTime` of one of its
+    bodies or stations, is newer than the stored row (see CHANGED_SYSTEMS_SQL),
+    so applying a 7-day or 1-day delta only writes what changed.
+
+    Returns a dict with the number of systems inserted, updated and skipped.
+    """
+    conn = get_connection()
+    load_id = _start_load(conn, json_file)
+    systems = _ColumnBatch(SYSTEMS_STAGING_SCHEMA)
+    bodies = _ColumnBatch(BODIES_STAGING_SCHEMA)
+    stations = _ColumnBatch(STATIONS_STAGING_SCHEMA)
+    system_stats = _ColumnBatch(SYSTEM_STATS_STAGING_SCHEMA)
+    counts = {"inserted": 0, "updated": 0, "skipped": 0}
+
+    def flush():
+        with metrics.phase("merge") as stats:
+            stats.records += len(systems)
+            stats.batches += 1
+            inserted, updated, skipped = _flush_batches(
+                conn, (systems, bodies, stations, system_stats), load_id, incremental
+            )
+        counts["inserted"] += inserted
+        counts["updated"] += updated
+        counts["skipped"] += skipped
+
+    with open_dump(json_file) as f:
+        for system in metrics.timed("parse", ijson.items(f, "item", use_float=True)):
+            systems.append(_system_record(system))
+            for body in system.get("bodies", []):
+                bodies.append(_body_record(system, body))
+            for record in _station_records(system):
+                stations.append(record)
+            system_stats.append(_system_stats_record(system))
+
+            if len(systems) >= batch_size:
+                flush()
+
+    if len(systems):
+        flush()
+
+    metrics.add("parse", bytes=os.path.getsize(json_file))
+    conn.close()
+    print("Database updated from JSON file.")
+    print(
+        f"Systems inserted: {counts['inserted']}, updated: {counts['updated']}, "
+        f"skipped: {counts['skipped']}"
+    )
+    return counts
+
+
+# Fields read from the dump by the native loader, as DuckDB types. Anything not
+# listed here is never materialised.
+NATIVE_JSON_COLUMNS = {
+    "id64": "BIGINT",
+    "name": "VARCHAR",
+    "coords": "STRUCT(x DOUBLE, y DOUBLE, z DOUBLE)",
+    "allegiance": "VARCHAR",
+    "government": "VARCHAR",
+    "primaryEconomy": "VARCHAR",
+    "secondaryEconomy": "VARCHAR",
+    "security": "VARCHAR",
+    "population": "BIGINT",
+    "date": "VARCHAR",
+    "bodies": """STRUCT(
+        id64 BIGINT, name VARCHAR, type VARCHAR, "subType" VARCHAR,
+        "distanceToArrival" DOUBLE, "mainStar" BOOLEAN, age BIGINT,
+        "spectralClass" VARCHAR, luminosity VARCHAR, "absoluteMagnitude" DOUBLE,
+        "solarMasses" DOUBLE, "solarRadius" DOUBLE, "surfaceTemperature" DOUBLE,
+        "rotationalPeriod" DOUBLE, "axialTilt" DOUBLE, "orbitalPeriod" DOUBLE,
+        "semiMajorAxis" DOUBLE, "orbitalEccentricity" DOUBLE,
+        "orbitalInclination" DOUBLE, "argOfPeriapsis" DOUBLE,
+        "meanAnomaly" DOUBLE, "ascendingNode" DOUBLE, "updateTime" VARCHAR,
+        "isLandable" BOOLEAN, rings STRUCT(name VARCHAR)[]
+    )[]""",
+    "stations": """STRUCT(
+        id BIGINT, name VARCHAR, type VARCHAR, "controllingFaction" VARCHAR,
+        "controllingFactionState" VARCHAR, "distanceToArrival" DOUBLE,
+        "primaryEconomy" VARCHAR, government VARCHAR, "updateTime" VARCHAR,
+        latitude DOUBLE, longitude DOUBLE, market_id BIGINT
+    )[]""",
+}
+
+# The dump as read by DuckDB, one row per system, parsed once into a temporary
+# table that the staging relations below are derived from. With
+# preserve_insertion_order (set explicitly by native_update_from_json) the
+# parallel scan still inserts rows in file order, so the table's rowid is the
+# system's position in the file and repeated keys resolve to the last
+# occurrence as in the other loaders, without a window over the whole scan.
+# `first_unplaced` is the position of the first station without a position: it
+# and the stations after it are skipped, as in update_from_json.
+NATIVE_DUMP_SQL = """
+CREATE OR REPLACE TEMP TABLE native_dump AS
+SELECT
+    *,
+    list_position(
+        list_transform(
+            stations,
+            st -> st."distanceToArrival" IS NULL
+                AND st.latitude IS NULL
+                AND st.longitude IS NULL
+        ),
+        true
+    ) AS first_unplaced
+FROM read_json(
+    {path}, format = 'auto', columns = {columns}, maximum_object_size = 268435456
+);
+"""
+
+# Bodies and stations are numbered by their system's seq and their position in
+# it, so the ordering needs no sort; no system has NATIVE_SEQ_STRIDE of either.
+NATIVE_SEQ_STRIDE = 1_000_000
+
+NATIVE_STAGING_SQL = [
+    # One flat row per system: its columns, its system_stats (extract_system_stats
+    # in SQL: counts over all bodies, and the status from every station, placed
+    # or not, classified as detect_occupation_status does) and the first
+    # station without a position, for the warning.
+    """
+    CREATE OR REPLACE TEMP TABLE native_systems AS
+    SELECT
+        seq, system_id, name, x, y, z, allegiance, government, primary_economy,
+        secondary_economy, security, population, date,
+        sqrt(stats_x * stats_x + stats_y * stats_y + stats_z * stats_z)
+            AS distance_from_sol,
+        len(bodies) AS body_count,
+        len(list_filter(bodies, b -> b."isLandable")) AS landable_count,
+        len(list_filter(bodies, b -> len(b.rings) > 0)) AS ring_count,
+        len(kinds) > 0 AS has_station,
+        CASE
+            WHEN list_contains(kinds, 'occupied') THEN 'occupied'
+            WHEN list_contains(kinds, 'colonised') THEN 'colonised'
+            WHEN list_contains(kinds, 'colonising') THEN 'colonising'
+            ELSE 'uncolonised'
+        END AS occupation_status,
+        unplaced_station
+    FROM (
+        SELECT
+            rowid AS seq, id64 AS system_id, name,
+            coords.x AS x, coords.y AS y, coords.z AS z,
+            allegiance, government, "primaryEconomy" AS primary_economy,
+            "secondaryEconomy" AS secondary_economy, security,
+            coalesce(population, 0) AS population, date,
+            coalesce(coords.x, 0) AS stats_x,
+            coalesce(coords.y, 0) AS stats_y,
+            coalesce(coords.z, 0) AS stats_z,
+            coalesce(bodies, []) AS bodies,
+            stations[first_unplaced].name AS unplaced_station,
+            list_transform(
+                coalesce(stations, []),
+                st -> CASE
+                    WHEN starts_with(coalesce(CAST(st.market_id AS VARCHAR), ''), '42')
+                        OR contains(lower(coalesce(st.type, '')), 'construction type')
+                        THEN 'colonised'
+                    WHEN starts_with(coalesce(CAST(st.market_id AS VARCHAR), ''), '395')
+                        OR starts_with(coalesce(CAST(st.market_id AS VARCHAR), ''), '396')
+                        THEN CASE
+                            WHEN contains(lower(coalesce(st.type, '')), 'construction')
+                            THEN 'colonising'
+                        END
+                    ELSE 'occupied'
+                END
+            ) AS kinds
+        FROM native_dump
+    );
+    """,
+    """
+    CREATE OR REPLACE TEMP VIEW staging_systems AS
+    SELECT
+        system_id, name, x, y, z, allegiance, government, primary_economy,
+        secondary_economy, security, population, date, seq
+    FROM native_systems;
+    """,
+    """
+    CREATE OR REPLACE TEMP VIEW staging_system_stats AS
+    SELECT
+        system_id, coalesce(x, 0) AS x, coalesce(y, 0) AS y, coalesce(z, 0) AS z,
+        distance_from_sol, body_count, landable_count, ring_count, has_station,
+        occupation_status, seq
+    FROM native_systems;
+    """,
+    f"""
+    CREATE OR REPLACE TEMP VIEW staging_bodies AS
+    SELECT
+        b.id64 AS body_id, system_id, b.name, b.type, b."subType" AS sub_type,
+        b."distanceToArrival" AS distance_to_arrival,
+        coalesce(b."mainStar", false) AS main_star, b.age,
+        b."spectralClass" AS spectral_class, b.luminosity,
+        b."absoluteMagnitude" AS absolute_magnitude, b."solarMasses" AS solar_masses,
+        b."solarRadius" AS solar_radius, b."surfaceTemperature" AS surface_temperature,
+        b."rotationalPeriod" AS rotational_period, b."axialTilt" AS axial_tilt,
+        b."orbitalPeriod" AS orbital_period, b."semiMajorAxis" AS semi_major_axis,
+        b."orbitalEccentricity" AS orbital_eccentricity,
+        b."orbitalInclination" AS orbital_inclination,
+        b."argOfPeriapsis" AS arg_of_periapsis, b."meanAnomaly" AS mean_anomaly,
+        b."ascendingNode" AS ascending_node, b."updateTime" AS update_time,
+        system_seq * {NATIVE_SEQ_STRIDE} + pos AS seq
+    FROM (
+        SELECT
+            id64 AS system_id, rowid AS system_seq,
+            unnest(bodies) AS b, unnest(range(len(bodies))) AS pos
+        FROM native_dump
+    );
+    """,
+    f"""
+    CREATE OR REPLACE TEMP VIEW staging_stations AS
+    SELECT
+        st.id AS station_id, system_id, st.name, st.type,
+        st."controllingFaction" AS controlling_faction,
+        st."controllingFactionState" AS controlling_faction_state,
+        st."distanceToArrival" AS distance_to_arrival,
+        st."primaryEconomy" AS primary_economy, st.government,
+        st."updateTime" AS update_time, st.latitude, st.longitude,
+        system_seq * {NATIVE_SEQ_STRIDE} + pos AS seq
+    FROM (
+        SELECT
+            id64 AS system_id, rowid AS system_seq,
+            unnest(stations[:coalesce(first_unplaced - 1, len(stations))]) AS st,
+            unnest(range(coalesce(first_unplaced - 1, len(stations)))) AS pos
+        FROM native_dump
+    );
+    """,
+]
+
+
+def native_update_from_json(
+    json_file, incremental=False, threads=None, metrics=NULL_METRICS
+):
+    """
+    Update records in the database by letting DuckDB read the JSON dump itself.
+
+    The dump (a JSON array or newline-delimited JSON, optionally .gz or .zst)
+    is parsed once, on all threads, by DuckDB's JSON reader into a temporary
+    table, and bodies and stations are unnested from it in SQL. No Python
+    objects are built per record. Rows are merged with the same statements as
+    bulk_update_from_json and give the same table contents.
+
+    Returns a dict with the number of systems inserted, updated and skipped.
+    """
+    conn = get_connection()
+    load_id = _start_load(conn, json_file)
+    if threads:
+        conn.execute(f"SET threads = {int(threads)}")
+    # seq relies on the parsed dump keeping file order; see NATIVE_DUMP_SQL.
+    conn.execute("SET preserve_insertion_order = true")
+
+    columns = (
+        "{"
+        + ", ".join(
+            f"'{name}': '{duck_type}'"
+            for name, duck_type in NATIVE_JSON_COLUMNS.items()
+        )
+        + "}"
+    )
+    path = "'" + str(json_file).replace("'", "''") + "'"
+    with metrics.phase("read_json") as stats:
+        conn.execute(NATIVE_DUMP_SQL.format(path=path, columns=columns))
+        for statement in NATIVE_STAGING_SQL:
+            conn.execute(statement)
+        stats.records += conn.execute("SELECT count(*) FROM native_systems").fetchone()[
+            0
+        ]
+        stats.bytes += os.path.getsize(json_file)
+
+    unplaced = conn.execute("""
+        SELECT unplaced_station, name
+        FROM native_systems
+        WHERE unplaced_station IS NOT NULL
+        ORDER BY seq
+        """).fetchall()
+    for station_name, system_name in unplaced:
+        print(
+            f"Station {station_name} in system {system_name} has not distanceToArrival, latitude, or longitude value."
+        )
+
+    with metrics.phase("merge") as stats:
+        inserted, updated, skipped = _merge_staging(conn, load_id, incremental)
+        stats.records += inserted + updated + skipped
+        stats.batches += 1
+    conn.execute("DROP TABLE native_systems")
+    conn.execute("DROP TABLE native_dump")
+    conn.close()
+
+    counts = {"inserted": inserted, "updated": updated, "skipped": skipped}
+    print("Database updated from JSON file.")
+    print(
+        f"Systems inserted: {counts['inserted']}, updated: {counts['updated']}, "
+        f"skipped: {counts['skipped']}"
+    )
+    return counts
+
+
+def query_candidate_systems(config=None):
+    """
+    Return the systems matching a FilterConfig as a stats DataFrame.
+
+    The filter scans the narrow system_stats table, one row per system, instead
+    of aggregating bodies and stations; only matching rows are joined to
+    systems for their names. No index is kept on the filter columns: DuckDB
+    answers these range conditions with a scan and its min/max statistics, not
+    with an ART index, which would only slow down the upserts.
+
+    Raises ValueError when some stored systems have no system_stats row yet,
+    as in a database loaded before the table existed, rather than return an
+    incomplete set. Loading a dump that contains them, with any engine and
+    incremental or not, fills them in.
+    """
+    where, params = build_filter_conditions(config)
+    columns = ", ".join(f"c.{name}" for name in FIELDNAMES[1:])
+    conn = get_connection()
+    try:
+        missing = conn.execute("""
+            SELECT count(*)
+            FROM systems
+            ANTI JOIN system_stats USING (system_id)
+            """).fetchone()[0]
+        if missing:
+            raise ValueError(
+                f"{missing} systems have no system_stats row yet; load a dump "
+                "containing them first"
+            )
+        return conn.execute(
+            f"""
+            SELECT s.name AS system_name, {columns}
+            FROM (SELECT * FROM system_stats WHERE {where}) AS c
+            JOIN systems AS s USING (system_id)
+            ORDER BY c.system_id
+            """,
+            params,
+        ).df()
+    finally:
+        conn.close()
+
+
+# Per table: its key, the columns it is restored with, the columns updated on
+# restore (as in _upsert_statements) and the timestamp column whose month
+# partitions its snapshot files. system_stats rows are partitioned by their
+# system's date.
+SNAPSHOT_TABLES = {
+    "systems": ("system_id", SYSTEM_COLUMNS, SYSTEM_COLUMNS[1:], "date"),
+    "bodies": ("body_id", BODY_COLUMNS, BODY_COLUMNS[2:], "update_time"),
+    "stations": ("station_id", STATION_COLUMNS, STATION_COLUMNS[2:], "update_time"),
+    "system_stats": (
+        "system_id",
+        SYSTEM_STATS_COLUMNS,
+        SYSTEM_STATS_COLUMNS[1:],
+        None,
+    ),
+}
+
+
+def _snapshot_query(table, since):
+    """
+    Select the rows of table written by a load after load `since` (every row
+    when None), with the month of their timestamp as the partition column.
+    """
+    _, columns, _, timestamp = SNAPSHOT_TABLES[table]
+    columns = ", ".join(f"{table}.{c}" for c in columns)
+    source = table
+    if timestamp is None:
+        source = f"{table} JOIN systems USING (system_id)"
+        timestamp = "systems.date"
+    else:
+        timestamp = f"{table}.{timestamp}"
+    where = f"WHERE {table}.load_id > ?" if since is not None else ""
+    return f"""
+    SELECT {columns},
+        coalesce(strftime({timestamp}, '%Y-%m'), 'undated') AS month
+    FROM {source}
+    {where}
+    """
+
+
+def _read_manifest(snapshot_dir):
+    path = os.path.join(snapshot_dir, SNAPSHOT_MANIFEST)
+    if not os.path.exists(path):
+        return {"snapshots": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(snapshot_dir, manifest):
+    path = os.path.join(snapshot_dir, SNAPSHOT_MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def create_snapshot(snapshot_dir=SNAPSHOT_DIR, metrics=NULL_METRICS):
+    """
+    Export the rows changed since the last snapshot as zstd-compressed Parquet,
+    partitioned by the month of their date/update_time.
+
+    The first snapshot is a base holding every row. Later ones are deltas of
+    the rows written by any load since the previous snapshot: every loader
+    stamps the rows it inserts or updates with its load_id, so rows are caught
+    whatever their timestamps say, and a system_stats row whenever it is
+    rewritten. A full (not incremental) load rewrites, and so exports again,
+    every row in its dump. A snapshot after snapshots made before loads were
+    tracked is a new base. DuckDB streams each table straight into the Parquet
+    files, so no copy of the database is made. Returns the snapshot's name, or
+    None when nothing changed.
+    """
+    manifest = _read_manifest(snapshot_dir)
+    last = manifest["snapshots"][-1] if manifest["snapshots"] else {}
+    since = last.get("load_id")
+    kind = "delta" if since is not None else "base"
+    name = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{kind}"
+    path = os.path.join(snapshot_dir, name)
+    # Written under a scratch name and renamed when complete.
+    tmp_path = path + ".tmp"
+
+    conn = get_connection()
+    try:
+        # Left behind by an interrupted run; the database lock held from here
+        # on keeps other runs out.
+        if os.path.isdir(snapshot_dir):
+            for entry in os.listdir(snapshot_dir):
+                entry = os.path.join(snapshot_dir, entry)
+                if entry.endswith(".tmp") and os.path.isdir(entry):
+                    shutil.rmtree(entry)
+        os.makedirs(tmp_path)
+        # One read-only transaction, so every table is exported as of the same
+        # moment.
+        conn.execute("BEGIN TRANSACTION")
+        load_id = conn.execute(
+            "SELECT coalesce(max(load_id), 0) FROM loads"
+        ).fetchone()[0]
+        params = [since] if since is not None else []
+        rows = {
+            table: conn.execute(
+                f"SELECT count(*) FROM ({_snapshot_query(table, since)})", params
+            ).fetchone()[0]
+            for table in SNAPSHOT_TABLES
+        }
+        if not any(rows.values()):
+            conn.execute("ROLLBACK")
+            os.rmdir(tmp_path)
+            return None
+
+        for table, count in rows.items():
+            if not count:
+                continue
+            with metrics.phase("snapshot") as stats:
+                conn.execute(
+                    f"""
+                    COPY ({_snapshot_query(table, since)})
+                    TO '{os.path.join(tmp_path, table)}'
+                    (FORMAT parquet, COMPRESSION zstd, PARTITION_BY (month))
+                    """,
+                    params,
+                )
+                stats.records += count
+        conn.execute("ROLLBACK")
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    finally:
+        conn.close()
+
+    os.rename(tmp_path, path)
+    manifest["snapshots"].append(
+        {"name": name, "kind": kind, "load_id": load_id, "rows": rows}
+    )
+    _write_manifest(snapshot_dir, manifest)
+    print(f"Snapshot created: {path}")
+    return name
+
+
+def restore_snapshots(db_path, snapshot_dir=SNAPSHOT_DIR, metrics=NULL_METRICS):
+    """
+    Build a new database at db_path from the base snapshot and its deltas,
+    applied in order with the same set-based upserts as the bulk loader.
+
+    Rows keep the load_id their snapshot recorded, and the new database's
+    loads are numbered on from the highest one, so snapshots taken after
+    loads into it carry on the same manifest.
+    """
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists")
+    manifest = _read_manifest(snapshot_dir)
+    if not manifest["snapshots"]:
+        raise FileNotFoundError(f"No snapshots in {snapshot_dir}")
+
+    initialize_database(db_path)
+    conn = get_connection(db_path)
+    try:
+        for snapshot in manifest["snapshots"]:
+            conn.execute("BEGIN TRANSACTION")
+            # Snapshots taken before loads were tracked have no load_id.
+            load_id = snapshot.get("load_id") or 0
+            conn.execute(
+                "INSERT INTO loads VALUES (?, ?, now()) ON CONFLICT DO NOTHING",
+                [load_id, f"restore of {snapshot['name']}"],
+            )
+            for table, (key, columns, update_columns, _) in SNAPSHOT_TABLES.items():
+                count = snapshot["rows"].get(table)
+                if not count:
+                    continue
+                files = os.path.join(
+                    snapshot_dir, snapshot["name"], table, "**", "*.parquet"
+                )
+                conn.execute(f"""
+                    CREATE OR REPLACE TEMP VIEW snapshot_rows AS
+                    SELECT {", ".join(columns)}, 0 AS seq
+                    FROM read_parquet('{files}', hive_partitioning = true)
+                    """)
+                with metrics.phase("restore") as stats:
+                    conn.execute(
+                        _upsert_from_staging_sql(
+                            table, key, "snapshot_rows", columns, update_columns
+                        ),
+                        [load_id],
+                    )
+                    stats.records += count
+            conn.execute("COMMIT")
+            print(f"Applied snapshot {snapshot['name']}")
+        # A sequence cannot be moved on in place.
+        next_id = conn.execute(
+            "SELECT coalesce(max(load_id), 0) + 1 FROM loads"
+        ).fetchone()[0]
+        conn.execute("DROP SEQUENCE load_ids")
+        conn.execute(f"CREATE SEQUENCE load_ids START {int(next_id)}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Load a Spansh JSON data dump into the DuckDB database"
+    )
+    parser.add_argument(
+        "json_file",
+        nargs="?",
+        help="Path to the JSON data dump file (may be .gz or .zst)",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["row", "bulk", "native"],
+        default="row",
+        help="row: one statement per record; bulk: set-based upserts of parsed "
+        "batches; native: DuckDB reads the JSON itself",
+    )
+    parser.add_argument(
+        "--bulk",
+        dest="engine",
+        action="store_const",
+        const="bulk",
+        help="Shorthand for --engine bulk",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BULK_BATCH_SIZE,
+        help="Systems per batch for the bulk engine",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="With the bulk or native engine, skip systems whose date and "
+        "whose bodies' and stations' updateTime are not newer than the stored rows",
+    )
+    parser.add_argument(
+        "--snapshot-dir",
+        default=SNAPSHOT_DIR,
+        help="Directory of the Parquet snapshots taken before each load",
+    )
+    parser.add_argument(
+        "--no-snapshot",
+        action="store_true",
+        help="Do not snapshot the rows changed since the last snapshot",
+    )
+    parser.add_argument(
+        "--restore",
+        metavar="DB",
+        help="Rebuild a new database at DB from the snapshots, then exit",
+    )
+    parser.add_argument(
+        "--candidates",
+        metavar="OUTPUT",
+        help="Write the candidate systems in system_stats to this CSV/Parquet "
+        "after loading",
+    )
+    add_filter_arguments(parser)
+    add_ranking_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    if args.incremental and args.engine == "row":
+        parser.error("--incremental needs --engine bulk or --engine native")
+    metrics = metrics_from_args(args)
+
+    if args.restore:
+        restore_snapshots(args.restore, args.snapshot_dir, metrics)
+        sys.exit()
+
+    # Initialize the database
+    initialize_database()
+
+    # Snapshot what changed since the last load
+    if not args.no_snapshot:
+        create_snapshot(args.snapshot_dir, metrics)
+
+    # Check for the JSON file path as a command-line argument
+    if args.json_file:
+        json_file_path = args.json_file
+        if not os.path.exists(json_file_path):
+            print(f"JSON data dump file '{json_file_path}' not found.")
+        elif args.engine == "bulk":
+            bulk_update_from_json(
+                json_file_path,
+                batch_size=args.batch_size,
+                incremental=args.incremental,
+                metrics=metrics,
+            )
+        elif args.engine == "native":
+            native_update_from_json(
+                json_file_path, incremental=args.incremental, metrics=metrics
+            )
+        else:
+            update_from_json(json_file_path, metrics=metrics)
+        if args.metrics:
+            metrics.write(args.metrics)
+    elif not args.candidates:
+        print(
+            "Please provide the path to the JSON data dump file as a command-line argument."
+        )
+
+    if args.candidates:
+        try:
+            candidates = query_candidate_systems(config_from_args(args))
+        except ValueError as e:
+            sys.exit(str(e))
+        candidates = rank_frame(candidates, args.top, score_from_args(args))
+        write_stats(candidates, args.candidates)
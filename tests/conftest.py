@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The scripts import each other as top-level modules, as when run from src/.
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC)
@@ -0,0 +1,28 @@
+import benchmark
+
+
+def test_filter_stage_runs_the_query(tmp_path):
+    work_dir = str(tmp_path)
+    dump_path = benchmark.ensure_dump(work_dir, 300)
+    records, _ = benchmark.bench_extract(work_dir, dump_path)
+    assert records == 300
+    records, nbytes = benchmark.bench_filter(work_dir, dump_path)
+    assert records == 300
+    assert nbytes > 0
+
+
+def test_find_regressions():
+    baseline = [
+        {"stage": "a", "systems": 10, "records_per_s": 100.0, "peak_rss_mb": 50.0},
+        {"stage": "b", "systems": 10, "records_per_s": 100.0, "peak_rss_mb": 50.0},
+    ]
+    results = [
+        {"stage": "a", "systems": 10, "records_per_s": 95.0, "peak_rss_mb": 80.0},
+        {"stage": "b", "systems": 10, "records_per_s": 50.0, "peak_rss_mb": 52.0},
+        {"stage": "c", "systems": 10, "records_per_s": 1.0, "peak_rss_mb": 1.0},
+    ]
+    regressions = benchmark.find_regressions(results, baseline, 0.1)
+    assert regressions == [
+        "a @ 10: peak RSS 50.0 -> 80.0 MB",
+        "b @ 10: throughput 100 -> 50 rec/s",
+    ]
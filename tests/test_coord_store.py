@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from coord_store import CoordStore, CoordStoreWriter
+
+
+def write_store(path, names):
+    with CoordStoreWriter(str(path)) as writer:
+        for i, name in enumerate(names):
+            row = {
+                "x": float(i),
+                "y": 0.0,
+                "z": 0.0,
+                "occupation_status": "occupied",
+                "system_name": name,
+            }
+            writer.add(100 - i, row)
+
+
+def test_writer_replaces_an_earlier_store(tmp_path):
+    path = tmp_path / "stats.coords"
+    write_store(path, ["A", "B"])
+    write_store(path, ["C"])
+    store = CoordStore(str(path))
+    assert store.names() == ["C"]
+
+
+def test_writer_refuses_other_directories(tmp_path):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "galaxy.json").write_text("[]")
+    with pytest.raises(FileExistsError):
+        write_store(tmp_path / "data", ["A"])
+    assert os.listdir(tmp_path / "data") == ["galaxy.json"]
+
+    (tmp_path / "file").write_text("keep")
+    with pytest.raises(FileExistsError):
+        write_store(tmp_path / "file", ["A"])
+    assert (tmp_path / "file").read_text() == "keep"
+
+
+def test_interrupted_write_leaves_no_store(tmp_path):
+    path = tmp_path / "stats.coords"
+    with pytest.raises(RuntimeError):
+        with CoordStoreWriter(str(path)) as writer:
+            writer.add(
+                1,
+                {
+                    "x": 0.0,
+                    "y": 0.0,
+                    "z": 0.0,
+                    "occupation_status": "occupied",
+                    "system_name": "A",
+                },
+            )
+            raise RuntimeError("boom")
+    assert not os.path.exists(path / "meta.json")
+    # An interrupted store is replaced like a complete one.
+    write_store(path, ["A"])
+    assert len(CoordStore(str(path))) == 1
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from dump_index import DumpIndex, build_dump_index
+
+
+def write_dump(path, names):
+    lines = [
+        json.dumps({"id64": 10 + i, "name": name, "coords": {"x": i, "y": 0, "z": 0}})
+        for i, name in enumerate(names)
+    ]
+    path.write_text("[\n" + ",\n".join(lines) + "\n]\n")
+    return str(path)
+
+
+def test_lookups_and_shared_names(tmp_path):
+    dump = write_dump(tmp_path / "galaxy.json", ["Sol", "Twin", "Achenar", "Twin"])
+    index_path = str(tmp_path / "galaxy.idx")
+    assert build_dump_index(dump, index_path) == 4
+
+    index = DumpIndex(index_path)
+    assert index.rows_by_id64([12, 99]).tolist() == [2, -1]
+    assert index.name_rows("Twin").tolist() == [1, 3]
+    assert index.rows_by_name(["Twin", "Nowhere"]).tolist() == [1, -1]
+    assert [s["id64"] for s in index.systems([3, 0])] == [13, 10]
+
+
+def test_build_replaces_only_an_earlier_index(tmp_path):
+    dump = write_dump(tmp_path / "galaxy.json", ["Sol"])
+    index_path = str(tmp_path / "galaxy.idx")
+    build_dump_index(dump, index_path)
+    build_dump_index(dump, index_path)
+    assert len(DumpIndex(index_path)) == 1
+
+    with pytest.raises(FileExistsError):
+        build_dump_index(dump, str(tmp_path))
+    assert (tmp_path / "galaxy.json").exists()
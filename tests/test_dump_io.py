@@ -0,0 +1,76 @@
+import gzip
+import io
+
+import pytest
+import zstandard
+
+import extract_system_stats
+from dump_io import ReadAheadReader, open_dump
+
+CONTENT = (
+    b"[\n"
+    + b",\n".join(b'{"id64": %d, "name": "S%d"}' % (i, i) for i in range(2000))
+    + b"\n]\n"
+)
+
+
+def write_dumps(tmp_path):
+    plain = tmp_path / "galaxy.json"
+    plain.write_bytes(CONTENT)
+    gz = tmp_path / "galaxy.json.gz"
+    gz.write_bytes(gzip.compress(CONTENT))
+    # Several concatenated frames, as parallel compressors write them.
+    zst = tmp_path / "galaxy.json.zst"
+    compressor = zstandard.ZstdCompressor()
+    third = len(CONTENT) // 3
+    zst.write_bytes(
+        b"".join(
+            compressor.compress(CONTENT[i : i + third])
+            for i in range(0, len(CONTENT), third)
+        )
+    )
+    return [str(plain), str(gz), str(zst)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_compressed_dumps_read_like_the_plain_one(tmp_path, chunk_size):
+    for path in write_dumps(tmp_path):
+        with open_dump(path, chunk_size=chunk_size, read_ahead=2) as f:
+            assert f.read() == CONTENT
+        with open_dump(path, chunk_size=chunk_size, read_ahead=2) as f:
+            assert list(f) == CONTENT.splitlines(keepends=True)
+        with open_dump(path, chunk_size=chunk_size, read_ahead=2) as f:
+            parts = []
+            while part := f.read(1000):
+                parts.append(part)
+            assert b"".join(parts) == CONTENT
+
+
+def test_extraction_reads_compressed_dumps(tmp_path):
+    outputs = []
+    for i, path in enumerate(write_dumps(tmp_path)):
+        output = tmp_path / f"stats{i}.csv"
+        extract_system_stats.main(path, str(output))
+        outputs.append(output.read_bytes())
+    assert outputs[1] == outputs[0]
+    assert outputs[2] == outputs[0]
+
+
+def test_truncated_dumps_raise(tmp_path):
+    plain, gz, zst = write_dumps(tmp_path)
+    for path in (gz, zst):
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data[: len(data) // 2])
+        with pytest.raises(EOFError):
+            with open_dump(path) as f:
+                f.read()
+
+
+def test_reader_stops_early_when_closed():
+    reader = ReadAheadReader(io.BytesIO(CONTENT * 50), chunk_size=64, read_ahead=1)
+    assert reader.readline() == b"[\n"
+    # The read-ahead thread is blocked on a full queue; close must not hang.
+    reader.close()
+    assert not reader._thread.is_alive()
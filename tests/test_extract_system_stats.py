@@ -0,0 +1,170 @@
+import json
+
+import pandas as pd
+import pytest
+
+import extract_system_stats
+from shards import iter_shard_lines, shard_ranges
+from stats_io import open_stats_writer
+
+
+def body(name, **fields):
+    return {"id64": abs(hash(name)) % 10**9, "name": name, "type": "Planet", **fields}
+
+
+# Systems covering the edge cases of the stats: missing keys, nulls, empty
+# lists and every occupation status.
+EDGE_SYSTEMS = [
+    {"id64": 1, "name": "Sol", "coords": {"x": 0, "y": 0, "z": 0}},
+    {
+        "id64": 2,
+        "name": "No stations key",
+        "coords": {"x": 1.5, "y": -2.25, "z": 3.125},
+        "population": None,
+        "bodies": [],
+    },
+    {
+        "id64": 3,
+        "name": "Ringed",
+        "coords": {"x": -100.03125, "y": 20.5, "z": 7},
+        "bodies": [
+            body("Landable", isLandable=True),
+            body("Not landable", isLandable=False),
+            body("Null landable", isLandable=None),
+            body("Ring only", rings=[{"name": "A Ring"}]),
+            body("Empty rings", rings=[]),
+            body("Belt star", type="Star", belts=[{"name": "A Belt"}]),
+        ],
+        "stations": [],
+    },
+    {
+        "id64": 4,
+        "name": "Occupied",
+        "coords": {"x": 33.3, "y": 44.4, "z": 55.5},
+        "stations": [
+            {"name": "Port", "type": "Coriolis Starport", "market_id": 3228342528},
+            {"name": "Site", "type": "Construction Type", "market_id": 4200000001},
+        ],
+    },
+    {
+        "id64": 5,
+        "name": "Colonised",
+        "coords": {"x": 1e4, "y": -1e4, "z": 2.5e4},
+        "stations": [{"name": "Site", "type": "Outpost", "market_id": 4200000002}],
+    },
+    {
+        "id64": 6,
+        "name": "Colonising",
+        "coords": {"x": 7, "y": 8, "z": 9},
+        "stations": [
+            {
+                "name": "Build",
+                "type": "Planetary Construction Depot",
+                "market_id": 3950000001,
+            }
+        ],
+    },
+    {
+        "id64": 7,
+        "name": "Depot without construction",
+        "coords": {"x": 0.1, "y": 0.2, "z": 0.3},
+        "stations": [{"name": "Depot", "type": "Outpost", "market_id": 3960000001}],
+    },
+    {
+        "id64": 8,
+        "name": "Station without market",
+        "coords": {"x": -0.1, "y": -0.2, "z": -0.3},
+        "stations": [{"name": "Old", "type": "Orbis Starport"}],
+    },
+]
+
+
+def write_dump(path, systems):
+    path.write_text("[\n" + ",\n".join(json.dumps(s) for s in systems) + "\n]\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 100])
+def test_columnar_engine_matches_scalar(tmp_path, batch_size):
+    dump = write_dump(tmp_path / "galaxy.json", EDGE_SYSTEMS)
+    extract_system_stats.main(dump, str(tmp_path / "scalar.csv"))
+    extract_system_stats.main(
+        dump, str(tmp_path / "columnar.csv"), batch_size, engine="columnar"
+    )
+
+    scalar = pd.read_csv(tmp_path / "scalar.csv")
+    columnar = pd.read_csv(tmp_path / "columnar.csv")
+    pd.testing.assert_frame_equal(columnar, scalar, check_exact=True)
+    assert scalar["occupation_status"].tolist() == [
+        "uncolonised",
+        "uncolonised",
+        "uncolonised",
+        "occupied",
+        "colonised",
+        "colonising",
+        "uncolonised",
+        "occupied",
+    ]
+    assert scalar.loc[2, ["body_count", "landable_count", "ring_count"]].tolist() == [
+        6,
+        1,
+        1,
+    ]
+
+
+def sharded_lines(path, bounds):
+    lines = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        lines.extend(iter_shard_lines(path, start, end))
+    return lines
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_shard_lines_cover_every_line_once(tmp_path, trailing_newline):
+    content = b"[\n" + b",\n".join(b'{"id64": %d}' % i for i in range(5)) + b"\n]"
+    if trailing_newline:
+        content += b"\n"
+    path = tmp_path / "dump.json"
+    path.write_bytes(content)
+    expected = content.splitlines(keepends=True)
+
+    # Every single split point: mid-line, on a "\n", just after one, and in
+    # the last byte.
+    for split in range(1, len(content)):
+        assert sharded_lines(path, [0, split, len(content)]) == expected, split
+    for shard_count in (1, 2, 3, 7, len(content)):
+        ranges = shard_ranges(path, shard_count)
+        bounds = [start for start, _ in ranges] + [ranges[-1][1]]
+        assert sharded_lines(path, bounds) == expected, shard_count
+
+
+@pytest.mark.parametrize("engine", ["scalar", "columnar"])
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_sharded_output_matches_single_process(tmp_path, engine, trailing_newline):
+    systems = EDGE_SYSTEMS * 5
+    path = tmp_path / "galaxy.json"
+    content = "[\n" + ",\n".join(json.dumps(s) for s in systems) + "\n]"
+    path.write_text(content + ("\n" if trailing_newline else ""))
+
+    extract_system_stats.main(str(path), str(tmp_path / "single.csv"), engine=engine)
+    extract_system_stats.main(
+        str(path), str(tmp_path / "sharded.csv"), workers=3, engine=engine
+    )
+    single = (tmp_path / "single.csv").read_bytes()
+    assert (tmp_path / "sharded.csv").read_bytes() == single
+    assert len(pd.read_csv(tmp_path / "single.csv")) == len(systems)
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 100])
+def test_streamed_rows_match_whole_file_extraction(tmp_path, batch_size):
+    # The whole array on one line: streaming must not rely on line breaks.
+    path = tmp_path / "galaxy.json"
+    path.write_text(json.dumps(EDGE_SYSTEMS))
+    assert list(extract_system_stats.iter_systems(str(path))) == EDGE_SYSTEMS
+
+    extract_system_stats.main(str(path), str(tmp_path / "stats.csv"), batch_size)
+    rows = [extract_system_stats.extract_system_stats(s) for s in EDGE_SYSTEMS]
+    with open_stats_writer(str(tmp_path / "expected.csv")) as writer:
+        writer.write_rows(rows)
+    expected = (tmp_path / "expected.csv").read_bytes()
+    assert (tmp_path / "stats.csv").read_bytes() == expected
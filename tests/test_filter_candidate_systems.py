@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_candidate_systems import (
+    FILTER_COLUMNS,
+    FilterConfig,
+    filter_candidates,
+    query_candidates,
+)
+from geometry import distances
+from stats_io import read_stats, write_stats
+
+
+def random_stats(count=2000):
+    rng = np.random.default_rng(5)
+    coords = rng.uniform(-700, 700, size=(count, 3))
+    # Systems right on the edge of the default and the custom spheres.
+    coords[0] = [500.0, 0.0, 0.0]
+    coords[1] = [100.0, 200.0, -50.0 + 300.0]
+    df = pd.DataFrame(
+        {
+            "system_name": [f"S{i}" for i in range(count)],
+            "x": coords[:, 0],
+            "y": coords[:, 1],
+            "z": coords[:, 2],
+            "distance_from_sol": distances(coords),
+            "body_count": rng.integers(25, 36, count),
+            "landable_count": rng.integers(15, 26, count),
+            "ring_count": rng.integers(0, 7, count),
+            "has_station": False,
+            "occupation_status": rng.choice(["uncolonised", "occupied"], count),
+        }
+    )
+    df.loc[[0, 1], ["body_count", "landable_count", "ring_count"]] = [40, 25, 6]
+    df.loc[[0, 1], "occupation_status"] = "uncolonised"
+    return df
+
+
+CONFIGS = [
+    FilterConfig(),
+    FilterConfig(reference=(100.0, 200.0, -50.0), max_distance=300),
+    FilterConfig(
+        occupation_status="occupied", max_distance=650, min_bodies=26, min_rings=0
+    ),
+]
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_query_matches_the_pandas_filter(tmp_path, suffix, config):
+    path = str(tmp_path / f"stats{suffix}")
+    write_stats(random_stats(), path)
+
+    expected = filter_candidates(read_stats(path, columns=FILTER_COLUMNS), config)
+    result = query_candidates(path, config)
+    assert len(expected) > 0
+    assert result["system_name"].tolist() == expected["system_name"].tolist()
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from find_nearby_occupied import find_nearby_with_sources
+from geometry import pairwise_distances
+
+
+def random_systems(rng, count, prefix):
+    return pd.DataFrame(
+        {
+            "system_name": [f"{prefix}{i}" for i in range(count)],
+            "x": rng.uniform(-60, 60, count),
+            "y": rng.uniform(-60, 60, count),
+            "z": rng.uniform(-60, 60, count),
+        }
+    )
+
+
+@pytest.mark.parametrize("workers", [1, -1])
+def test_matches_brute_force(workers):
+    rng = np.random.default_rng(4)
+    candidates = random_systems(rng, 300, "C")
+    occupied = random_systems(rng, 80, "O")
+    # A source exactly on the radius counts.
+    candidates.loc[0, ["x", "y", "z"]] = occupied.loc[0, ["x", "y", "z"]] + [15, 0, 0]
+
+    result = find_nearby_with_sources(candidates, occupied, 15, workers)
+
+    found = pairwise_distances(
+        candidates[["x", "y", "z"]].to_numpy(), occupied[["x", "y", "z"]].to_numpy()
+    )
+    in_range = found <= 15
+    keep = in_range.any(axis=1)
+    assert keep[0]
+    assert result["system_name"].tolist() == candidates["system_name"][keep].tolist()
+    assert result["source_count"].tolist() == in_range[keep].sum(axis=1).tolist()
+    np.testing.assert_allclose(
+        result["nearest_source_ly"], found[keep].min(axis=1), rtol=1e-12
+    )
+    for names, mask in zip(result["source_systems_within_15ly"], in_range[keep]):
+        assert sorted(names.split(", ")) == sorted(occupied["system_name"][mask])
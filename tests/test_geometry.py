@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from geometry import (
+    distances,
+    in_box,
+    in_sphere,
+    nearest,
+    pairwise_distances,
+    point_distance,
+)
+
+
+def random_points(seed, count):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.uniform(-5e4, 5e4, size=(count, 3))
+        / rng.choice([1, 32, 1e3], count)[:, None]
+    )
+
+
+@pytest.mark.parametrize("reference", [None, (12.5, -300.03125, 7e3)])
+def test_distances_match_the_scalar_function_to_the_bit(reference):
+    points = random_points(0, 20_000)
+    expected = [point_distance(p, reference) for p in points.tolist()]
+    assert distances(points, reference).tolist() == expected
+    # float32 stays within its precision.
+    np.testing.assert_allclose(
+        distances(points, reference, dtype=np.float32), expected, rtol=1e-6
+    )
+
+
+@pytest.mark.parametrize("max_elements", [1, 7, 1 << 22])
+def test_pairwise_and_nearest_in_blocks(max_elements):
+    a, b = random_points(1, 50), random_points(2, 13)
+    matrix = pairwise_distances(a, b, max_elements)
+    for i, point in enumerate(a):
+        assert matrix[i].tolist() == distances(b, point).tolist()
+
+    best, index = nearest(a, b, max_elements)
+    np.testing.assert_array_equal(index, matrix.argmin(axis=1))
+    np.testing.assert_array_equal(best, matrix.min(axis=1))
+
+    best, index = nearest(a, b[:0])
+    assert np.isinf(best).all() and (index == -1).all()
+
+
+@pytest.mark.parametrize("center", [None, (100.0, -50.0, 25.0)])
+def test_sphere_and_box_masks(center):
+    points = random_points(3, 5000) / 100
+    # Points exactly on the sphere and on the box faces.
+    c = np.zeros(3) if center is None else np.asarray(center)
+    points[:3] = c + [[200.0, 0, 0], [0, -200.0, 0], [200.0, 200.0, 200.0]]
+
+    found = distances(points, center)
+    inside = in_sphere(points, center, 200.0)
+    np.testing.assert_array_equal(inside, found <= 200.0)
+    assert inside[:2].all() and not inside[2]
+
+    box = in_box(points, center, 200.0)
+    assert box[:3].all()
+    assert (box | ~inside).all()
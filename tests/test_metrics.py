@@ -0,0 +1,32 @@
+import json
+
+from metrics import NULL_METRICS, Metrics, peak_rss_bytes
+
+
+def test_phases_count_records_and_batches(tmp_path):
+    metrics = Metrics()
+    items = list(metrics.timed("parse", range(5)))
+    doubled = list(metrics.timed_map("extract", lambda n: n * 2, items))
+    with metrics.phase("write") as stats:
+        stats.records += len(doubled)
+        stats.batches += 1
+    metrics.add("parse", bytes=100)
+
+    path = tmp_path / "metrics.json"
+    metrics.write(str(path))
+    result = json.loads(path.read_text())
+    phases = result["phases"]
+    assert list(phases) == ["parse", "extract", "write"]
+    assert phases["parse"]["records"] == 5
+    assert phases["parse"]["bytes"] == 100
+    assert phases["extract"]["records"] == 5
+    assert phases["write"]["batches"] == 1
+    assert 0 < result["peak_rss_bytes"] <= peak_rss_bytes()
+
+
+def test_null_metrics_pass_items_through():
+    items = [1, 2, 3]
+    assert NULL_METRICS.timed("parse", items) is items
+    assert list(NULL_METRICS.timed_map("extract", str, items)) == ["1", "2", "3"]
+    with NULL_METRICS.phase("write") as stats:
+        stats.records += 1
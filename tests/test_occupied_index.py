@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from coord_store import CoordStoreWriter
+from occupied_index import build_occupied_index, load_occupied_index
+from stats_io import write_stats
+
+
+def write_systems(path, statuses):
+    df = pd.DataFrame(
+        {
+            "system_name": [f"S{i}" for i in range(len(statuses))],
+            "x": np.arange(len(statuses), dtype=np.float64),
+            "y": 0.0,
+            "z": 0.0,
+            "occupation_status": statuses,
+        }
+    )
+    write_stats(df, str(path))
+    return df
+
+
+def entries(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if not name.startswith("."))
+
+
+def test_cached_index_matches_a_fresh_build(tmp_path):
+    path = tmp_path / "stats.csv"
+    write_systems(path, ["occupied", "uncolonised", "occupied", "colonised"])
+    cache_dir = str(tmp_path / "cache")
+
+    built = load_occupied_index(str(path), cache_dir=cache_dir)
+    assert len(entries(cache_dir)) == 1
+    loaded = load_occupied_index(str(path), cache_dir=cache_dir)
+    for index in (built, loaded):
+        assert index.row_ids.tolist() == [0, 2]
+        assert index.names.tolist() == ["S0", "S2"]
+        assert index.tree.query([1.9, 0, 0])[1] == 1
+
+    # Other statuses get their own entry.
+    both = load_occupied_index(
+        str(path), ("colonised", "occupied"), cache_dir=cache_dir
+    )
+    assert both.row_ids.tolist() == [0, 2, 3]
+    assert len(entries(cache_dir)) == 2
+
+
+def test_a_new_table_replaces_its_stale_entry(tmp_path):
+    path = tmp_path / "stats.csv"
+    cache_dir = str(tmp_path / "cache")
+    write_systems(path, ["occupied", "uncolonised"])
+    load_occupied_index(str(path), cache_dir=cache_dir)
+    old_entries = entries(cache_dir)
+
+    write_systems(path, ["uncolonised", "occupied", "occupied"])
+    os.utime(path, ns=(0, 10**18))
+    index = load_occupied_index(str(path), cache_dir=cache_dir)
+    assert index.row_ids.tolist() == [1, 2]
+    assert len(entries(cache_dir)) == 1
+    assert entries(cache_dir) != old_entries
+
+
+def test_coord_store_gives_the_same_index(tmp_path):
+    df = write_systems(tmp_path / "stats.csv", ["occupied", "uncolonised", "occupied"])
+    store_path = str(tmp_path / "stats.coords")
+    with CoordStoreWriter(store_path) as writer:
+        for i, row in enumerate(df.to_dict("records")):
+            writer.add(i, row)
+
+    from_table = build_occupied_index(str(tmp_path / "stats.csv"))
+    from_store = load_occupied_index(store_path, cache_dir=str(tmp_path / "cache"))
+    assert from_store.row_ids.tolist() == from_table.row_ids.tolist()
+    assert from_store.names.tolist() == from_table.names.tolist()
+    np.testing.assert_array_equal(from_store.coords, from_table.coords)
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+import extract_system_stats
+import filter_candidate_systems
+import find_nearby_occupied
+import pipeline
+from filter_candidate_systems import FilterConfig
+from synthetic_galaxy import GalaxySpec, write_galaxy
+
+CONFIG = FilterConfig(max_distance=250, min_bodies=12, min_landables=3, min_rings=0)
+
+
+@pytest.fixture(scope="module")
+def staged(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("staged")
+    dump = str(tmp_path / "galaxy.json")
+    write_galaxy(dump, GalaxySpec(systems=3000, seed=7))
+    stats = str(tmp_path / "stats.csv")
+    candidates = str(tmp_path / "candidates.csv")
+    output = str(tmp_path / "staged.csv")
+    extract_system_stats.main(dump, stats)
+    filter_candidate_systems.main(stats, candidates, CONFIG)
+    find_nearby_occupied.main(candidates, stats, output, cache_dir=None)
+    return dump, pd.read_csv(output)
+
+
+@pytest.mark.parametrize("pushdown", [False, True])
+def test_fused_pipeline_matches_the_stages(tmp_path, staged, pushdown):
+    dump, expected = staged
+    output = str(tmp_path / "fused.csv")
+    pipeline.main(dump, output, CONFIG, batch_size=500, pushdown=pushdown)
+    result = pd.read_csv(output)
+    assert len(expected) > 10
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,76 @@
+import json
+
+import pandas as pd
+import pytest
+
+import extract_system_stats
+from pushdown import Sphere, decode_header, iter_pushdown_systems
+
+SYSTEMS = [
+    {"id64": 1, "name": "Sol", "coords": {"x": 0, "y": 0, "z": 0}, "bodies": []},
+    {
+        "id64": 2,
+        "name": 'Tricky, "bodies": [',
+        "coords": {"x": 30.0, "y": 40.0, "z": 0.0},
+        "stations": [{"name": "Port", "type": "Outpost", "market_id": 1}],
+        "bodies": [{"id64": 20, "name": "A", "isLandable": True}],
+    },
+    {"id64": 3, "name": "Bare", "coords": {"x": 0.0, "y": 0.0, "z": 50.5}},
+    {
+        "id64": 4,
+        "name": "Far",
+        "coords": {"x": 1000.0, "y": 0.0, "z": 0.0},
+        "bodies": [{"id64": 40, "name": "B", "rings": [{"name": "R"}]}],
+    },
+]
+
+
+def dump_lines(systems):
+    text = "[\n" + ",\n".join(json.dumps(s) for s in systems) + "\n]\n"
+    return text.encode().splitlines(keepends=True)
+
+
+def test_header_stops_before_nested_arrays():
+    lines = dump_lines(SYSTEMS)
+    assert decode_header(lines[0]) is None
+    assert decode_header(lines[-1]) is None
+    headers = [decode_header(line) for line in lines[1:-1]]
+    assert headers[1] == {
+        "id64": 2,
+        "name": 'Tricky, "bodies": [',
+        "coords": {"x": 30.0, "y": 40.0, "z": 0.0},
+    }
+    assert headers[2] == SYSTEMS[2]
+
+
+@pytest.mark.parametrize("radius", [0, 50, 50.5, 2000])
+def test_pushdown_keeps_exactly_the_systems_inside(radius):
+    sphere = Sphere(radius)
+    counts = {}
+    kept = list(iter_pushdown_systems(dump_lines(SYSTEMS), sphere, counts))
+    expected = [s for s in SYSTEMS if sphere(s)]
+    assert kept == expected
+    assert counts == {"kept": len(expected), "skipped": len(SYSTEMS) - len(expected)}
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("engine", ["scalar", "columnar"])
+def test_extraction_with_pushdown_matches_a_filtered_full_run(
+    tmp_path, engine, workers
+):
+    path = tmp_path / "galaxy.json"
+    path.write_bytes(b"".join(dump_lines(SYSTEMS * 3)))
+    extract_system_stats.main(str(path), str(tmp_path / "all.csv"), engine=engine)
+    extract_system_stats.main(
+        str(path),
+        str(tmp_path / "near.csv"),
+        workers=workers,
+        engine=engine,
+        predicate=Sphere(50.5),
+    )
+
+    everything = pd.read_csv(tmp_path / "all.csv")
+    expected = everything[everything["distance_from_sol"] <= 50.5]
+    result = pd.read_csv(tmp_path / "near.csv")
+    assert len(result) == 9
+    pd.testing.assert_frame_equal(result, expected.reset_index(drop=True))
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+import pandas as pd
+import pytest
+
+from query_service import QueryService, ServiceClient
+from stats_io import write_stats
+
+
+@pytest.fixture
+def client(tmp_path):
+    systems = pd.DataFrame(
+        {
+            "system_name": ["Sol", "Alpha", "Beta", "Gamma"],
+            "x": [0.0, 3.0, 10.0, 4.0],
+            "y": [0.0, 0.0, 0.0, 0.0],
+            "z": [0.0, 0.0, 0.0, 0.0],
+            "distance_from_sol": [0.0, 3.0, 10.0, 4.0],
+            "body_count": [10, 40, 50, 5],
+            "landable_count": [5, 25, 30, 1],
+            "ring_count": [1, 4, 5, 0],
+            "has_station": [True, True, False, False],
+            "occupation_status": ["occupied", "occupied", "uncolonised", "occupied"],
+        }
+    )
+    systems_path = str(tmp_path / "stats.csv")
+    write_stats(systems, systems_path)
+    service = QueryService(systems_path, cache_dir=str(tmp_path / "cache"))
+    socket_path = str(tmp_path / "service.sock")
+
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    async def serve():
+        server = await asyncio.start_unix_server(service._client, path=socket_path)
+        started.set()
+        async with server:
+            await server.serve_forever()
+
+    task = loop.create_task(serve())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    started.wait(5)
+    with ServiceClient(unix_socket=socket_path) as client:
+        yield client
+
+    async def shutdown():
+        task.cancel()
+        others = asyncio.all_tasks() - {asyncio.current_task()}
+        await asyncio.gather(*others, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def names(result):
+    return [match["system_name"] for match in result]
+
+
+def test_radius_and_nearest_queries(client):
+    radius, nearest, from_system = client.query(
+        [
+            {"op": "radius", "point": [0, 0, 0], "radius": 3.5},
+            {"op": "nearest", "point": [10, 0, 0], "k": 2},
+            {"op": "nearest", "system": "Beta", "k": 10},
+        ]
+    )
+    assert names(radius) == ["Sol", "Alpha"]
+    assert names(nearest) == ["Gamma", "Alpha"]
+    assert names(from_system) == ["Gamma", "Alpha", "Sol"]
+
+
+@pytest.mark.parametrize(
+    "request_, message",
+    [
+        ({"op": "nearest", "point": [0, 0, 0], "k": 0}, "k must be at least 1"),
+        ({"op": "nearest", "point": [0, 0, 0], "k": -3}, "k must be at least 1"),
+        ({"op": "radius", "point": [0, 0, 0], "radius": -1}, "radius must be"),
+        ({"op": "radius", "point": [0, 0, 0], "radius": "nan"}, "radius must be"),
+    ],
+)
+def test_invalid_queries_get_an_error(client, request_, message):
+    with pytest.raises(RuntimeError, match=message):
+        client.query([request_])
+    # The service keeps answering afterwards.
+    assert names(client.query([{"op": "nearest", "point": [0, 0, 0]}])[0]) == ["Sol"]
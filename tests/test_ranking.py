@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from filter_candidate_systems import FilterConfig
+from ranking import TopK, WeightedScore, rank_frame, rank_table
+from stats_io import write_stats
+
+
+def tied_stats(count=500):
+    # Few distinct counts, so most scores are tied with many other rows.
+    rng = np.random.default_rng(3)
+    return pd.DataFrame(
+        {
+            "system_name": [f"S{i}" for i in range(count)],
+            "x": rng.uniform(-50, 50, count),
+            "y": rng.uniform(-50, 50, count),
+            "z": rng.uniform(-50, 50, count),
+            "distance_from_sol": rng.uniform(0, 90, count),
+            "body_count": rng.integers(0, 3, count),
+            "landable_count": rng.integers(0, 2, count),
+            "ring_count": rng.integers(0, 2, count),
+            "has_station": False,
+            "occupation_status": "uncolonised",
+        }
+    )
+
+
+@pytest.mark.parametrize("k", [1, 37, 499, 600])
+def test_topk_merge_keeps_single_pass_ties(k):
+    df = tied_stats()
+    single = TopK(k)
+    single.push_frame(df)
+
+    merged = TopK(k)
+    bounds = [0, 3, 120, 121, 340, 500]
+    for origin, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        shard = TopK(k, origin=origin)
+        for batch_start in range(start, end, 50):
+            shard.push_frame(df.iloc[batch_start : min(batch_start + 50, end)])
+        merged.merge(shard)
+
+    names = [row["system_name"] for row in single.rows()]
+    assert [row["system_name"] for row in merged.rows()] == names
+    stable = rank_frame(df)["system_name"].tolist()
+    assert names == stable[:k]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_rank_table_matches_rank_frame(tmp_path, suffix, workers):
+    df = tied_stats()
+    path = str(tmp_path / f"stats{suffix}")
+    if suffix == ".parquet":
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path, 40)
+    else:
+        write_stats(df, path)
+
+    score = WeightedScore(rings=2.0, distance_penalty=0.01)
+    ranked = rank_table(path, 50, score, workers=workers, batch_size=30)
+    expected = rank_frame(df, 50, score)
+    assert ranked["system_name"].tolist() == expected["system_name"].tolist()
+
+
+def test_settings_reject_unknown_keys():
+    assert WeightedScore.from_dict({"reference": [1, 2, 3]}).reference == (1, 2, 3)
+    with pytest.raises(ValueError, match="Unknown score settings: ring"):
+        WeightedScore.from_dict({"ring": 1})
+    with pytest.raises(ValueError, match="Unknown filter settings: max_dist"):
+        FilterConfig.from_dict({"max_dist": 1})
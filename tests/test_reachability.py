@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.sparse import coo_matrix
+from scipy.sparse import csgraph
+from scipy.spatial import KDTree
+
+import reachability
+from reachability import UNREACHABLE, connected_components, hop_distances
+from stats_io import read_stats, write_stats
+
+
+def radius_graph(coords, radius):
+    pairs = KDTree(coords).query_pairs(radius, output_type="ndarray")
+    n = len(coords)
+    ones = np.ones(len(pairs))
+    return coo_matrix((ones, (pairs[:, 0], pairs[:, 1])), shape=(n, n)).tocsr()
+
+
+def clustered_coords(seed):
+    rng = np.random.default_rng(seed)
+    centres = rng.uniform(-200, 200, size=(6, 3))
+    coords = centres[rng.integers(0, 6, size=400)] + rng.normal(0, 12, (400, 3))
+    return coords
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1000])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_components_match_csgraph(seed, chunk_size):
+    coords = clustered_coords(seed)
+    labels = connected_components(coords, 10, chunk_size=chunk_size, workers=1)
+
+    count, expected = csgraph.connected_components(
+        radius_graph(coords, 10), directed=False
+    )
+    assert len(np.unique(labels)) == count
+    # Labels are the smallest index in each component.
+    smallest = {}
+    for i, component in enumerate(expected):
+        smallest.setdefault(component, i)
+    assert labels.tolist() == [smallest[c] for c in expected]
+
+
+@pytest.mark.parametrize("max_hops", [None, 0, 1, 3])
+@pytest.mark.parametrize("chunk_size", [5, 1000])
+def test_hop_distances_match_csgraph(max_hops, chunk_size):
+    coords = clustered_coords(2)
+    sources = np.zeros(len(coords), dtype=bool)
+    sources[[0, 17, 250]] = True
+    hops = hop_distances(
+        coords, sources, 10, max_hops, chunk_size=chunk_size, workers=1
+    )
+
+    paths = csgraph.shortest_path(
+        radius_graph(coords, 10),
+        directed=False,
+        unweighted=True,
+        indices=np.flatnonzero(sources),
+    )
+    nearest = paths.min(axis=0)
+    if max_hops is not None:
+        nearest[nearest > max_hops] = np.inf
+    expected = np.where(np.isinf(nearest), UNREACHABLE, nearest).astype(int)
+    np.testing.assert_array_equal(hops, expected)
+
+
+def test_candidates_join_across_formats(tmp_path):
+    names = ["Sol", "Alpha", "Twin", "Twin", "Far"]
+    systems = pd.DataFrame(
+        {
+            "system_name": names,
+            "x": [0.0, 10.03125, 20.1, 30.7, 1000.0],
+            "y": [0.0, 0.1, 0.2, 0.3, 0.0],
+            "z": [0.0, 0.0, 0.0, 0.0, 0.0],
+            "occupation_status": ["occupied"] + ["uncolonised"] * 4,
+        }
+    )
+    systems_path = tmp_path / "systems.csv"
+    candidates_path = tmp_path / "candidates.parquet"
+    write_stats(systems, str(systems_path))
+    write_stats(systems.iloc[1:], str(candidates_path))
+    assert read_stats(str(candidates_path))["x"].dtype == np.float32
+
+    output_path = tmp_path / "reach.csv"
+    reachability.main(
+        str(systems_path),
+        str(output_path),
+        input_candidates=str(candidates_path),
+        radius_ly=12,
+    )
+    result = read_stats(str(output_path))
+    assert result["system_name"].tolist() == ["Alpha", "Twin", "Twin"]
+    assert result["hops"].tolist() == [1, 2, 3]
@@ -0,0 +1,60 @@
+import os
+
+from stage_cache import StageCache
+
+
+def producer(output_path, text, calls):
+    def produce():
+        calls.append(text)
+        with open(output_path, "w") as f:
+            f.write(text)
+
+    return produce
+
+
+def test_unchanged_inputs_reuse_the_output(tmp_path):
+    source = tmp_path / "galaxy.json"
+    source.write_text("[]")
+    output = str(tmp_path / "stats.csv")
+    cache = StageCache(str(tmp_path / "cache"))
+    calls = []
+
+    assert not cache.run(
+        "extract", [str(source)], {}, output, producer(output, "a", calls)
+    )
+    os.remove(output)
+    assert cache.run("extract", [str(source)], {}, output, producer(output, "b", calls))
+    assert open(output).read() == "a"
+
+    # New settings, or a changed input, miss.
+    assert not cache.run(
+        "extract",
+        [str(source)],
+        {"engine": "columnar"},
+        output,
+        producer(output, "c", calls),
+    )
+    source.write_text("[{}]")
+    assert not cache.run(
+        "extract", [str(source)], {}, output, producer(output, "d", calls)
+    )
+    assert calls == ["a", "c", "d"]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = StageCache(str(tmp_path / "cache"))
+    keys = []
+    for i in range(3):
+        output = tmp_path / f"out{i}"
+        output.write_bytes(b"x" * 1000)
+        keys.append(cache.key("stage", [], {"i": i}))
+        cache.store(keys[-1], str(output), {})
+        os.utime(os.path.join(cache.cache_dir, keys[-1], "meta.json"), (i, i))
+
+    # A lookup marks the oldest entry as used, so the next oldest goes.
+    assert cache.lookup(keys[0]) is not None
+    cache.budget_bytes = 2500
+    cache.evict()
+    assert cache.lookup(keys[1]) is None
+    assert cache.lookup(keys[0]) is not None
+    assert cache.lookup(keys[2]) is not None
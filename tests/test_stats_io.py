@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from stats_io import STATS_SCHEMA, open_stats_writer, read_stats, write_stats
+
+ROWS = [
+    {
+        "system_name": "Sol",
+        "x": 0.0,
+        "y": 0.0,
+        "z": 0.0,
+        "distance_from_sol": 0.0,
+        "body_count": 40,
+        "landable_count": 12,
+        "ring_count": 3,
+        "has_station": True,
+        "occupation_status": "occupied",
+    },
+    {
+        "system_name": "Far, with a comma",
+        "x": -1234.5625,
+        "y": 20.03125,
+        "z": 65000.25,
+        "distance_from_sol": 65011.98,
+        "body_count": 0,
+        "landable_count": 0,
+        "ring_count": 0,
+        "has_station": False,
+        "occupation_status": "uncolonised",
+    },
+]
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_written_rows_read_back(tmp_path, suffix):
+    path = str(tmp_path / f"stats{suffix}")
+    with open_stats_writer(path) as writer:
+        writer.write_rows(ROWS[:1])
+        writer.write_rows(ROWS[1:])
+
+    df = read_stats(path)
+    assert df["system_name"].tolist() == ["Sol", "Far, with a comma"]
+    assert df["occupation_status"].astype(str).tolist() == ["occupied", "uncolonised"]
+    assert df["has_station"].tolist() == [True, False]
+    assert df["body_count"].tolist() == [40, 0]
+    np.testing.assert_allclose(df["x"], [0.0, -1234.5625])
+    np.testing.assert_allclose(df["distance_from_sol"], [0.0, 65011.98], rtol=1e-6)
+
+    assert read_stats(path, columns=["system_name", "ring_count"]).columns.tolist() == [
+        "system_name",
+        "ring_count",
+    ]
+
+
+def test_parquet_keeps_the_typed_schema(tmp_path):
+    path = str(tmp_path / "stats.parquet")
+    with open_stats_writer(path) as writer:
+        writer.write_rows(ROWS)
+    assert pq.read_schema(path).remove_metadata() == STATS_SCHEMA
+
+    # DataFrames written back keep the schema for the stats columns, and any
+    # extra columns as they are.
+    df = read_stats(path).assign(source_count=[2, 0])
+    write_stats(df, str(tmp_path / "again.parquet"))
+    schema = pq.read_schema(str(tmp_path / "again.parquet"))
+    assert schema.field("x").type == STATS_SCHEMA.field("x").type
+    assert schema.field("source_count").type == "int64"
+    pd.testing.assert_frame_equal(read_stats(str(tmp_path / "again.parquet")), df)
@@ -0,0 +1,67 @@
+import pandas as pd
+
+from stats_io import FIELDNAMES
+from stats_records import StatsRecords
+
+STATUSES = ["uncolonised", "colonising", "colonised", "occupied"]
+
+
+def make_rows(count, start=0):
+    return [
+        {
+            "system_name": f"Système {i}" if i % 3 else f"S{i}",
+            "x": i * 1.5,
+            "y": -i / 32,
+            "z": 1e4 + i,
+            "distance_from_sol": float(i),
+            "body_count": i % 7,
+            "landable_count": i % 3,
+            "ring_count": i % 2,
+            "has_station": i % 4 == 0,
+            "occupation_status": STATUSES[i % 4],
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def expected_frame(rows):
+    df = pd.DataFrame(rows, columns=FIELDNAMES)
+    return df.astype(
+        {
+            "body_count": "uint16",
+            "landable_count": "uint16",
+            "ring_count": "uint16",
+            "occupation_status": pd.CategoricalDtype(STATUSES),
+        }
+    )
+
+
+def test_rows_and_frames_round_trip(tmp_path):
+    rows = make_rows(23)
+    records = StatsRecords(chunk_size=4)
+    records.extend(rows[:9])
+    records.extend_frame(pd.DataFrame(rows[9:15], columns=FIELDNAMES))
+    records.extend(rows[15:])
+    assert len(records) == 23
+    pd.testing.assert_frame_equal(records.to_frame(), expected_frame(rows))
+    assert records.coords()[5].tolist() == [7.5, -5 / 32, 10005.0]
+
+    records.save(str(tmp_path / "records"))
+    loaded = StatsRecords.load(str(tmp_path / "records"))
+    pd.testing.assert_frame_equal(loaded.to_frame(), expected_frame(rows))
+    # Appending after a column access starts a new chunk.
+    loaded.extend(make_rows(2, start=23))
+    assert loaded.names()[-2:] == ["Système 23", "S24"]
+
+
+def test_sort_and_take_keep_names_aligned():
+    rows = make_rows(30)
+    records = StatsRecords(chunk_size=8)
+    records.extend(rows)
+    order = records.sort_order(["body_count", "landable_count", "ring_count"])
+    expected = expected_frame(rows).sort_values(
+        ["body_count", "landable_count", "ring_count"], ascending=False, kind="stable"
+    )
+    taken = records.take(order)
+    pd.testing.assert_frame_equal(taken.to_frame(), expected.reset_index(drop=True))
+    assert records.take([]).to_frame().empty
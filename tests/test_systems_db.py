@@ -0,0 +1,221 @@
+import copy
+import json
+import os
+
+import pytest
+
+import systems_db
+
+
+def make_system(id64, date="2025-03-01 10:00:00+00"):
+    return {
+        "id64": id64,
+        "name": f"Sys {id64}",
+        "coords": {"x": 10.0 * id64, "y": 1.0, "z": -2.0},
+        "population": 0,
+        "date": date,
+        "bodies": [
+            {
+                "id64": 100 * id64 + i,
+                "name": f"Sys {id64} {i}",
+                "type": "Planet",
+                "subType": "Icy body",
+                "distanceToArrival": 10.0 + i,
+                "isLandable": True,
+                "surfaceTemperature": 100.0,
+                "updateTime": "2025-03-01 10:00:00+00",
+            }
+            for i in range(2)
+        ],
+        "stations": [
+            {
+                "id": 1000 + id64,
+                "name": f"Station {id64}",
+                "type": "Coriolis Starport",
+                "distanceToArrival": 5.0,
+                "updateTime": "2025-03-01 10:00:00+00",
+            }
+        ],
+    }
+
+
+def write_dump(path, systems):
+    with open(path, "w") as f:
+        f.write("[\n" + ",\n".join(json.dumps(s) for s in systems) + "\n]\n")
+    return str(path)
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(systems_db, "DB_PATH", str(tmp_path / "systems.db"))
+    systems_db.initialize_database()
+    return systems_db.DB_PATH
+
+
+@pytest.mark.parametrize(
+    "load",
+    [
+        lambda path: systems_db.bulk_update_from_json(path, incremental=True),
+        lambda path: systems_db.native_update_from_json(path, incremental=True),
+    ],
+    ids=["bulk", "native"],
+)
+def test_incremental_counts(tmp_path, database, load):
+    systems = [make_system(i) for i in range(1, 4)]
+    assert load(write_dump(tmp_path / "full.json", systems)) == {
+        "inserted": 3,
+        "updated": 0,
+        "skipped": 0,
+    }
+
+    delta = copy.deepcopy(systems) + [make_system(4)]
+    # A rescanned body: newer updateTime, system date unchanged.
+    delta[0]["bodies"][1]["updateTime"] = "2025-03-02 10:00:00+00"
+    delta[0]["bodies"][1]["surfaceTemperature"] = 250.0
+    # A station update.
+    delta[1]["stations"][0]["updateTime"] = "2025-03-02 10:00:00+00"
+    delta[1]["stations"][0]["type"] = "Orbis Starport"
+    assert load(write_dump(tmp_path / "delta.json", delta)) == {
+        "inserted": 1,
+        "updated": 2,
+        "skipped": 1,
+    }
+
+    conn = systems_db.get_connection()
+    try:
+        assert conn.execute(
+            "SELECT CAST(surface_temperature AS DOUBLE) FROM bodies WHERE body_id = 101"
+        ).fetchone() == (250.0,)
+        assert conn.execute(
+            "SELECT type FROM stations WHERE station_id = 1002"
+        ).fetchone() == ("Orbis Starport",)
+        assert conn.execute("SELECT count(*) FROM systems").fetchone() == (4,)
+    finally:
+        conn.close()
+
+    assert load(write_dump(tmp_path / "again.json", delta)) == {
+        "inserted": 0,
+        "updated": 0,
+        "skipped": 4,
+    }
+
+
+def test_candidates_need_stats_for_every_system(tmp_path, database):
+    path = write_dump(tmp_path / "full.json", [make_system(i) for i in range(1, 4)])
+    systems_db.native_update_from_json(path)
+
+    # As in a database loaded before system_stats existed.
+    conn = systems_db.get_connection()
+    conn.execute("DELETE FROM system_stats WHERE system_id = 2")
+    conn.close()
+    with pytest.raises(ValueError, match="1 systems have no system_stats row"):
+        systems_db.query_candidate_systems()
+
+    # An incremental load fills the gap even though nothing else changed.
+    assert systems_db.bulk_update_from_json(path, incremental=True) == {
+        "inserted": 0,
+        "updated": 1,
+        "skipped": 2,
+    }
+    systems_db.query_candidate_systems()
+
+
+def table_rows(db_path):
+    conn = systems_db.get_connection(db_path)
+    try:
+        return {
+            table: conn.execute(
+                f"SELECT {', '.join(columns)} FROM {table} ORDER BY {key}"
+            ).fetchall()
+            for table, (key, columns, _, _) in systems_db.SNAPSHOT_TABLES.items()
+        }
+    finally:
+        conn.close()
+
+
+def test_snapshot_deltas_follow_loads(tmp_path, database):
+    snapshot_dir = str(tmp_path / "snapshots")
+    systems = [make_system(i) for i in range(1, 5)]
+    systems[3]["bodies"][0]["updateTime"] = None
+    systems_db.bulk_update_from_json(write_dump(tmp_path / "full.json", systems))
+    assert systems_db.create_snapshot(snapshot_dir).endswith("-base")
+
+    delta = copy.deepcopy(systems)
+    # Same timestamp as stored.
+    delta[0]["bodies"][0]["surfaceTemperature"] = 300.0
+    # Older than stored, written by a full load all the same.
+    delta[1]["date"] = "2025-02-01 10:00:00+00"
+    delta[1]["population"] = 5
+    # Only system_stats changes: a body becomes non-landable, no date moves.
+    delta[2]["bodies"][0]["isLandable"] = False
+    # No timestamp at all.
+    delta[3]["bodies"][0]["surfaceTemperature"] = 50.0
+    systems_db.native_update_from_json(write_dump(tmp_path / "delta.json", delta))
+    # A crashed snapshot leaves its scratch directory behind.
+    os.makedirs(os.path.join(snapshot_dir, "20250101T000000-delta.tmp", "bodies"))
+    assert systems_db.create_snapshot(snapshot_dir).endswith("-delta")
+    assert not [name for name in os.listdir(snapshot_dir) if name.endswith(".tmp")]
+    assert systems_db.create_snapshot(snapshot_dir) is None
+
+    restored = str(tmp_path / "restored.db")
+    systems_db.restore_snapshots(restored, snapshot_dir)
+    assert table_rows(restored) == table_rows(database)
+
+
+def test_snapshots_carry_on_after_restore(tmp_path, database, monkeypatch):
+    snapshot_dir = str(tmp_path / "snapshots")
+    systems = [make_system(i) for i in range(1, 4)]
+    systems_db.bulk_update_from_json(write_dump(tmp_path / "full.json", systems))
+    systems_db.create_snapshot(snapshot_dir)
+    systems_db.bulk_update_from_json(
+        write_dump(tmp_path / "more.json", [make_system(4)])
+    )
+    systems_db.create_snapshot(snapshot_dir)
+
+    restored = str(tmp_path / "restored.db")
+    systems_db.restore_snapshots(restored, snapshot_dir)
+    monkeypatch.setattr(systems_db, "DB_PATH", restored)
+    delta = [make_system(1, date="2025-04-01 10:00:00+00"), make_system(5)]
+    delta[0]["population"] = 7
+    systems_db.native_update_from_json(write_dump(tmp_path / "delta.json", delta))
+    assert systems_db.create_snapshot(snapshot_dir).endswith("-delta")
+
+    again = str(tmp_path / "again.db")
+    systems_db.restore_snapshots(again, snapshot_dir)
+    assert table_rows(again) == table_rows(restored)
+    assert len(table_rows(again)["systems"]) == 5
+
+
+LOADERS = [
+    systems_db.update_from_json,
+    systems_db.bulk_update_from_json,
+    lambda path: systems_db.bulk_update_from_json(path, batch_size=2),
+    systems_db.native_update_from_json,
+]
+
+
+def test_loaders_write_the_same_tables(tmp_path, monkeypatch):
+    systems = [make_system(i) for i in range(1, 6)]
+    # A system listed twice: the later copy wins.
+    systems.append(copy.deepcopy(systems[1]))
+    systems[-1]["population"] = 9
+    systems[-1]["bodies"][0]["isLandable"] = False
+    # A station without a position, and one after it: both are skipped.
+    unplaced = {"id": 2003, "name": "Carrier", "type": "Drake-Class Carrier"}
+    systems[2]["stations"] += [unplaced, dict(systems[2]["stations"][0], id=2004)]
+    del systems[3]["stations"]
+    systems[4]["bodies"] = []
+    delta = [make_system(1, date="2025-04-01 10:00:00+00"), make_system(6)]
+    delta[0]["bodies"][1]["rings"] = [{"name": "A Ring"}]
+
+    results = []
+    for i, load in enumerate(LOADERS):
+        monkeypatch.setattr(systems_db, "DB_PATH", str(tmp_path / f"{i}.db"))
+        systems_db.initialize_database()
+        load(write_dump(tmp_path / "full.json", systems))
+        load(write_dump(tmp_path / "delta.json", delta))
+        results.append(table_rows(systems_db.DB_PATH))
+    assert len(results[0]["systems"]) == 6
+    assert [row[0] for row in results[0]["stations"]] == [1001, 1002, 1003, 1005, 1006]
+    for result in results[1:]:
+        assert result == results[0]